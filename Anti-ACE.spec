@@ -2,8 +2,13 @@
 
 from __future__ import annotations
 
+import os
+
 block_cipher = None
 
+# Pre-rendered tray icons (scripts/build_tray_icons.py); rendered and cached on first start if missing.
+tray_icons = [("tray-icons.bin", ".")] if os.path.exists("tray-icons.bin") else []
+
 
 a = Analysis(
     ["main.py"],
@@ -11,7 +16,8 @@ a = Analysis(
     binaries=[],
     datas=[
         ("icon.ico", "."),
-    ],
+    ]
+    + tray_icons,
     hiddenimports=[
         # GUI
         "tkinter",
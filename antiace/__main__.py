@@ -11,10 +11,6 @@ if __package__ in (None, ""):
 
     sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from antiace.cli import run_cli
-from antiace.gui import run_gui
-from antiace.app import run_background
-
 
 def main() -> int:
     parser = argparse.ArgumentParser()
@@ -22,6 +18,23 @@ def main() -> int:
     mode.add_argument("--background", action="store_true", help="Run in background mode (tray + monitor). Default.")
     mode.add_argument("--gui", action="store_true", help="Show the main GUI page")
     mode.add_argument("--cli", action="store_true", help="Run in CLI mode (no Tkinter GUI)")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=("status",),
+        help="(CLI mode) status: ask the running background instance instead of scanning",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="(CLI mode) Keep optimizing and print one line per event until Ctrl+C",
+    )
+    parser.add_argument("--json", action="store_true", help="(CLI watch mode) Print events as NDJSON")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        help="(CLI watch mode) Seconds between drift checks (default: 5)",
+    )
     parser.add_argument(
         "--no-tray",
         action="store_true",
@@ -29,12 +42,44 @@ def main() -> int:
     )
     args = parser.parse_args()
 
+    # Each mode imports only its own modules: `--cli` runs from scheduled tasks and
+    # must not pay for Tk, the tray or the monitor (see scripts/bench_startup.py).
+    if args.command and not args.cli:
+        parser.error(f"{args.command} requires --cli")
+    if args.watch and not args.cli:
+        parser.error("--watch requires --cli")
+    if (args.json or args.interval is not None) and not args.watch:
+        parser.error("--json and --interval require --watch")
+    if args.watch and args.command:
+        parser.error(f"--watch cannot be combined with {args.command}")
+    if args.interval is not None and args.interval <= 0:
+        parser.error("--interval must be positive")
     if args.cli:
+        if args.watch:
+            from antiace.cli import run_watch
+
+            return run_watch(as_json=args.json, interval=5.0 if args.interval is None else args.interval)
+        if args.command == "status":
+            from antiace.cli import run_status
+
+            return run_status()
+        from antiace.cli import run_cli
+
         return run_cli()
     if args.gui:
+        if not args.no_tray:
+            from antiace.instance import request
+
+            # A background instance is running: open its window rather than a second UI.
+            if request({"cmd": "show"}) is not None:
+                return 0
+        from antiace.gui import run_gui
+
         return run_gui(with_tray=not args.no_tray)
 
     # Default: background
+    from antiace.app import run_background
+
     return run_background()
 
 
@@ -1,20 +1,29 @@
 from __future__ import annotations
 
+import gc
 import os
 import subprocess
 import sys
 import threading
 import time
 import queue
+from dataclasses import replace
 
-import psutil
-
-from .config import AppConfig, is_valid_wegame_path, load_config, save_config
-from .optimizer import Optimizer
+from . import instance
+from .config import is_valid_wegame_path, load_config, save_config
+from .events import Control, CpuInfo, GuardState, GuiEvents, Progress, Stats, WegameState
+from .games import GameMonitor
+from .optimizer import optimizer_from_config
 from .picker import pick_wegame_exe_via_gui
+from .policy import logical_cpu_count
+from .processes import get_snapshot, get_tracker
 from .resources import resource_path
+from .scheduler import MonitorScheduler
 from .tray import TrayController
-from .wegame import find_wegame_exe, is_wegame_running, start_wegame
+from .trayicons import STATUS_ERROR, STATUS_IDLE, STATUS_OPTIMIZED
+from .waiter import start_exit_waiter
+from .watcher import start_watcher
+from .wegame import WEGAME_EXE, find_wegame_exe, is_wegame_running, start_wegame
 
 
 class AppState:
@@ -39,12 +48,74 @@ def _spawn_main_gui() -> None:
         pass
 
 
+def _release_gui_memory() -> None:
+    """Hand the memory of a destroyed Tk UI back to the OS (best-effort)."""
+    gc.collect()
+    try:
+        if os.name == "nt":
+            from .windows import trim_working_set
+
+            trim_working_set(os.getpid())
+        else:
+            import ctypes
+
+            # The libc already loaded into this process; only glibc has malloc_trim
+            # (not musl, macOS or the BSDs), and a hard-coded "libc.so.6" is glibc's name.
+            malloc_trim = getattr(ctypes.CDLL(None), "malloc_trim", None)
+            if malloc_trim is not None:
+                malloc_trim(0)
+    except Exception:
+        pass
+
+
+def serve_gui(events: GuiEvents, stop_event: threading.Event, *, teardown_after: float) -> int:
+    """Build the Tk UI on each "show" request and drop it after `teardown_after` seconds hidden.
+
+    Until the first request the process never imports Tk; the monitor and tray
+    keep publishing into `events` whether a UI exists or not.
+    """
+    woken = threading.Event()
+    while not stop_event.is_set():
+        events.set_waker(woken.set, controls_only=True)
+        woken.wait()
+        woken.clear()
+        actions = {ev.action for ev in events.take_controls()}
+        if "quit" in actions or stop_event.is_set():
+            break
+        if "show" not in actions:
+            continue
+        events.set_waker(None)
+        # Imported on first use: a tray-only session never loads Tk.
+        from .gui import TORN_DOWN, run_gui
+
+        result = run_gui(
+            with_tray=False, events=events, close_to_tray=True, auto_scan=False, teardown_after=teardown_after
+        )
+        if result != TORN_DOWN:
+            return result
+        _release_gui_memory()
+    events.set_waker(None)
+    return 0
+
+
 def run_background() -> int:
+    # One background instance per session: a second launch only brings up the running one's window.
+    lock = instance.acquire()
+    if lock is None:
+        instance.request({"cmd": "show"})
+        return 0
+    try:
+        return _run_background()
+    finally:
+        lock.release()
+
+
+def _run_background() -> int:
     state = {"value": AppState.INIT}
     stop_event = threading.Event()
 
-    # GUI control/events queue (consumed by Tk thread).
-    gui_events: "queue.Queue[tuple]" = queue.Queue()
+    # GUI control/events bus (drained by the Tk thread, see antiace.events).
+    gui_events = GuiEvents()
 
     cfg = load_config()
 
@@ -54,22 +125,57 @@ def run_background() -> int:
 
         auto = find_wegame_exe(search_registry=True)
         if auto:
-            cfg = AppConfig(wegame_path=auto)
+            cfg = replace(cfg, wegame_path=auto)
             save_config(cfg)
         else:
             picked = pick_wegame_exe_via_gui()
             if not is_valid_wegame_path(picked):
                 # User cancelled or invalid selection.
                 return 1
-            cfg = AppConfig(wegame_path=str(picked))
+            cfg = replace(cfg, wegame_path=str(picked))
             save_config(cfg)
 
     # === State: READY (tray + monitor) ===
     state["value"] = AppState.READY
 
+    # Set on exit and on every process start/exit event so nothing waits through either.
+    wake_event = threading.Event()
+    started_pids: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+    exited_pids: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+
+    def on_process_started(pid: int) -> None:
+        started_pids.put(pid)
+        wake_event.set()
+
+    def on_process_exited(pid: int) -> None:
+        exited_pids.put(pid)
+        wake_event.set()
+
+    def drain(q: "queue.SimpleQueue[int]") -> list[int]:
+        pids: list[int] = []
+        try:
+            while True:
+                pids.append(q.get_nowait())
+        except queue.Empty:
+            pass
+        return list(dict.fromkeys(pids))
+
+    optimizer = optimizer_from_config(cfg)
+    policy = optimizer.policy
+    # The game the guard protects; its cores are kept free of the targets, i.e. what the
+    # rules match (the guard processes by default; wegame.exe is monitored but not tuned).
+    games = GameMonitor(cfg.game_exes, ignore=tuple(optimizer.rules.exact_names()))
+
+    def wanted(name: str) -> bool:
+        """Start events the monitor acts on: targets, the launcher and the game."""
+        return name.lower() == WEGAME_EXE or optimizer.rules.is_candidate(name) or games.is_game_name(name)
+
+    watcher = start_watcher(on_process_started, wanted=wanted)
+    exit_waiter = start_exit_waiter()
+
     # Publish initial WeGame status to GUI.
     try:
-        gui_events.put(("wegame", "running" if is_wegame_running() else "not_running"))
+        gui_events.put(WegameState("running" if is_wegame_running() else "not_running"))
     except Exception:
         pass
 
@@ -77,86 +183,304 @@ def run_background() -> int:
     started = False
     if not is_wegame_running() and cfg.wegame_path:
         try:
-            gui_events.put(("wegame", "starting"))
+            gui_events.put(WegameState("starting"))
         except Exception:
             pass
         ok, _msg = start_wegame(cfg.wegame_path)
         started = bool(ok)
         try:
-            gui_events.put(("wegame", "running" if started else "start_failed"))
+            gui_events.put(WegameState("running" if started else "start_failed"))
         except Exception:
             pass
 
     # If we attempted to start it, give it a short grace period to appear.
     if started:
-        deadline = time.time() + 10
-        while time.time() < deadline and not is_wegame_running() and not stop_event.is_set():
-            time.sleep(0.25)
+        tracker = get_tracker()
+        deadline = time.monotonic() + 10
+        appeared = is_wegame_running(get_snapshot(max_age=0))
+        while not appeared and not stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if watcher.event_driven:
+                # Woken by "process started" events; only the reported PIDs are looked up.
+                if wake_event.wait(remaining):
+                    wake_event.clear()
+                    for pid in drain(started_pids):
+                        found = tracker.lookup(pid, refresh=True)
+                        if found and found[0].lower() == WEGAME_EXE:
+                            appeared = True
+            else:
+                time.sleep(min(remaining, 0.25))
+                appeared = is_wegame_running(get_snapshot(max_age=0))
         try:
-            gui_events.put(("wegame", "running" if is_wegame_running() else "not_running"))
+            gui_events.put(WegameState("running" if appeared else "not_running"))
         except Exception:
             pass
 
-    optimizer = Optimizer(reapply_after_seconds=300)
-    # Only optimize the guard processes; wegame.exe is monitored but not tuned.
-    target_names = ["SGuard64.exe", "SGuardSvc64.exe"]
-
-    # Publish CPU info for UI display (core count + last logical CPU index).
+    # Publish CPU info for UI display (core count + CPUs the guard is pinned to).
     try:
-        cpu_count = psutil.cpu_count(logical=True) or os.cpu_count() or 0
-        last_cpu = (cpu_count - 1) if cpu_count and cpu_count > 0 else None
-        gui_events.put(("cpu", int(cpu_count), last_cpu))
+        gui_events.put(CpuInfo(int(logical_cpu_count()), policy.affinity))
     except Exception:
         pass
 
     def on_show_main() -> None:
-        gui_events.put(("ctl", "show"))
+        gui_events.put(Control("show"))
 
     def on_exit() -> None:
         stop_event.set()
-        gui_events.put(("ctl", "quit"))
+        wake_event.set()
+        gui_events.put(Control("quit"))
 
     tray = TrayController(on_show_main=on_show_main, on_exit=on_exit, icon_path=resource_path("icon.ico"))
     tray.start()
 
+    def handle_request(req: dict) -> dict:
+        """Requests from later invocations (antiace.instance); runs on the control thread."""
+        cmd = req.get("cmd")
+        if cmd == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if cmd == "show":
+            gui_events.put(Control("show"))
+            return {"ok": True}
+        if cmd == "status":
+            # Served from what the monitor already published: no rescan.
+            return {"ok": True, "pid": os.getpid(), **gui_events.snapshot()}
+        return {"ok": False, "error": f"unknown command: {cmd!r}"}
+
+    control = instance.start_server(handle_request)
+
     def monitor_loop() -> None:
         """Background monitor loop; runs while Tk mainloop is active."""
+        optimized_once = False
+        tracker = get_tracker()
+        # WeGame PIDs with a live exit handle; when the last one exits we re-check and quit.
+        launcher_pids: set[int] = set()
+        # pid -> create_time of launchers whose exit was reported; an unreaped process can
+        # stay in the table for a while and must not count as running.
+        exited_launchers: dict[int, float | None] = {}
+
+        def live_launchers(snap) -> list[int]:
+            return [
+                pid
+                for pid in snap.pids(WEGAME_EXE)
+                if pid not in exited_launchers or exited_launchers[pid] != snap.create_time(pid)
+            ]
+
+        def quit_app() -> None:
+            # If wegame is gone, we exit. We do NOT restart endlessly.
+            stop_event.set()
+            wake_event.set()
+            gui_events.put(Control("quit"))
+            state["value"] = AppState.EXITING
+
+        def watch_launcher(pids: list[int]) -> None:
+            for pid in pids:
+                if pid in launcher_pids:
+                    continue
+                found = tracker.lookup(pid)
+                create_time = found[1] if found else None
+                if exit_waiter.watch(pid, on_process_exited, create_time=create_time):
+                    launcher_pids.add(pid)
+                    tracker.track(pid)
+
+        # pid -> whether the last optimization of that target fully succeeded; drives the tray icon.
+        target_ok: dict[int, bool] = {}
+
+        def update_tray() -> None:
+            if not target_ok:
+                tray.set_status(STATUS_IDLE)
+            else:
+                tray.set_status(STATUS_OPTIMIZED if all(target_ok.values()) else STATUS_ERROR)
+
+        def publish(rows: list[tuple[str, int, bool, str, bool, str]]) -> None:
+            nonlocal optimized_once
+            for name, pid, *_rest in rows:
+                found = tracker.lookup(pid)
+                exit_waiter.watch(pid, on_process_exited, create_time=found[1] if found else None)
+
+            for idx, (name, pid, ok_eff, msg_eff, ok_aff, msg_aff) in enumerate(rows, start=1):
+                target_ok[int(pid)] = bool(ok_eff and ok_aff)
+                try:
+                    gui_events.update_row(pid, name, ok_eff, msg_eff, ok_aff, msg_aff)
+                    gui_events.put(Progress(idx, len(rows)))
+                except Exception:
+                    pass
+            update_tray()
+
+            if not optimized_once:
+                optimized_once = True
+                try:
+                    gui_events.put(GuardState("optimized"))
+                except Exception:
+                    pass
+
+        def publish_cpu() -> None:
+            try:
+                gui_events.put(CpuInfo(int(logical_cpu_count()), optimizer.policy.affinity))
+            except Exception:
+                pass
+
+        def publish_io() -> None:
+            for pid, io in optimizer.io_reports().items():
+                try:
+                    rates = (io.read_before, io.write_before, io.read_after, io.write_after)
+                    gui_events.update_row_details(pid, io=rates)
+                except Exception:
+                    pass
+
+        def tune_threads() -> None:
+            for pid, threads in optimizer.tune_threads().items():
+                try:
+                    gui_events.update_row_details(pid, threads=threads)
+                except Exception:
+                    pass
+
+        def trim_memory() -> None:
+            trim = optimizer.trim_memory()
+            stats = optimizer.memory_stats(trim.pid) if trim is not None else None
+            if trim is None or stats is None:
+                return
+            try:
+                gui_events.update_row_details(trim.pid, mem=(stats[0], stats[1], trim.rss_before, trim.rss_after))
+            except Exception:
+                pass
+
+        def apply_reservation() -> bool:
+            rows = optimizer.reserve(games.reserved())
+            if rows:
+                publish_cpu()
+                publish(rows)
+            return bool(rows)
+
+        def update_game(snap) -> None:
+            game = games.detect(snap)
+            if not games.set_game(game):
+                return
+            if game is not None:
+                exit_waiter.watch(game.pid, on_process_exited, create_time=game.create_time)
+            apply_reservation()
+
+        def handle_exits(pids: list[int]) -> bool:
+            """Returns False when the launcher is gone for good."""
+            launcher_exited = False
+            for pid in pids:
+                game = games.game
+                if game is not None and pid == game.pid:
+                    games.set_game(None)
+                    apply_reservation()
+                    continue
+                if pid in launcher_pids:
+                    launcher_pids.discard(pid)
+                    found = tracker.lookup(pid)
+                    exited_launchers[pid] = found[1] if found else None
+                    launcher_exited = True
+                    continue
+                optimizer.forget(pid)
+                target_ok.pop(int(pid), None)
+                update_tray()
+                try:
+                    gui_events.remove_row(pid)
+                except Exception:
+                    pass
+            if launcher_exited and not launcher_pids:
+                # WeGame may have handed over to a new instance of itself.
+                alive = live_launchers(get_snapshot(max_age=0))
+                if not alive:
+                    return False
+                watch_launcher(alive)
+            return True
+
+        def publish_stats() -> None:
+            try:
+                gui_events.put(Stats(scheduler.stats()))
+            except Exception:
+                pass
+
+        # Scans and drift checks back off while nothing changes (antiace.scheduler).
+        scheduler = MonitorScheduler(
+            verify_base=optimizer.verify_interval,
+            thread_wakeups=lambda: watcher.wakeups + exit_waiter.wakeups,
+        )
+
         try:
-            optimized_once = False
             while not stop_event.is_set():
-                if not is_wegame_running():
-                    # If wegame is gone, we exit. We do NOT restart endlessly.
-                    stop_event.set()
-                    gui_events.put(("ctl", "quit"))
-                    state["value"] = AppState.EXITING
-                    break
-
-                rows = optimizer.optimize_by_names(target_names)
-                if rows:
-                    # Ensure the table can resize/update without relying on GUI scan.
-                    try:
-                        gui_events.put(("bg_found", [(name, pid) for (name, pid, *_rest) in rows]))
-                    except Exception:
-                        pass
-
-                    for idx, (name, pid, ok_eff, msg_eff, ok_aff, msg_aff) in enumerate(rows, start=1):
-                        try:
-                            gui_events.put(("row_update", name, pid, ok_eff, msg_eff, ok_aff, msg_aff, idx, len(rows)))
-                        except Exception:
-                            pass
-
-                    if not optimized_once:
-                        optimized_once = True
-                        try:
-                            gui_events.put(("guard", "optimized"))
-                        except Exception:
-                            pass
-
-                # Sleep in small increments so exit is responsive.
-                for _ in range(30):
-                    if stop_event.is_set():
+                now = time.monotonic()
+                if scheduler.scan_due(now):
+                    # Anything reported before this refresh is covered by it.
+                    drain(started_pids)
+                    # One enumeration per scan, shared by the launcher check, the optimizer
+                    # and any GUI scan that happens shortly after.
+                    snap = get_snapshot(max_age=0)
+                    launchers = live_launchers(snap)
+                    if not launchers:
+                        quit_app()
                         break
-                    time.sleep(1)
+                    watch_launcher(launchers)
+                    update_game(snap)
+
+                    rows = optimizer.optimize_matching(snapshot=snap)
+                    if rows:
+                        publish(rows)
+                    # Without an exit handle on the launcher, the scan is what notices it exited.
+                    scheduler.scanned(
+                        frozenset(launchers) | frozenset(pid for _n, pid, _r in optimizer.matched()),
+                        backoff=bool(launcher_pids),
+                    )
+                    continue
+
+                if scheduler.verify_due(now):
+                    rows = optimizer.check_drift()
+                    if rows:
+                        publish(rows)
+                    changed = bool(rows)
+                    games.sample(frozenset(optimizer.policy.affinity or ()))
+                    changed = apply_reservation() or changed
+                    rows = optimizer.rebalance()
+                    if rows:
+                        publish_cpu()
+                        publish(rows)
+                        changed = True
+                    # Reporting and trims can wait while the system is busy.
+                    if not scheduler.defer(now):
+                        publish_io()
+                        trim_memory()
+                        tune_threads()
+                    scheduler.verified(changed)
+                    publish_stats()
+                    continue
+
+                # Wait for the next scan or drift check, handling start/exit events in between.
+                woke = wake_event.wait(max(0.0, scheduler.next_deadline() - now))
+                scheduler.wakeup()
+                if not woke:
+                    continue
+                wake_event.clear()
+                exited = drain(exited_pids)
+                if exited:
+                    scheduler.churn()
+                if not handle_exits(exited):
+                    quit_app()
+                    break
+                pids = drain(started_pids)
+                if pids and not stop_event.is_set():
+                    rows = optimizer.optimize_started(pids)
+                    if rows:
+                        publish(rows)
+                    # A restarted launcher needs its own exit handle.
+                    relevant = bool(rows)
+                    game_started = False
+                    for pid in pids:
+                        found = tracker.lookup(pid)
+                        if found and found[0].lower() == WEGAME_EXE:
+                            watch_launcher([pid])
+                            relevant = True
+                        elif found and games.is_game_name(found[0]):
+                            game_started = True
+                    if game_started:
+                        update_game(get_snapshot(max_age=0))
+                    if relevant or game_started:
+                        scheduler.churn()
         except Exception:
             # Never crash the app due to monitor issues.
             pass
@@ -165,16 +489,21 @@ def run_background() -> int:
     t.start()
 
     try:
-        # Run the GUI in the main thread (Tk requirement on Windows).
-        from .gui import run_gui
-
-        return run_gui(with_tray=False, events=gui_events, start_hidden=True, close_to_tray=True)
+        # The GUI (when shown) runs in the main thread (Tk requirement on Windows).
+        return serve_gui(gui_events, stop_event, teardown_after=cfg.gui_teardown_after)
     finally:
         stop_event.set()
+        wake_event.set()
+        watcher.stop()
+        exit_waiter.stop()
+        if control is not None:
+            control.stop()
         tray.stop()
         try:
             t.join(timeout=2)
         except Exception:
             pass
+        # Lift hard caps (cgroups / job objects) so targets are not left capped without us.
+        optimizer.release_all()
 
     return 0
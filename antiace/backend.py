@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import abc
+import functools
+import os
+import sys
+
+from . import linux, windows
+from .config import load_config
+from .limits import CpuLimiter, default_limiter
+from .policy import STEP_CPU_CAP, STEP_IO_MAX, STEP_MEMORY_HIGH, ApplyResult, Policy
+
+
+class PlatformBackend(abc.ABC):
+    """Applies a Policy to a process and checks it for drift on one platform.
+
+    The hard CPU cap, disk bandwidth and memory limit steps are delegated to a
+    `CpuLimiter` (antiace.limits).
+    """
+
+    name = "base"
+    # Policy steps the platform module applies itself.
+    _native_steps: tuple[str, ...] = ()
+
+    def __init__(self, limiter: CpuLimiter | None = None) -> None:
+        self.limiter = limiter if limiter is not None else CpuLimiter()
+        self._can_cap = self.limiter.available()
+        self._can_limit_io = self.limiter.io_available()
+        self._can_limit_memory = self.limiter.memory_available()
+
+    @property
+    def steps(self) -> tuple[str, ...]:
+        """Policy steps this backend can apply; others are ignored by apply_policy."""
+        return (
+            self._native_steps
+            + ((STEP_CPU_CAP,) if self._can_cap else ())
+            + ((STEP_IO_MAX,) if self._can_limit_io else ())
+            + ((STEP_MEMORY_HIGH,) if self._can_limit_memory else ())
+        )
+
+    @property
+    def can_trim(self) -> bool:
+        """Whether trim_memory() can free a target's resident memory here."""
+        return False
+
+    @abc.abstractmethod
+    def _apply(self, pid: int, policy: Policy) -> ApplyResult:
+        """Apply the native steps of `policy` (not the limiter's)."""
+
+    @abc.abstractmethod
+    def _detect(self, pid: int, policy: Policy, skip_threads: frozenset[int]) -> tuple[bool, list[str] | str]:
+        """Drifted native steps of `policy`, in the `detect_drift` return format."""
+
+    def tune_thread(self, tid: int, *, priority: str | None = None, cpu: int | None = None) -> tuple[bool, str]:
+        """Set one thread's priority and preferred CPU (antiace.threads)."""
+        return False, "thread tuning not supported on this platform"
+
+    def apply_policy(self, pid: int, policy: Policy, *, name: str = "") -> ApplyResult:
+        result = self._apply(pid, policy)
+        if policy.cpu_cap is not None and self._can_cap:
+            result.add(STEP_CPU_CAP, *self.limiter.apply(pid, name or "target", policy.cpu_cap))
+        if policy.io_max is not None and self._can_limit_io:
+            result.add(STEP_IO_MAX, *self.limiter.apply_io(pid, name or "target", *policy.io_max))
+        if policy.memory_high is not None and self._can_limit_memory:
+            result.add(STEP_MEMORY_HIGH, *self.limiter.apply_memory(pid, name or "target", policy.memory_high))
+        return result
+
+    def detect_drift(
+        self, pid: int, policy: Policy, *, skip_threads: frozenset[int] = frozenset()
+    ) -> tuple[bool, list[str] | str]:
+        """Returns (ok, drifted step names) or (False, error message) if the state cannot be read.
+
+        `skip_threads` are threads tuned on their own, whose priority is expected to differ.
+        """
+        ok, drifted = self._detect(pid, policy, skip_threads)
+        if ok and isinstance(drifted, list) and policy.cpu_cap is not None and self._can_cap:
+            if self.limiter.check(pid, policy.cpu_cap) is False:
+                drifted.append(STEP_CPU_CAP)
+        if ok and isinstance(drifted, list) and policy.io_max is not None and self._can_limit_io:
+            if self.limiter.check_io(pid, *policy.io_max) is False:
+                drifted.append(STEP_IO_MAX)
+        if ok and isinstance(drifted, list) and policy.memory_high is not None and self._can_limit_memory:
+            if self.limiter.check_memory(pid, policy.memory_high) is False:
+                drifted.append(STEP_MEMORY_HIGH)
+        return ok, drifted
+
+    def trim_memory(self, pid: int, *, name: str = "", nbytes: int = 0) -> tuple[bool, str]:
+        """Ask the OS to page out up to `nbytes` of the target's resident memory."""
+        return False, "memory trimming not supported on this platform"
+
+    def release(self, pid: int) -> None:
+        """Undo per-process state kept outside the process (e.g. cgroup membership)."""
+        try:
+            self.limiter.release(pid)
+        except Exception:
+            pass
+
+    def release_all(self) -> None:
+        try:
+            self.limiter.release_all()
+        except Exception:
+            pass
+
+
+class WindowsBackend(PlatformBackend):
+    """SetPriorityClass, power throttling, affinity, I/O and memory priority, job object caps (psutil elsewhere)."""
+
+    name = "windows"
+    _native_steps = windows._SUPPORTED_STEPS
+
+    def _apply(self, pid: int, policy: Policy) -> ApplyResult:
+        return windows.apply_policy(pid, policy)
+
+    def _detect(self, pid: int, policy: Policy, skip_threads: frozenset[int]) -> tuple[bool, list[str] | str]:
+        # Only the process-wide state is checked; thread priorities never show up as drift.
+        return windows._detect_policy_drift(pid, policy)
+
+    def tune_thread(self, tid: int, *, priority: str | None = None, cpu: int | None = None) -> tuple[bool, str]:
+        return windows.tune_thread(tid, priority, cpu)
+
+    @property
+    def can_trim(self) -> bool:
+        return windows._kernel32() is not None
+
+    def trim_memory(self, pid: int, *, name: str = "", nbytes: int = 0) -> tuple[bool, str]:
+        # The whole working set is trimmed; there is no way to ask for a given amount.
+        return windows.trim_working_set(pid)
+
+
+class LinuxBackend(PlatformBackend):
+    """Wine/Proton targets on Linux: SCHED_IDLE + nice, sched_setaffinity, ioprio_set, cgroup v2 limits."""
+
+    name = "linux"
+    _native_steps = linux._SUPPORTED_STEPS
+
+    def _apply(self, pid: int, policy: Policy) -> ApplyResult:
+        return linux.apply_policy(pid, policy)
+
+    def _detect(self, pid: int, policy: Policy, skip_threads: frozenset[int]) -> tuple[bool, list[str] | str]:
+        return linux._detect_policy_drift(pid, policy, skip_threads)
+
+    def tune_thread(self, tid: int, *, priority: str | None = None, cpu: int | None = None) -> tuple[bool, str]:
+        return linux.tune_thread(tid, priority, cpu)
+
+
+class UnsupportedBackend(PlatformBackend):
+    """Platforms without a backend (macOS, BSD): nothing is written, every step fails with the reason."""
+
+    name = "unsupported"
+
+    @property
+    def reason(self) -> str:
+        return f"not supported on {sys.platform}"
+
+    def _apply(self, pid: int, policy: Policy) -> ApplyResult:
+        result = ApplyResult(pid)
+        result.fail_all(policy.steps(), self.reason)
+        return result
+
+    def _detect(self, pid: int, policy: Policy, skip_threads: frozenset[int]) -> tuple[bool, list[str] | str]:
+        return False, self.reason
+
+
+@functools.lru_cache(maxsize=1)
+def get_backend() -> PlatformBackend:
+    limiter = default_limiter(weight=load_config().cpu_weight)
+    if sys.platform.startswith("linux"):
+        return LinuxBackend(limiter)
+    if os.name == "nt":
+        return WindowsBackend(limiter)
+    return UnsupportedBackend(limiter)
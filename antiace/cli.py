@@ -1,12 +1,256 @@
 from __future__ import annotations
 
-from .processes import search_process
-from .windows import _set_processor_affinity_last_cpu, _set_windows_efficiency_mode
+import json
+
+from .paths import read_config_data
+from .processes import get_snapshot
+from .wegame import GUARD_PROCESSES
+
+
+def run_status() -> int:
+    """Print the running background instance's view of the targets (no scan of our own)."""
+    from .instance import request
+
+    status = request({"cmd": "status"})
+    if status is None:
+        print("not running")
+        return 1
+    if not status.get("ok"):
+        print(f"error: {status.get('error')}")
+        return 1
+
+    print(f"background pid={status.get('pid')} wegame={status.get('wegame')} guard_cpus={status.get('guard_cpus')}")
+    targets = status.get("targets") or []
+    if not targets:
+        print("not found")
+    for target in targets:
+        for step in ("efficiency", "affinity"):
+            result = target.get(step) or {}
+            ok = "ok" if result.get("ok") else "failed"
+            print(f"{target.get('name')} pid={target.get('pid')} {step}={ok} ({result.get('message')})")
+    return 0
+
+
+def _emit_watch(record: dict, *, as_json: bool) -> None:
+    if as_json:
+        line = json.dumps(record, ensure_ascii=False)
+    else:
+        parts = [record["ts"], record["event"]]
+        if "name" in record:
+            parts.append(f"{record['name']} pid={record['pid']}")
+        for step in ("efficiency", "affinity"):
+            if step in record:
+                result = record[step]
+                parts.append(f"{step}={'ok' if result['ok'] else 'failed'} ({result['message']})")
+        if "state" in record:
+            parts.append(record["state"])
+        line = " ".join(str(p) for p in parts)
+    print(line, flush=True)
+
+
+def run_watch(*, as_json: bool = False, interval: float = 5.0) -> int:
+    """Keep the targets optimized and print one record per event until interrupted.
+
+    Runs the background optimizer (first apply, drift correction, exits) without
+    tray, GUI or WeGame handling. Events: `found`, `applied`, `drift`, `exited`,
+    `launcher` (WeGame running / not_running) and a final `stopped`; with
+    `as_json` each is one NDJSON line, e.g.
+    `{"ts": "...", "event": "applied", "name": ..., "pid": ..., "efficiency": {"ok": ..., "message": ...}, ...}`.
+
+    `interval` is the drift-check period; full scans run every `interval` too
+    unless process start events are available, then every 30 s as a safety net.
+    """
+    # Imported here: the one-shot CLI must stay cheap (scripts/bench_startup.py).
+    import os
+    import queue
+    import signal
+    import sys
+    import threading
+    import time
+    from datetime import datetime, timezone
+
+    from .config import load_config
+    from .optimizer import optimizer_from_config
+    from .processes import get_tracker
+    from .scheduler import MonitorScheduler
+    from .waiter import start_exit_waiter
+    from .watcher import start_watcher
+    from .wegame import WEGAME_EXE
+
+    interval = max(0.5, float(interval))
+    stop_event = threading.Event()
+    wake_event = threading.Event()
+    started_pids: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+    exited_pids: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+
+    def emit(event: str, **fields: object) -> None:
+        record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "event": event, **fields}
+        try:
+            _emit_watch(record, as_json=as_json)
+        except (BrokenPipeError, ValueError):
+            # The reader went away (`| head`): stop, and keep the flush at exit from failing too.
+            stop_event.set()
+            wake_event.set()
+            try:
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            except Exception:
+                pass
+
+    def emit_rows(event: str, rows: list[tuple[str, int, bool, str, bool, str]]) -> None:
+        for name, pid, ok_eff, msg_eff, ok_aff, msg_aff in rows:
+            emit(
+                event,
+                name=name,
+                pid=pid,
+                efficiency={"ok": bool(ok_eff), "message": msg_eff},
+                affinity={"ok": bool(ok_aff), "message": msg_aff},
+            )
+
+    def on_signal(_signum, _frame) -> None:
+        stop_event.set()
+        wake_event.set()
+
+    def on_process_started(pid: int) -> None:
+        started_pids.put(pid)
+        wake_event.set()
+
+    def on_process_exited(pid: int) -> None:
+        exited_pids.put(pid)
+        wake_event.set()
+
+    def drain(q: "queue.SimpleQueue[int]") -> list[int]:
+        pids: list[int] = []
+        try:
+            while True:
+                pids.append(q.get_nowait())
+        except queue.Empty:
+            pass
+        return list(dict.fromkeys(pids))
+
+    previous: dict[int, object] = {}
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        sig = getattr(signal, name, None)
+        if sig is not None:
+            try:
+                previous[sig] = signal.signal(sig, on_signal)
+            except (OSError, ValueError):
+                pass
+
+    cfg = load_config()
+    optimizer = optimizer_from_config(cfg, verify_after_seconds=interval)
+    tracker = get_tracker()
+    rules = optimizer.rules
+    watcher = start_watcher(
+        on_process_started, wanted=lambda name: name.lower() == WEGAME_EXE or rules.is_candidate(name)
+    )
+    exit_waiter = start_exit_waiter()
+    # Fixed cadence: --interval is what the caller asked for, so no back-off.
+    scheduler = MonitorScheduler(
+        scan_base=max(interval, 30.0) if watcher.event_driven else interval,
+        verify_base=interval,
+        factor=1.0,
+    )
+    # pid -> name of every target reported as found and not yet exited.
+    targets: dict[int, str] = {}
+    launchers: set[int] = set()
+    launcher_state: str | None = None
+
+    def set_launcher_state(running: bool) -> None:
+        nonlocal launcher_state
+        state = "running" if running else "not_running"
+        if state != launcher_state:
+            launcher_state = state
+            emit("launcher", state=state)
+
+    def track(rows: list[tuple[str, int, bool, str, bool, str]]) -> None:
+        for name, pid, *_rest in rows:
+            if pid not in targets:
+                targets[pid] = name
+                emit("found", name=name, pid=pid)
+                found = tracker.lookup(pid)
+                exit_waiter.watch(pid, on_process_exited, create_time=found[1] if found else None)
+        emit_rows("applied", rows)
+
+    def watch_launchers(pids: list[int]) -> None:
+        for pid in pids:
+            if pid not in launchers:
+                found = tracker.lookup(pid)
+                if exit_waiter.watch(pid, on_process_exited, create_time=found[1] if found else None):
+                    launchers.add(pid)
+
+    try:
+        while not stop_event.is_set():
+            now = time.monotonic()
+            if scheduler.scan_due(now):
+                drain(started_pids)
+                snap = get_snapshot(max_age=0)
+                running = snap.pids(WEGAME_EXE)
+                set_launcher_state(bool(running))
+                watch_launchers(running)
+                track(optimizer.optimize_matching(snapshot=snap))
+                scheduler.scanned(frozenset(pid for _n, pid, _r in optimizer.matched()))
+                continue
+
+            if scheduler.verify_due(now):
+                rows = optimizer.check_drift()
+                emit_rows("drift", rows)
+                moved = optimizer.rebalance()
+                emit_rows("applied", moved)
+                scheduler.verified(bool(rows or moved))
+                continue
+
+            # Short slices: a blocked wait would delay Ctrl+C on Windows.
+            woke = wake_event.wait(min(1.0, max(0.0, scheduler.next_deadline() - now)))
+            if not woke:
+                continue
+            wake_event.clear()
+            for pid in drain(exited_pids):
+                if pid in launchers:
+                    launchers.discard(pid)
+                    if not launchers:
+                        running = get_snapshot(max_age=0).pids(WEGAME_EXE)
+                        set_launcher_state(bool(running))
+                        watch_launchers(running)
+                    continue
+                name = targets.pop(pid, None)
+                optimizer.forget(pid)
+                if name is not None:
+                    emit("exited", name=name, pid=pid)
+            pids = drain(started_pids)
+            if pids and not stop_event.is_set():
+                track(optimizer.optimize_started(pids))
+                for pid in pids:
+                    found = tracker.lookup(pid)
+                    if found and found[0].lower() == WEGAME_EXE:
+                        set_launcher_state(True)
+                        watch_launchers([pid])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        exit_waiter.stop()
+        # Lift hard caps (cgroups / job objects) so targets are not left capped without us.
+        optimizer.release_all()
+        for sig, handler in previous.items():
+            try:
+                signal.signal(sig, handler)
+            except (OSError, ValueError):
+                pass
+    emit("stopped")
+    return 0
 
 
 def run_cli() -> int:
-    target_processes = ["SGuard64.exe", "SGuardSvc64.exe"]
-    found_processes = search_process(target_processes)
+    snapshot = get_snapshot(max_age=0)
+    raw_rules = read_config_data().get("rules")
+    if isinstance(raw_rules, list) and raw_rules:
+        # Only configured rules need the rule engine; the built-in guard names are a name lookup.
+        from .rules import load_rules
+
+        rules = load_rules(raw_rules)
+        found_processes = [(name, pid, rule.policy) for name, pid, rule in rules.find(snapshot)]
+    else:
+        found_processes = [(name, pid, None) for name, pid in snapshot.find(GUARD_PROCESSES)]
 
     if not found_processes:
         print("not found")
@@ -14,14 +258,35 @@ def run_cli() -> int:
 
     print("find")
     # 输出所有匹配到的 PID（可能同时存在多个）
-    print(" ".join(str(pid) for _, pid in found_processes))
+    print(" ".join(str(pid) for _name, pid, _overrides in found_processes))
+
+    # Imported only once there is something to apply: "not found" is the common
+    # answer for scheduled runs and needs nothing beyond the process scan.
+    from .backend import get_backend
+    from .config import load_config
+    from .policy import guard_policy
+
+    cfg = load_config()
+    backend = get_backend()
+    # No game-core reservation here: finding where the game runs takes a sampling
+    # interval, which the one-shot run does not wait for; the background monitor does it.
+    policy = guard_policy(cfg.guard_cpus)
+
+    # Hard limits (cpu_caps / io_limits / memory_limits, rule caps) move the target into a
+    # cgroup or job object that only a running monitor releases again, so a one-shot run
+    # applies priorities and affinity only and says which limits it left out.
+    limited = {n.lower() for n in (*cfg.cpu_caps, *cfg.io_limits, *cfg.memory_limits)}
+    for name, pid, overrides in found_processes:
+        target_policy = policy if overrides is None else overrides.override(policy)
+        result = backend.apply_policy(pid, target_policy, name=name)
+        if name.lower() in limited or (overrides is not None and overrides.has_limits):
+            print(f"{name} pid={pid} limits=skipped (enforced by the background monitor or --cli --watch)")
 
-    for name, pid in found_processes:
-        ok, msg = _set_windows_efficiency_mode(pid)
+        ok, msg = result.efficiency()
         status = "ok" if ok else "failed"
         print(f"{name} pid={pid} efficiency={status} ({msg})")
 
-        ok, msg = _set_processor_affinity_last_cpu(pid)
+        ok, msg = result.affinity()
         status = "ok" if ok else "failed"
         print(f"{name} pid={pid} affinity={status} ({msg})")
 
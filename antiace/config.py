@@ -1,40 +1,142 @@
 from __future__ import annotations
 
 import json
-import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from .paths import config_path, read_config_data
+
 
 @dataclass(frozen=True)
 class AppConfig:
     wegame_path: str | None = None
+    # Logical CPUs to pin guard processes to; None = pick from the CPU topology.
+    guard_cpus: tuple[int, ...] | None = None
+    # Move the guard to the least loaded eligible CPU at runtime (antiace.placement).
+    dynamic_placement: bool = False
+    # Game executables whose cores the guard must stay off; empty = heaviest WeGame child.
+    game_exes: tuple[str, ...] = ()
+    # Per-target CPU budget in percent of one logical CPU (antiace.controller), e.g. 2.0; 0 = fixed policy.
+    cpu_budget: float = 0.0
+    # Hard CPU cap per target name, in percent of one logical CPU (antiace.limits).
+    cpu_caps: dict[str, float] = field(default_factory=dict)
+    # cgroup v2 cpu.weight for capped targets on Linux (1-10000); None leaves the default.
+    cpu_weight: int | None = None
+    # Disk bandwidth limit per target name as [read, write] bytes/s (cgroup v2 io.max, Linux only); 0 = unlimited.
+    io_limits: dict[str, tuple[int, int]] = field(default_factory=dict)
+    # memory.high per target name in bytes (cgroup v2, Linux only).
+    memory_limits: dict[str, int] = field(default_factory=dict)
+    # Minimum seconds between working-set trims of one target (antiace.memory); 0 = never trim.
+    memory_trim_interval: float = 600.0
+    # Lower only the hottest threads of each target on top of the process policy (antiace.threads).
+    thread_tuning: bool = True
+    # Background mode builds the GUI on the first "显示主页面" and destroys it after this many seconds
+    # hidden in the tray; 0 = keep it once built.
+    gui_teardown_after: float = 300.0
+    # Target rules (antiace.rules), kept as their config entries; empty = the built-in guard names.
+    rules: tuple[dict, ...] = ()
 
 
-def _config_dir() -> Path:
-    appdata = os.environ.get("APPDATA")
-    if appdata:
-        return Path(appdata) / "antiace"
-    return Path.home() / ".antiace"
+def load_config() -> AppConfig:
+    data = read_config_data()
+    if not data:
+        return AppConfig()
 
+    wegame_path = data.get("wegame_path")
+    if not (isinstance(wegame_path, str) and wegame_path.strip()):
+        wegame_path = None
+    else:
+        wegame_path = wegame_path.strip()
 
-def config_path() -> Path:
-    return _config_dir() / "config.json"
+    guard_cpus = data.get("guard_cpus")
+    if isinstance(guard_cpus, list) and guard_cpus and all(isinstance(c, int) and c >= 0 for c in guard_cpus):
+        guard_cpus = tuple(sorted(set(guard_cpus)))
+    else:
+        guard_cpus = None
 
+    dynamic_placement = data.get("dynamic_placement") is True
 
-def load_config() -> AppConfig:
-    path = config_path()
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-    except FileNotFoundError:
-        return AppConfig()
-    except Exception:
-        return AppConfig()
+    game_exes = data.get("game_exes")
+    if isinstance(game_exes, list):
+        game_exes = tuple(n.strip() for n in game_exes if isinstance(n, str) and n.strip())
+    else:
+        game_exes = ()
 
-    wegame_path = data.get("wegame_path")
-    if isinstance(wegame_path, str) and wegame_path.strip():
-        return AppConfig(wegame_path=wegame_path.strip())
-    return AppConfig()
+    cpu_budget = data.get("cpu_budget", AppConfig.cpu_budget)
+    if isinstance(cpu_budget, bool) or not isinstance(cpu_budget, (int, float)) or cpu_budget < 0:
+        cpu_budget = AppConfig.cpu_budget
+
+    cpu_caps: dict[str, float] = {}
+    raw_caps = data.get("cpu_caps")
+    if isinstance(raw_caps, dict):
+        for name, cap in raw_caps.items():
+            if isinstance(name, str) and isinstance(cap, (int, float)) and not isinstance(cap, bool) and cap > 0:
+                cpu_caps[name] = float(cap)
+
+    cpu_weight = data.get("cpu_weight")
+    if isinstance(cpu_weight, bool) or not isinstance(cpu_weight, int) or not 1 <= cpu_weight <= 10000:
+        cpu_weight = None
+
+    io_limits: dict[str, tuple[int, int]] = {}
+    raw_io = data.get("io_limits")
+    if isinstance(raw_io, dict):
+        for name, limit in raw_io.items():
+            if (
+                isinstance(name, str)
+                and isinstance(limit, list)
+                and len(limit) == 2
+                and all(isinstance(v, int) and not isinstance(v, bool) and v >= 0 for v in limit)
+                and any(limit)
+            ):
+                io_limits[name] = (limit[0], limit[1])
+
+    memory_limits: dict[str, int] = {}
+    raw_memory = data.get("memory_limits")
+    if isinstance(raw_memory, dict):
+        for name, high in raw_memory.items():
+            if isinstance(name, str) and isinstance(high, int) and not isinstance(high, bool) and high > 0:
+                memory_limits[name] = high
+
+    memory_trim_interval = data.get("memory_trim_interval", AppConfig.memory_trim_interval)
+    if (
+        isinstance(memory_trim_interval, bool)
+        or not isinstance(memory_trim_interval, (int, float))
+        or memory_trim_interval < 0
+    ):
+        memory_trim_interval = AppConfig.memory_trim_interval
+
+    thread_tuning = data.get("thread_tuning") is not False
+
+    gui_teardown_after = data.get("gui_teardown_after", AppConfig.gui_teardown_after)
+    if (
+        isinstance(gui_teardown_after, bool)
+        or not isinstance(gui_teardown_after, (int, float))
+        or gui_teardown_after < 0
+    ):
+        gui_teardown_after = AppConfig.gui_teardown_after
+
+    raw_rules = data.get("rules")
+    if isinstance(raw_rules, list):
+        # Only the shape is checked here; antiace.rules skips entries it can't compile.
+        rules = tuple(r for r in raw_rules if isinstance(r, dict) and isinstance(r.get("name"), str))
+    else:
+        rules = ()
+
+    return AppConfig(
+        wegame_path=wegame_path,
+        guard_cpus=guard_cpus,
+        dynamic_placement=dynamic_placement,
+        game_exes=game_exes,
+        cpu_budget=float(cpu_budget),
+        cpu_caps=cpu_caps,
+        cpu_weight=cpu_weight,
+        io_limits=io_limits,
+        memory_limits=memory_limits,
+        memory_trim_interval=float(memory_trim_interval),
+        thread_tuning=thread_tuning,
+        gui_teardown_after=float(gui_teardown_after),
+        rules=rules,
+    )
 
 
 def save_config(cfg: AppConfig) -> None:
@@ -43,6 +145,18 @@ def save_config(cfg: AppConfig) -> None:
     data = {
         "version": 1,
         "wegame_path": cfg.wegame_path,
+        "guard_cpus": list(cfg.guard_cpus) if cfg.guard_cpus else None,
+        "dynamic_placement": cfg.dynamic_placement,
+        "game_exes": list(cfg.game_exes),
+        "cpu_budget": cfg.cpu_budget,
+        "cpu_caps": dict(cfg.cpu_caps),
+        "cpu_weight": cfg.cpu_weight,
+        "io_limits": {name: list(limit) for name, limit in cfg.io_limits.items()},
+        "memory_limits": dict(cfg.memory_limits),
+        "memory_trim_interval": cfg.memory_trim_interval,
+        "thread_tuning": cfg.thread_tuning,
+        "gui_teardown_after": cfg.gui_teardown_after,
+        "rules": [dict(r) for r in cfg.rules],
     }
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
@@ -0,0 +1,233 @@
+"""Closed-loop CPU budget control for guard processes.
+
+Instead of applying the full policy once, `BudgetController` measures each
+target's CPU usage every interval (`psutil` `cpu_times` deltas, in percent
+of one logical CPU) and moves it along an escalation ladder:
+
+    0  normal priority
+    1  idle priority
+    2  + power throttling
+    3  + affinity (the guard CPUs)
+    4  + hard CPU cap (at the budget)
+
+A new target starts at level 3, the full fixed policy the monitor applied
+before this controller existed, so turning the controller on never leaves a
+guard less restricted than before at the moment it is found. It escalates
+one level per interval while usage exceeds the budget and relaxes one level
+after usage has stayed well below it for a while, so a guard that stays
+quiet gives its CPU and power settings back. Below level 3 a target may run
+on every CPU except the ones reserved for the game (`reserve()`). Levels
+whose step the backend cannot apply (e.g. power throttling on Linux) are
+skipped. The monitor only runs the controller when `cpu_budget` is set.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+import psutil
+
+from .policy import (
+    PRIORITY_IDLE,
+    PRIORITY_NORMAL,
+    STEP_AFFINITY,
+    STEP_CPU_CAP,
+    STEP_POWER_THROTTLING,
+    STEP_PRIORITY,
+    Policy,
+    logical_cpu_count,
+)
+
+LEVEL_NORMAL = 0
+LEVEL_IDLE = 1
+LEVEL_THROTTLED = 2
+LEVEL_PINNED = 3
+LEVEL_CAPPED = 4
+
+# Step each level adds on top of the previous one.
+_LEVEL_STEPS = {
+    LEVEL_IDLE: STEP_PRIORITY,
+    LEVEL_THROTTLED: STEP_POWER_THROTTLING,
+    LEVEL_PINNED: STEP_AFFINITY,
+    LEVEL_CAPPED: STEP_CPU_CAP,
+}
+
+
+@dataclass
+class _Target:
+    level: int
+    cpu_seconds: float | None = None
+    measured_at: float | None = None
+    usage: float | None = None
+    # Consecutive intervals over budget / well under budget.
+    over: int = 0
+    under: int = 0
+
+
+@dataclass(frozen=True)
+class LevelChange:
+    pid: int
+    old_level: int
+    new_level: int
+    usage: float
+    # Only the settings that differ between the two levels.
+    policy: Policy
+
+    def describe(self, budget: float) -> str:
+        verb = "escalated" if self.new_level > self.old_level else "relaxed"
+        return f"budget {verb} {self.old_level}->{self.new_level} (cpu={self.usage:.1f}% budget={budget:g}%)"
+
+
+class BudgetController:
+    def __init__(
+        self,
+        *,
+        budget: float = 2.0,
+        supported_steps: tuple[str, ...] | None = None,
+        start_level: int = LEVEL_PINNED,
+        min_level: int = LEVEL_IDLE,
+        relax_ratio: float = 0.5,
+        escalate_after: int = 1,
+        relax_after: int = 6,
+    ) -> None:
+        # Budget in percent of one logical CPU.
+        self.budget = float(budget)
+        supported = set(supported_steps) if supported_steps is not None else set(_LEVEL_STEPS.values())
+        self._levels = [LEVEL_NORMAL] + [lvl for lvl, step in sorted(_LEVEL_STEPS.items()) if step in supported]
+        self._supported = supported
+        self._can_cap = STEP_CPU_CAP in supported
+        self._start = self._nearest(start_level)
+        self._min = self._nearest(min_level)
+        self._relax_below = self.budget * float(relax_ratio)
+        self._escalate_after = max(1, int(escalate_after))
+        self._relax_after = max(1, int(relax_after))
+        self._targets: dict[int, _Target] = {}
+        # The game's cores (GameMonitor.reserved()); unpinned levels stay off them too.
+        self._reserved: frozenset[int] = frozenset()
+
+    def _nearest(self, level: int) -> int:
+        """Highest available level not above `level`."""
+        return max(lvl for lvl in self._levels if lvl <= level)
+
+    @property
+    def max_level(self) -> int:
+        return self._levels[-1]
+
+    def level(self, pid: int) -> int:
+        target = self._targets.get(int(pid))
+        return target.level if target is not None else self._start
+
+    def usage(self, pid: int) -> float | None:
+        target = self._targets.get(int(pid))
+        return target.usage if target is not None else None
+
+    def forget(self, pid: int) -> None:
+        self._targets.pop(int(pid), None)
+
+    def reserve(self, cpus: frozenset[int]) -> None:
+        """Keep levels below LEVEL_PINNED off `cpus` as well."""
+        self._reserved = frozenset(cpus)
+
+    def level_policy(self, level: int, base: Policy, *, explicit: bool = True) -> Policy:
+        """Policy for `level`; `base` supplies the idle settings, guard CPUs and I/O and memory priority.
+
+        With explicit=False, settings below their level are left untouched (None)
+        instead of being reset, which is what a first apply wants. Affinity is
+        the exception: below LEVEL_PINNED it is always every CPU outside the
+        reservation, never the game's cores.
+        """
+        free = tuple(i for i in range(logical_cpu_count()) if i not in self._reserved) or None
+
+        def pick(on: bool, value, neutral):
+            if on:
+                return value
+            return neutral if explicit else None
+
+        return Policy(
+            priority=PRIORITY_IDLE if level >= LEVEL_IDLE else (PRIORITY_NORMAL if explicit else None),
+            power_throttling=pick(level >= LEVEL_THROTTLED, True, False) if base.power_throttling else None,
+            affinity=(base.affinity if level >= LEVEL_PINNED else free) if base.affinity else None,
+            io_priority=base.io_priority,
+            memory_priority=base.memory_priority,
+            cpu_cap=pick(level >= LEVEL_CAPPED, self.budget, 0.0) if self._can_cap else None,
+        )
+
+    def policy_for(self, pid: int, base: Policy) -> Policy:
+        """Policy for a target's first apply at its current level."""
+        pid = int(pid)
+        if pid not in self._targets:
+            self._targets[pid] = _Target(self._start)
+            self._measure(pid, self._targets[pid], time.monotonic())
+        return self.level_policy(self._targets[pid].level, base, explicit=False)
+
+    def current_policy(self, pid: int, base: Policy) -> Policy:
+        """Full policy the target should currently be at (used for drift checks)."""
+        return self.level_policy(self.level(pid), base, explicit=False)
+
+    @staticmethod
+    def _cpu_seconds(pid: int) -> float | None:
+        try:
+            t = psutil.Process(pid).cpu_times()
+        except psutil.Error:
+            return None
+        return float(t.user + t.system)
+
+    def _measure(self, pid: int, target: _Target, now: float) -> float | None:
+        cpu = self._cpu_seconds(pid)
+        usage = None
+        if cpu is not None and target.cpu_seconds is not None and target.measured_at is not None:
+            elapsed = now - target.measured_at
+            if elapsed > 0:
+                usage = max(0.0, (cpu - target.cpu_seconds) / elapsed * 100.0)
+        target.cpu_seconds = cpu
+        target.measured_at = now
+        if usage is not None:
+            target.usage = usage
+        return usage
+
+    def update(self, pid: int, base: Policy) -> LevelChange | None:
+        """Measure `pid` and return a level change to apply, if any."""
+        pid = int(pid)
+        target = self._targets.get(pid)
+        if target is None:
+            self.policy_for(pid, base)
+            return None
+        usage = self._measure(pid, target, time.monotonic())
+        if usage is None:
+            return None
+
+        if usage > self.budget:
+            target.over += 1
+            target.under = 0
+        elif usage < self._relax_below:
+            target.under += 1
+            target.over = 0
+        else:
+            target.over = target.under = 0
+
+        idx = self._levels.index(target.level)
+        new_level = target.level
+        if target.over >= self._escalate_after and idx + 1 < len(self._levels):
+            new_level = self._levels[idx + 1]
+        elif target.under >= self._relax_after and target.level > self._min:
+            new_level = self._levels[idx - 1]
+        if new_level == target.level:
+            return None
+
+        old = self.level_policy(target.level, base)
+        new = self.level_policy(new_level, base)
+        changed = [
+            step
+            for step, a, b in (
+                (STEP_PRIORITY, old.priority, new.priority),
+                (STEP_POWER_THROTTLING, old.power_throttling, new.power_throttling),
+                (STEP_AFFINITY, old.affinity, new.affinity),
+                (STEP_CPU_CAP, old.cpu_cap, new.cpu_cap),
+            )
+            if a != b and step in self._supported
+        ]
+        change = LevelChange(pid, target.level, new_level, usage, new.only(changed))
+        target.level = new_level
+        target.over = target.under = 0
+        return change
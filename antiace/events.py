@@ -0,0 +1,316 @@
+"""Event protocol between the worker/monitor threads and the Tk thread.
+
+Producers never talk to widgets. They either put typed events on a
+`GuiEvents` bus or update its row model (one `Row` per optimized process),
+from any thread. The Tk thread calls `drain()` once per tick and gets a
+single `Batch`:
+
+- `events`: pending events in order. An event class with a `key` is
+  coalesced: a newer event with the same key replaces the pending one, so
+  ten status changes between two ticks cost one label update. Events with
+  `key = None` (window control) are all delivered.
+- `rows` / `removed`: a diff of the row model since the previous batch,
+  carrying only rows whose values actually changed.
+
+`drain()` returns None without touching anything else when nothing is
+pending, so an idle tick costs one lock round-trip.
+
+Instead of polling, the Tk thread can register a waker (`set_waker`). It
+is called from the producing thread at most once between two drains. With
+`controls_only=True`, used while the window is withdrawn, only `Control`
+events wake it. Everything else just updates the pending state, because
+only the latest state matters. The GUI picks that up with `take_controls()`
+while hidden and with a single `drain()` once it is shown again.
+
+A GUI built after the producers started (or rebuilt after being torn down)
+calls `resync()` first, so that its first batch carries every row and the
+latest sticky event (CPU info, WeGame state, ...) of each kind.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
+from typing import ClassVar
+
+
+@dataclass(frozen=True)
+class Event:
+    # Events sharing a key replace each other while pending; None keeps every one.
+    key: ClassVar[str | None] = None
+    # State rather than news: the latest one is replayed to a freshly built GUI (`resync`).
+    sticky: ClassVar[bool] = False
+
+
+@dataclass(frozen=True)
+class Control(Event):
+    """Window control from the tray or the monitor: show / hide / quit."""
+
+    action: str
+
+
+@dataclass(frozen=True)
+class Status(Event):
+    key: ClassVar[str | None] = "status"
+    code: str
+    args: tuple = ()
+
+
+@dataclass(frozen=True)
+class Progress(Event):
+    key: ClassVar[str | None] = "progress"
+    done: int
+    total: int
+
+
+@dataclass(frozen=True)
+class Found(Event):
+    """Result of a scan started from the GUI: (name, pid) of every target."""
+
+    key: ClassVar[str | None] = "found"
+    found: tuple[tuple[str, int], ...]
+
+
+@dataclass(frozen=True)
+class Done(Event):
+    """A scan started from the GUI finished."""
+
+    key: ClassVar[str | None] = "done"
+
+
+@dataclass(frozen=True)
+class CpuInfo(Event):
+    key: ClassVar[str | None] = "cpu"
+    sticky: ClassVar[bool] = True
+    count: int
+    affinity: tuple[int, ...] | None
+
+
+@dataclass(frozen=True)
+class WegameState(Event):
+    key: ClassVar[str | None] = "wegame"
+    sticky: ClassVar[bool] = True
+    # unknown|running|not_running|starting|start_failed
+    state: str
+
+
+@dataclass(frozen=True)
+class GuardState(Event):
+    key: ClassVar[str | None] = "guard"
+    sticky: ClassVar[bool] = True
+    state: str
+
+
+@dataclass(frozen=True)
+class Stats(Event):
+    """Monitor statistics (antiace.scheduler)."""
+
+    key: ClassVar[str | None] = "stats"
+    sticky: ClassVar[bool] = True
+    stats: dict
+
+
+@dataclass(frozen=True)
+class Row:
+    name: str
+    pid: int
+    ok_eff: bool
+    msg_eff: str
+    ok_aff: bool
+    msg_aff: str
+    # (read before, write before, read after, write after) in bytes/s.
+    io: tuple | None = None
+    # (trims, bytes freed in total, RSS before and after the last trim).
+    mem: tuple | None = None
+    # ((tid, usage %, hot, tuning result), ...), busiest first.
+    threads: tuple | None = None
+
+
+@dataclass
+class Batch:
+    events: list[Event] = field(default_factory=list)
+    # pid -> latest value of every row that changed since the previous batch.
+    rows: dict[int, Row] = field(default_factory=dict)
+    removed: list[int] = field(default_factory=list)
+
+
+class GuiEvents:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: OrderedDict[object, Event] = OrderedDict()
+        # key -> latest sticky event, delivered or not.
+        self._latest: dict[str, Event] = {}
+        # Events that are never coalesced are keyed by a running number.
+        self._seq = 0
+        self._rows: dict[int, Row] = {}
+        self._dirty: set[int] = set()
+        self._removed: set[int] = set()
+        self._puts = 0
+        self._coalesced = 0
+        self._batches = 0
+        self._waker: Callable[[], None] | None = None
+        self._controls_only = False
+        # The waker was called and nobody drained since.
+        self._woken = False
+        self._wakeups = 0
+
+    def set_waker(self, waker: Callable[[], None] | None, *, controls_only: bool = False) -> None:
+        with self._lock:
+            self._waker = waker
+            self._controls_only = bool(controls_only)
+            self._woken = False
+            pending = any(isinstance(key, int) for key in self._pending) or (
+                not controls_only and (self._pending or self._dirty or self._removed)
+            )
+            wake = self._wake() if pending else None
+        if wake is not None:
+            wake()
+
+    def _wake(self, *, control: bool = True) -> Callable[[], None] | None:
+        """The waker to call (outside the lock), if this change should wake the consumer."""
+        if self._waker is None or self._woken or (self._controls_only and not control):
+            return None
+        self._woken = True
+        self._wakeups += 1
+        return self._waker
+
+    def put(self, event: Event) -> None:
+        with self._lock:
+            self._puts += 1
+            key = event.key
+            if key is None:
+                self._seq += 1
+                key = self._seq
+            elif key in self._pending:
+                self._coalesced += 1
+                del self._pending[key]
+            self._pending[key] = event
+            if event.sticky:
+                self._latest[key] = event
+            wake = self._wake(control=event.key is None)
+        if wake is not None:
+            wake()
+
+    def update_row(self, pid: int, name: str, ok_eff: bool, msg_eff: str, ok_aff: bool, msg_aff: str) -> None:
+        pid = int(pid)
+        with self._lock:
+            self._puts += 1
+            old = self._rows.get(pid)
+            fields = dict(
+                name=str(name), ok_eff=bool(ok_eff), msg_eff=str(msg_eff), ok_aff=bool(ok_aff), msg_aff=str(msg_aff)
+            )
+            wake = self._set(pid, old, Row(pid=pid, **fields) if old is None else replace(old, **fields))
+        if wake is not None:
+            wake()
+
+    def update_row_details(self, pid: int, **details: tuple | None) -> None:
+        """Attach io / mem / threads to an existing row; ignored for unknown pids."""
+        pid = int(pid)
+        wake = None
+        with self._lock:
+            self._puts += 1
+            old = self._rows.get(pid)
+            if old is not None:
+                changes = {k: tuple(v) if v is not None else None for k, v in details.items()}
+                wake = self._set(pid, old, replace(old, **changes))
+        if wake is not None:
+            wake()
+
+    def _set(self, pid: int, old: Row | None, new: Row) -> Callable[[], None] | None:
+        if new == old:
+            self._coalesced += 1
+            return None
+        self._rows[pid] = new
+        self._dirty.add(pid)
+        self._removed.discard(pid)
+        return self._wake(control=False)
+
+    def remove_row(self, pid: int) -> None:
+        pid = int(pid)
+        wake = None
+        with self._lock:
+            if self._rows.pop(pid, None) is not None:
+                self._dirty.discard(pid)
+                self._removed.add(pid)
+                wake = self._wake(control=False)
+        if wake is not None:
+            wake()
+
+    def clear_rows(self) -> None:
+        # Only called from the Tk thread, which drains next anyway: no wakeup.
+        with self._lock:
+            self._removed.update(self._rows)
+            self._rows.clear()
+            self._dirty.clear()
+
+    def resync(self) -> None:
+        """Make the next batch a full snapshot, for a GUI built from scratch."""
+        with self._lock:
+            for key, event in self._latest.items():
+                self._pending.setdefault(key, event)
+            self._dirty = set(self._rows)
+            self._removed.clear()
+
+    def snapshot(self) -> dict[str, object]:
+        """The current state as plain JSON-friendly data (`--cli status`)."""
+        with self._lock:
+            rows = sorted(self._rows.values(), key=lambda r: r.pid)
+            latest = dict(self._latest)
+        wegame = latest.get("wegame")
+        cpu = latest.get("cpu")
+        stats = latest.get("stats")
+        return {
+            "wegame": wegame.state if isinstance(wegame, WegameState) else "unknown",
+            "cpus": cpu.count if isinstance(cpu, CpuInfo) else None,
+            "guard_cpus": list(cpu.affinity) if isinstance(cpu, CpuInfo) and cpu.affinity else None,
+            "targets": [
+                {
+                    "name": r.name,
+                    "pid": r.pid,
+                    "efficiency": {"ok": r.ok_eff, "message": r.msg_eff},
+                    "affinity": {"ok": r.ok_aff, "message": r.msg_aff},
+                }
+                for r in rows
+            ],
+            "stats": dict(stats.stats) if isinstance(stats, Stats) else {},
+        }
+
+    def rows(self) -> dict[int, Row]:
+        """The current row model (not just the changes)."""
+        with self._lock:
+            return dict(self._rows)
+
+    def drain(self) -> Batch | None:
+        """Everything pending since the previous call as one batch; None if nothing is."""
+        with self._lock:
+            if not self._pending and not self._dirty and not self._removed:
+                return None
+            batch = Batch(
+                list(self._pending.values()),
+                {pid: self._rows[pid] for pid in self._dirty},
+                sorted(self._removed),
+            )
+            self._pending.clear()
+            self._dirty.clear()
+            self._removed.clear()
+            self._batches += 1
+            self._woken = False
+            return batch
+
+    def take_controls(self) -> list[Control]:
+        """Pending `Control` events only; everything else stays pending."""
+        with self._lock:
+            self._woken = False
+            keys = [key for key in self._pending if isinstance(key, int)]
+            return [self._pending.pop(key) for key in keys]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "puts": self._puts,
+                "coalesced": self._coalesced,
+                "batches": self._batches,
+                "wakeups": self._wakeups,
+            }
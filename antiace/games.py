@@ -0,0 +1,190 @@
+"""Detect the game being protected and the CPUs it needs.
+
+The game is either one of the configured executables or, if none are
+configured, the heaviest (most CPU time) descendant of the launcher. While
+it runs, `GameMonitor.sample()` accumulates which logical CPUs its threads
+ran on (per thread from `/proc/<pid>/task/*/stat` on Linux; elsewhere the
+game's own CPU time spread over the per-CPU busy time outside the guard's
+CPUs). `reserved()` returns the game's own affinity (when
+it restricts itself) plus the CPUs carrying a meaningful share of its load.
+Guard processes are never pinned to those CPUs.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+import psutil
+
+from .policy import logical_cpu_count
+from .processes import ProcessSnapshot
+from .wegame import GUARD_PROCESSES, WEGAME_EXE
+
+
+@dataclass(frozen=True)
+class Game:
+    name: str
+    pid: int
+    create_time: float | None
+
+
+def _thread_cpu_ticks(pid: int) -> dict[int, tuple[int, int]]:
+    """tid -> (processor last run on, utime + stime ticks), Linux only."""
+    ticks: dict[int, tuple[int, int]] = {}
+    base = f"/proc/{int(pid)}/task"
+    for tid in os.listdir(base):
+        try:
+            with open(f"{base}/{tid}/stat", "rb") as f:
+                raw = f.read()
+        except OSError:
+            continue
+        # Fields after "(comm)": state is field 3, so field n is at index n - 3.
+        fields = raw[raw.rfind(b")") + 2 :].split()
+        try:
+            ticks[int(tid)] = (int(fields[36]), int(fields[11]) + int(fields[12]))
+        except (IndexError, ValueError):
+            continue
+    return ticks
+
+
+class GameMonitor:
+    def __init__(
+        self,
+        game_names: list[str] | tuple[str, ...] = (),
+        *,
+        launcher: str = WEGAME_EXE,
+        ignore: tuple[str, ...] = GUARD_PROCESSES,
+        hot_share: float = 0.10,
+    ) -> None:
+        self._names = tuple(game_names)
+        self._name_keys = {n.lower() for n in self._names}
+        self._launcher = launcher
+        self._ignore = {n.lower() for n in ignore} | {launcher.lower()}
+        # A CPU is "hot" when it carried at least this share of the game's CPU time.
+        self._hot_share = float(hot_share)
+        self._game: Game | None = None
+        self._usage: dict[int, float] = {}
+        self._last_threads: dict[int, tuple[int, int]] = {}
+        self._last_cpu_times: list[float] | None = None
+        self._last_game_cpu: float | None = None
+
+    @property
+    def game(self) -> Game | None:
+        return self._game
+
+    def is_game_name(self, name: str) -> bool:
+        return name.lower() in self._name_keys
+
+    def detect(self, snapshot: ProcessSnapshot) -> Game | None:
+        """Find the running game: configured names first, else the heaviest launcher descendant."""
+        if self._names:
+            found = snapshot.find(self._names)
+            if not found:
+                return None
+            name, pid = found[0]
+            return Game(name, pid, snapshot.create_time(pid))
+
+        # The snapshot's parent links replace a children(recursive=True) walk per scan,
+        # which psutil implements as one full process-table pass per level.
+        best: tuple[float, Game] | None = None
+        for pid in snapshot.descendants(snapshot.pids(self._launcher)):
+            name = snapshot.name(pid)
+            if not name or name.lower() in self._ignore:
+                continue
+            try:
+                t = psutil.Process(pid).cpu_times()
+            except psutil.Error:
+                continue
+            weight = float(t.user + t.system)
+            if best is None or weight > best[0]:
+                best = (weight, Game(name, pid, snapshot.create_time(pid)))
+        return best[1] if best is not None else None
+
+    def set_game(self, game: Game | None) -> bool:
+        """Switch to `game` (None once it exited); returns True if it changed."""
+        same = (
+            game is not None
+            and self._game is not None
+            and (game.pid, game.create_time) == (self._game.pid, self._game.create_time)
+        )
+        if same or (game is None and self._game is None):
+            return False
+        self._game = game
+        self._usage.clear()
+        self._last_threads.clear()
+        self._last_cpu_times = None
+        self._last_game_cpu = None
+        if game is not None:
+            self.sample()
+        return True
+
+    def sample(self, exclude: frozenset[int] = frozenset()) -> None:
+        """Accumulate where the game's CPU time went since the previous sample.
+
+        `exclude` are the CPUs the guard is pinned to; without per-thread data
+        their busy time is the guard's, not the game's.
+        """
+        game = self._game
+        if game is None:
+            return
+        try:
+            if os.path.isdir(f"/proc/{game.pid}/task"):
+                self._sample_threads(game.pid)
+            else:
+                self._sample_system(game.pid, exclude)
+        except Exception:
+            pass
+
+    def _sample_threads(self, pid: int) -> None:
+        threads = _thread_cpu_ticks(pid)
+        for tid, (cpu, ticks) in threads.items():
+            prev = self._last_threads.get(tid)
+            delta = ticks - prev[1] if prev is not None else 0
+            if delta > 0:
+                self._usage[cpu] = self._usage.get(cpu, 0.0) + delta
+        self._last_threads = threads
+
+    def _sample_system(self, pid: int, exclude: frozenset[int]) -> None:
+        # No per-thread CPU number without ETW: spread the CPU time the game itself
+        # used over the busy time of the CPUs outside the guard's pin, so intervals in
+        # which other processes kept the machine busy count only as much as the game ran.
+        times = [float(t.user + t.system) for t in psutil.cpu_times(percpu=True)]
+        t = psutil.Process(pid).cpu_times()
+        game_cpu = float(t.user + t.system)
+        prev, prev_game = self._last_cpu_times, self._last_game_cpu
+        self._last_cpu_times, self._last_game_cpu = times, game_cpu
+        if prev is None or prev_game is None or len(prev) != len(times):
+            return
+        busy = {
+            cpu: now - before
+            for cpu, (now, before) in enumerate(zip(times, prev))
+            if cpu not in exclude and now > before
+        }
+        total = sum(busy.values())
+        used = game_cpu - prev_game
+        if total <= 0 or used <= 0:
+            return
+        scale = min(1.0, used / total)
+        for cpu, seconds in busy.items():
+            self._usage[cpu] = self._usage.get(cpu, 0.0) + seconds * scale
+
+    def hot_cpus(self) -> tuple[int, ...]:
+        total = sum(self._usage.values())
+        if total <= 0:
+            return ()
+        return tuple(sorted(cpu for cpu, used in self._usage.items() if used / total >= self._hot_share))
+
+    def reserved(self) -> frozenset[int]:
+        """CPUs the guard must stay off while the game runs."""
+        game = self._game
+        if game is None:
+            return frozenset()
+        reserved = set(self.hot_cpus())
+        try:
+            affinity = psutil.Process(game.pid).cpu_affinity()
+            if affinity and len(affinity) < logical_cpu_count():
+                reserved.update(affinity)
+        except (psutil.Error, AttributeError):
+            pass
+        return frozenset(reserved)
@@ -1,22 +1,49 @@
 from __future__ import annotations
 
-import psutil
-
-from .processes import search_process
-from .config import AppConfig, is_valid_wegame_path, load_config, save_config
+from .processes import get_snapshot
+from .config import is_valid_wegame_path, load_config, save_config
+from .events import (
+    Batch,
+    Control,
+    CpuInfo,
+    Done,
+    Found,
+    GuardState,
+    GuiEvents,
+    Progress,
+    Row,
+    Stats,
+    Status,
+    WegameState,
+)
 from .resources import resource_path
 from .tray import TrayController
-from .windows import _get_system_info, _set_processor_affinity_last_cpu, _set_windows_efficiency_mode
+from .trayicons import STATUS_ERROR, STATUS_IDLE, STATUS_OPTIMIZED
+from .backend import get_backend
+from .policy import guard_policy, logical_cpu_count
+from .rules import load_rules
+from .topology import get_topology
+from .windows import _get_system_info
 from .wegame import find_wegame_exe, is_wegame_running
 
+# run_gui() result when the window was destroyed after staying hidden (teardown_after).
+TORN_DOWN = -1
+
 
 def run_gui(
     *,
     with_tray: bool = True,
-    events: "queue.Queue[tuple] | None" = None,
+    events: GuiEvents | None = None,
     start_hidden: bool = False,
     close_to_tray: bool | None = None,
+    auto_scan: bool = True,
+    teardown_after: float = 0.0,
 ) -> int:
+    """Run the Tk UI until it is closed.
+
+    teardown_after > 0 destroys the window once it has been hidden that many
+    seconds; run_gui then returns TORN_DOWN and the caller may build it again.
+    """
     try:
         import tkinter as tk
         from tkinter import ttk
@@ -28,14 +55,15 @@ def run_gui(
 
     import os
     import threading
-    import queue
+    from dataclasses import replace
     from pathlib import Path
 
     import webbrowser
 
     REPO_URL = "https://github.com/FoLAWy-py/Anti-ACE"
 
-    target_processes = ["SGuard64.exe", "SGuardSvc64.exe"]
+    rules = load_rules(load_config().rules)
+    target_processes = rules.names()
 
     # 尝试启用更清晰的字体缩放（不影响功能）
     if os.name == "nt":
@@ -123,7 +151,9 @@ def run_gui(
         pass
 
     if events is None:
-        events = queue.Queue()
+        events = GuiEvents()
+    # The producers may have been running for a while: start from a full snapshot.
+    events.resync()
 
     if close_to_tray is None:
         close_to_tray = bool(with_tray)
@@ -158,7 +188,7 @@ def run_gui(
             "lang": "语言",
             "info": "系统：{os}    CPU：{cpu}",
             "summary_targets": "目标：{targets}",
-            "summary_cpu": "CPU：{count} 核",
+            "summary_cpu": "CPU：{count} 核    守护进程 → CPU {cpus}",
             "ready": "就绪",
             "starting": "开始…",
             "scanning": "正在扫描目标进程…",
@@ -179,12 +209,17 @@ def run_gui(
             "detail_action": "详情",
             "btn_close": "关闭",
             "eff_ok": "已开启",
-            "aff_ok": "已设置（仅使用 CPU {last}）",
+            "aff_ok": "已设置（仅使用 CPU {cpus}）",
             "failed": "失败",
             "detail_proc": "进程：{name}",
             "detail_pid": "PID：{pid}",
             "detail_eff": "效能模式：{status}",
             "detail_aff": "CPU 相关性：{status}",
+            "detail_io": "磁盘 I/O（优化前 → 优化后）：读 {rb} → {ra}，写 {wb} → {wa}",
+            "detail_mem": "内存整理：{n} 次，共释放 {freed}（最近一次 {before} → {after}）",
+            "detail_threads": "线程 CPU 占用（最近一次采样）：",
+            "detail_thread": "  TID {tid}：{usage}%",
+            "detail_thread_hot": "  TID {tid}：{usage}%  热点线程 → {action}",
             "menu_settings": "设置",
             "menu_choose_wegame": "手动选择 WeGame 路径…",
             "menu_redetect_wegame": "重新检测 WeGame 路径…",
@@ -205,6 +240,13 @@ def run_gui(
             "guard_optimized": "已完成优化",
             "menu_help": "帮助",
             "menu_github": "打开 GitHub 仓库",
+            "menu_stats": "运行统计…",
+            "stats_title": "运行统计",
+            "stats_none": "暂无统计（仅在后台模式下收集）。",
+            "stats_wakeups": "后台唤醒：{now} 次/分钟，其中辅助线程 {threads} 次（旧版每秒轮询：{before} 次/分钟）",
+            "stats_intervals": "当前间隔：全量扫描 {scan} 秒，漂移检查 {verify} 秒",
+            "stats_churn": "进程变化次数：{churn}；因系统繁忙推迟的任务：{deferred} 次",
+            "stats_load": "系统 CPU 占用：{load}%",
         },
         "en": {
             "window_title": "AntiACE Process Helper",
@@ -212,7 +254,7 @@ def run_gui(
             "lang": "Language",
             "info": "OS: {os}    CPU: {cpu}",
             "summary_targets": "Targets: {targets}",
-            "summary_cpu": "CPU: {count} cores",
+            "summary_cpu": "CPU: {count} cores    Guard → CPU {cpus}",
             "ready": "Ready",
             "starting": "Starting…",
             "scanning": "Scanning target processes…",
@@ -233,12 +275,17 @@ def run_gui(
             "detail_action": "Details",
             "btn_close": "Close",
             "eff_ok": "Enabled",
-            "aff_ok": "Set (CPU {last} only)",
+            "aff_ok": "Set (CPU {cpus} only)",
             "failed": "Failed",
             "detail_proc": "Process: {name}",
             "detail_pid": "PID: {pid}",
             "detail_eff": "Efficiency mode: {status}",
             "detail_aff": "CPU Affinity: {status}",
+            "detail_io": "Disk I/O (before → after): read {rb} → {ra}, write {wb} → {wa}",
+            "detail_mem": "Memory trims: {n}, {freed} freed in total (last {before} → {after})",
+            "detail_threads": "Thread CPU usage (last sample):",
+            "detail_thread": "  TID {tid}: {usage}%",
+            "detail_thread_hot": "  TID {tid}: {usage}%  hot thread → {action}",
             "menu_settings": "Settings",
             "menu_choose_wegame": "Choose WeGame path…",
             "menu_redetect_wegame": "Re-detect WeGame path…",
@@ -259,6 +306,13 @@ def run_gui(
             "guard_optimized": "Optimized",
             "menu_help": "Help",
             "menu_github": "Open GitHub repository",
+            "menu_stats": "Statistics…",
+            "stats_title": "Statistics",
+            "stats_none": "No statistics yet (collected in background mode only).",
+            "stats_wakeups": "Background wakeups: {now}/min, {threads}/min of them helper threads (old 1 s loop: {before}/min)",
+            "stats_intervals": "Current intervals: full scan {scan} s, drift check {verify} s",
+            "stats_churn": "Process changes: {churn}; tasks deferred while busy: {deferred}",
+            "stats_load": "System CPU load: {load}%",
         },
     }
 
@@ -298,7 +352,7 @@ def run_gui(
             return
 
         wegame_path_state = str(p)
-        save_config(AppConfig(wegame_path=wegame_path_state))
+        save_config(replace(load_config(), wegame_path=wegame_path_state))
         refresh_wegame_line()
         set_status("ready")
         try:
@@ -312,7 +366,7 @@ def run_gui(
         auto = find_wegame_exe(search_registry=True)
         if auto and is_valid_wegame_path(auto):
             wegame_path_state = auto
-            save_config(AppConfig(wegame_path=wegame_path_state))
+            save_config(replace(load_config(), wegame_path=wegame_path_state))
             refresh_wegame_line()
             try:
                 status_var.set(tr("wegame_auto_found"))
@@ -332,6 +386,39 @@ def run_gui(
         except Exception:
             pass
 
+    # Latest monitor statistics from the background loop (antiace.scheduler).
+    stats_state: dict[str, float | int] = {}
+
+    def show_stats() -> None:
+        if stats_state:
+            text = "\n".join(
+                (
+                    tr(
+                        "stats_wakeups",
+                        now=stats_state.get("wakeups_per_minute"),
+                        threads=stats_state.get("thread_wakeups_per_minute"),
+                        before=stats_state.get("baseline_per_minute"),
+                    ),
+                    tr(
+                        "stats_intervals",
+                        scan=stats_state.get("scan_interval"),
+                        verify=stats_state.get("verify_interval"),
+                    ),
+                    tr("stats_churn", churn=stats_state.get("churn"), deferred=stats_state.get("deferred")),
+                    tr("stats_load", load=stats_state.get("load")),
+                )
+            )
+        else:
+            text = tr("stats_none")
+
+        win = tk.Toplevel(root)
+        win.title(tr("stats_title"))
+        win.transient(root)
+        frame = ttk.Frame(win, padding=12)
+        frame.pack(fill="both", expand=True)
+        ttk.Label(frame, text=text, justify="left").pack(anchor="w")
+        ttk.Button(frame, text=tr("btn_close"), command=win.destroy).pack(anchor="e", pady=(12, 0))
+
     def refresh_status_lines() -> None:
         nonlocal wegame_state, guard_optimized_once
 
@@ -370,10 +457,12 @@ def run_gui(
 
     help_menu = tk.Menu(menubar, tearoff=0)
     help_menu.add_command(label=tr("menu_github"), command=open_repo)
+    help_menu.add_command(label=tr("menu_stats"), command=show_stats)
     menubar.add_cascade(label=tr("menu_help"), menu=help_menu)
 
     help_cascade_index = menubar.index("end")
     help_github_index = 0
+    help_stats_index = 1
 
     root.configure(menu=menubar)
 
@@ -443,9 +532,9 @@ def run_gui(
     footer.pack(fill="x")
 
     # pid -> raw row data
-    row_state: dict[int, dict] = {}
+    row_state: dict[int, Row] = {}
     cpu_count_state: int | None = None
-    last_cpu_state: int | None = None
+    guard_cpus_state: tuple[int, ...] | None = None
     status_state: dict[str, object] = {"key": "ready", "kwargs": {}}
 
     def set_status(key: str, **kwargs) -> None:
@@ -457,6 +546,12 @@ def run_gui(
             # Fallback: never crash the UI due to a missing translation
             status_var.set(str(key))
 
+    def guard_cpus_disp() -> str:
+        if not guard_cpus_state:
+            return "?"
+        topology = get_topology()
+        return ", ".join(topology.describe(i) for i in guard_cpus_state)
+
     def set_table_rows(n: int) -> None:
         # Show only as many rows as needed to avoid large blanks.
         tree.configure(height=max(2, min(8, int(n))))
@@ -477,9 +572,14 @@ def run_gui(
         for item in tree.get_children(""):
             tree.delete(item)
         row_state.clear()
+        events.clear_rows()
         set_table_rows(2)
 
+    scan_running = False
+
     def set_running(is_running: bool) -> None:
+        nonlocal scan_running
+        scan_running = is_running
         if is_running:
             start_btn.state(["disabled"])
         else:
@@ -487,29 +587,34 @@ def run_gui(
 
     def worker_scan_apply() -> None:
         try:
-            events.put(("status", "scanning"))
-            found = search_process(target_processes)
-            events.put(("found", found))
+            events.put(Status("scanning"))
+            found = rules.find(get_snapshot())
+            events.put(Found(tuple((name, pid) for name, pid, _rule in found)))
             if not found:
-                events.put(("done",))
                 return
 
-            cpu_count = psutil.cpu_count(logical=True) or os.cpu_count() or 0
-            last_cpu = (cpu_count - 1) if cpu_count > 0 else None
-            events.put(("cpu", cpu_count, last_cpu))
-            events.put(("status", "found_apply", len(found)))
+            cfg_now = load_config()
+            policy = guard_policy(cfg_now.guard_cpus)
+            events.put(CpuInfo(logical_cpu_count(), policy.affinity))
+            events.put(Status("found_apply", (len(found),)))
 
-            for idx, (name, pid) in enumerate(found, start=1):
-                events.put(("status", "processing", name, pid))
+            backend = get_backend()
+            for idx, (name, pid, rule) in enumerate(found, start=1):
+                events.put(Status("processing", (name, pid)))
 
-                ok_eff, msg_eff = _set_windows_efficiency_mode(pid)
-                ok_aff, msg_aff = _set_processor_affinity_last_cpu(pid)
+                # No hard limits here: nothing would release them after this one-shot apply;
+                # the background monitor applies and releases them.
+                target_policy = rule.policy.override(policy)
+                result = backend.apply_policy(pid, target_policy, name=name)
+                ok_eff, msg_eff = result.efficiency()
+                ok_aff, msg_aff = result.affinity()
 
-                events.put(("row_update", name, pid, ok_eff, msg_eff, ok_aff, msg_aff, idx, len(found)))
+                events.update_row(pid, name, ok_eff, msg_eff, ok_aff, msg_aff)
+                events.put(Progress(idx, len(found)))
 
-            events.put(("status", "done"))
+            events.put(Status("done"))
         finally:
-            events.put(("done",))
+            events.put(Done())
 
     def start() -> None:
         clear_table()
@@ -524,181 +629,295 @@ def run_gui(
         t = threading.Thread(target=worker_scan_apply, daemon=True)
         t.start()
 
-    def poll_events() -> None:
-        nonlocal cpu_count_state, last_cpu_state
-        nonlocal wegame_state, guard_optimized_once
+    def render_row(row: Row) -> None:
+        cpus_disp = guard_cpus_disp()
+        eff_text = tr("eff_ok") if row.ok_eff else tr("failed")
+        aff_text = tr("aff_ok", cpus=cpus_disp) if row.ok_aff else tr("failed")
+        values = (row.name, row.pid, eff_text, aff_text, tr("detail_action"))
+        iid = str(row.pid)
+        if tree.exists(iid):
+            tree.item(iid, values=values)
+        else:
+            tree.insert("", "end", iid=iid, values=values)
+
+    def apply_rows(batch: Batch) -> None:
+        count = len(row_state)
+        for pid in batch.removed:
+            # The process exited (background mode) or the table was cleared.
+            row_state.pop(pid, None)
+            if tree.exists(str(pid)):
+                tree.delete(str(pid))
+        for pid, row in batch.rows.items():
+            old = row_state.get(pid)
+            row_state[pid] = row
+            # io / mem / threads only show up in the details window.
+            if old is None or (old.name, old.ok_eff, old.ok_aff) != (row.name, row.ok_eff, row.ok_aff):
+                render_row(row)
+        if len(row_state) != count:
+            total_var.set(len(row_state))
+            # Keep a minimum height so the list is visible.
+            set_table_rows(len(row_state) if row_state else 2)
+            shrink_to_content()
+        update_tray()
+
+    closed = False
+    torn_down = False
+    teardown_job: str | None = None
+    visible = not start_hidden
+    poll_scheduled = False
+    # Producers wake the Tk thread with a virtual event instead of it polling every
+    # 100 ms; that needs a threaded Tcl, which marshals the call into this thread.
+    try:
+        event_driven = bool(int(root.tk.eval("info exists tcl_platform(threaded)")))
+    except Exception:
+        event_driven = False
+
+    def wake() -> None:
+        # Runs on a producer thread.
         try:
-            while True:
-                ev = events.get_nowait()
-                kind = ev[0]
-                if kind == "bg_found":
-                    try:
-                        found = ev[1]
-                        total_var.set(len(found) if found else 0)
-                        # Keep a minimum height so the list is visible.
-                        set_table_rows(len(found) if found else 2)
-                        shrink_to_content()
-                    except Exception:
-                        pass
-                    continue
-                if kind == "wegame":
-                    wegame_state = str(ev[1]) if len(ev) > 1 else "unknown"
-                    refresh_status_lines()
-                    continue
-                if kind == "guard":
-                    action = str(ev[1]) if len(ev) > 1 else ""
-                    if action == "optimized":
-                        guard_optimized_once = True
-                        refresh_status_lines()
-                    continue
-                if kind == "ctl":
-                    action = str(ev[1]) if len(ev) > 1 else ""
-                    if action == "show":
-                        try:
-                            root.deiconify()
-                            root.lift()
-                            root.focus_force()
-                        except Exception:
-                            pass
-                    elif action == "hide":
-                        try:
-                            root.withdraw()
-                        except Exception:
-                            pass
-                    elif action == "quit":
-                        try:
-                            root.destroy()
-                        except Exception:
-                            pass
-                    continue
-                if kind == "tray_show":
-                    try:
-                        root.deiconify()
-                        root.lift()
-                        root.focus_force()
-                    except Exception:
-                        pass
-                    continue
-                if kind == "tray_exit":
-                    try:
-                        root.destroy()
-                    except Exception:
-                        pass
-                    continue
-                if kind == "status":
-                    code = ev[1]
-                    if code == "scanning":
-                        set_status("scanning")
-                    elif code == "found_apply":
-                        set_status("found_apply", n=int(ev[2]))
-                    elif code == "processing":
-                        set_status("processing", name=ev[2], pid=int(ev[3]))
-                    elif code == "done":
-                        set_status("done")
-                    else:
-                        status_var.set(str(code))
-                elif kind == "cpu":
-                    cpu_count_state = int(ev[1])
-                    last_cpu_state = int(ev[2]) if ev[2] is not None else None
-                    summary_var.set(
-                        tr("summary_targets", targets=", ".join(target_processes))
-                        + "    "
-                        + tr("summary_cpu", count=cpu_count_state)
-                    )
-                elif kind == "found":
-                    found = ev[1]
-                    total_var.set(len(found))
-                    set_table_rows(len(found) if found else 2)
-                    progress.stop()
-                    progress.configure(mode="determinate", maximum=max(1, len(found)))
-                    progress_var.set(0)
-                    if not found:
-                        summary_var.set(tr("summary_targets", targets=", ".join(target_processes)))
-                        set_status("not_found")
-                        shrink_to_content()
-                elif kind == "row_update":
-                    _, name, pid, ok_eff, msg_eff, ok_aff, msg_aff, idx, total = ev
-                    progress_var.set(idx)
-                    iid = f"{pid}"
-
-                    last_cpu_disp = last_cpu_state if last_cpu_state is not None else "?"
-                    eff_text = tr("eff_ok") if ok_eff else tr("failed")
-                    aff_text = tr("aff_ok", last=last_cpu_disp) if ok_aff else tr("failed")
-                    detail_text = tr("detail_action")
-
-                    if tree.exists(iid):
-                        tree.item(iid, values=(name, pid, eff_text, aff_text, detail_text))
-                    else:
-                        tree.insert("", "end", iid=iid, values=(name, pid, eff_text, aff_text, detail_text))
-                    row_state[int(pid)] = {
-                        "name": name,
-                        "pid": int(pid),
-                        "ok_eff": bool(ok_eff),
-                        "msg_eff": str(msg_eff),
-                        "ok_aff": bool(ok_aff),
-                        "msg_aff": str(msg_aff),
-                    }
-                    set_status("progress", i=int(idx), n=int(total))
-                elif kind == "done":
-                    progress.stop()
-                    set_running(False)
-                    shrink_to_content()
-        except queue.Empty:
+            root.event_generate("<<AntiAceEvents>>", when="tail")
+        except Exception:
             pass
 
+    def teardown() -> None:
+        nonlocal closed, torn_down
+        closed = True
+        torn_down = True
+        try:
+            root.destroy()
+        except Exception:
+            pass
+
+    def set_visible(value: bool) -> None:
+        """Withdrawn/iconified: no polling, no widget updates; the bus keeps the latest state."""
+        nonlocal visible, teardown_job
+        if value == visible or closed:
+            return
+        visible = value
+        if event_driven:
+            events.set_waker(wake, controls_only=not visible)
+        if visible:
+            if teardown_job is not None:
+                root.after_cancel(teardown_job)
+                teardown_job = None
+            if scan_running and str(progress.cget("mode")) == "indeterminate":
+                progress.start(10)
+            # Catch up on everything that changed while hidden in one pass.
+            schedule_poll()
+        else:
+            progress.stop()
+
+    def schedule_teardown() -> None:
+        # Only when hidden to the tray; a minimized window keeps its taskbar button.
+        nonlocal teardown_job
+        if teardown_after > 0 and teardown_job is None and not closed:
+            teardown_job = root.after(int(teardown_after * 1000), teardown)
+
+    def hide_window() -> None:
+        try:
+            root.withdraw()
+        except Exception:
+            pass
+        set_visible(False)
+        schedule_teardown()
+
+    def on_control(ev: Control) -> None:
+        nonlocal closed
+        if ev.action == "show":
+            try:
+                root.deiconify()
+                root.lift()
+                root.focus_force()
+            except Exception:
+                pass
+            set_visible(True)
+        elif ev.action == "hide":
+            hide_window()
+        elif ev.action == "quit":
+            closed = True
+            try:
+                root.destroy()
+            except Exception:
+                pass
+
+    def on_status(ev: Status) -> None:
+        if ev.code in ("scanning", "done"):
+            set_status(ev.code)
+        elif ev.code == "found_apply":
+            set_status("found_apply", n=int(ev.args[0]))
+        elif ev.code == "processing":
+            set_status("processing", name=ev.args[0], pid=int(ev.args[1]))
+        else:
+            status_var.set(str(ev.code))
+
+    def on_progress(ev: Progress) -> None:
+        progress_var.set(ev.done)
+        set_status("progress", i=int(ev.done), n=int(ev.total))
+
+    def on_found(ev: Found) -> None:
+        total_var.set(len(ev.found))
+        set_table_rows(len(ev.found) if ev.found else 2)
+        progress.stop()
+        progress.configure(mode="determinate", maximum=max(1, len(ev.found)))
+        progress_var.set(0)
+        if not ev.found:
+            summary_var.set(tr("summary_targets", targets=", ".join(target_processes)))
+            set_status("not_found")
+            shrink_to_content()
+
+    def on_done(_ev: Done) -> None:
+        progress.stop()
+        set_running(False)
+        shrink_to_content()
+
+    def on_cpu(ev: CpuInfo) -> None:
+        nonlocal cpu_count_state, guard_cpus_state
+        cpu_count_state = int(ev.count)
+        guard_cpus_state = tuple(ev.affinity) if ev.affinity else None
+        summary_var.set(
+            tr("summary_targets", targets=", ".join(target_processes))
+            + "    "
+            + tr("summary_cpu", count=cpu_count_state, cpus=guard_cpus_disp())
+        )
+
+    def on_wegame(ev: WegameState) -> None:
+        nonlocal wegame_state
+        wegame_state = ev.state
+        refresh_status_lines()
+
+    def on_guard(ev: GuardState) -> None:
+        nonlocal guard_optimized_once
+        if ev.state == "optimized":
+            guard_optimized_once = True
+            refresh_status_lines()
+
+    def on_stats(ev: Stats) -> None:
+        stats_state.clear()
+        stats_state.update(ev.stats)
+
+    handlers = {
+        Control: on_control,
+        Status: on_status,
+        Progress: on_progress,
+        Found: on_found,
+        Done: on_done,
+        CpuInfo: on_cpu,
+        WegameState: on_wegame,
+        GuardState: on_guard,
+        Stats: on_stats,
+    }
+
+    def schedule_poll() -> None:
+        nonlocal poll_scheduled
+        if poll_scheduled or closed:
+            return
+        poll_scheduled = True
         root.after(100, poll_events)
 
+    def poll_events() -> None:
+        nonlocal poll_scheduled
+        poll_scheduled = False
+        try:
+            if not visible:
+                for ev in events.take_controls():
+                    on_control(ev)
+                    if closed:
+                        return
+                return
+            batch = events.drain()
+            if batch is not None:
+                apply_rows(batch)
+                for ev in batch.events:
+                    handlers[type(ev)](ev)
+                    if closed:
+                        return
+        finally:
+            if not event_driven:
+                schedule_poll()
+
+    def update_tray() -> None:
+        if tray is None:
+            return
+        if not row_state:
+            tray.set_status(STATUS_IDLE)
+        elif all(row.ok_eff and row.ok_aff for row in row_state.values()):
+            tray.set_status(STATUS_OPTIMIZED)
+        else:
+            tray.set_status(STATUS_ERROR)
+
     tray: TrayController | None = None
     if with_tray:
         def on_show_main() -> None:
-            # NOTE: pystray callbacks happen on tray thread; marshal into Tk thread via queue.
-            events.put(("tray_show",))
+            # NOTE: pystray callbacks happen on tray thread; marshal into Tk thread via the event bus.
+            events.put(Control("show"))
 
         def on_exit() -> None:
-            events.put(("tray_exit",))
+            events.put(Control("quit"))
 
         tray = TrayController(on_show_main=on_show_main, on_exit=on_exit, icon_path=resource_path("icon.ico"))
         tray.start()
 
-        def on_close_to_tray() -> None:
-            try:
-                root.withdraw()
-            except Exception:
-                pass
-
         if close_to_tray:
-            root.protocol("WM_DELETE_WINDOW", on_close_to_tray)
+            root.protocol("WM_DELETE_WINDOW", hide_window)
 
     if close_to_tray and not with_tray:
         # Embedded mode (tray is managed externally): still hide window on close.
-        def on_close_to_tray_external() -> None:
-            try:
-                root.withdraw()
-            except Exception:
-                pass
+        root.protocol("WM_DELETE_WINDOW", hide_window)
+
+    # Minimizing counts as hidden too; <Map>/<Unmap> also fire for child widgets.
+    root.bind("<Map>", lambda evt: set_visible(True) if evt.widget is root else None, add="+")
+    root.bind("<Unmap>", lambda evt: set_visible(False) if evt.widget is root else None, add="+")
 
-        root.protocol("WM_DELETE_WINDOW", on_close_to_tray_external)
+    def format_bytes(value: float) -> str:
+        if value < 1024:
+            return f"{value:.0f} B"
+        if value < 1024 * 1024:
+            return f"{value / 1024:.1f} KB"
+        return f"{value / (1024 * 1024):.1f} MB"
+
+    def format_rate(value: float) -> str:
+        return format_bytes(value) + "/s"
 
     def show_details(pid: int) -> None:
         row = row_state.get(int(pid))
         if not row:
             return
 
-        last_cpu_disp = last_cpu_state if last_cpu_state is not None else "?"
-        eff_status = tr("eff_ok") if row["ok_eff"] else tr("failed")
-        aff_status = tr("aff_ok", last=last_cpu_disp) if row["ok_aff"] else tr("failed")
+        cpus_disp = guard_cpus_disp()
+        eff_status = tr("eff_ok") if row.ok_eff else tr("failed")
+        aff_status = tr("aff_ok", cpus=cpus_disp) if row.ok_aff else tr("failed")
         text = (
-            tr("detail_proc", name=row["name"]) + "\n"
-            + tr("detail_pid", pid=row["pid"]) + "\n\n"
+            tr("detail_proc", name=row.name) + "\n"
+            + tr("detail_pid", pid=row.pid) + "\n\n"
             + tr("detail_eff", status=eff_status)
             + "\n"
-            + row["msg_eff"]
+            + row.msg_eff
             + "\n\n"
             + tr("detail_aff", status=aff_status)
             + "\n"
-            + row["msg_aff"]
+            + row.msg_aff
             + "\n"
         )
+        io = row.io
+        if io:
+            rb, wb, ra, wa = (format_rate(v) for v in io)
+            text += "\n" + tr("detail_io", rb=rb, wb=wb, ra=ra, wa=wa) + "\n"
+        mem = row.mem
+        if mem:
+            n, freed, before, after = mem
+            text += (
+                "\n"
+                + tr("detail_mem", n=n, freed=format_bytes(freed), before=format_bytes(before), after=format_bytes(after))
+                + "\n"
+            )
+        threads = row.threads
+        if threads:
+            text += "\n" + tr("detail_threads") + "\n"
+            for tid, usage, hot, action in threads:
+                if hot:
+                    text += tr("detail_thread_hot", tid=tid, usage=usage, action=action or "-") + "\n"
+                else:
+                    text += tr("detail_thread", tid=tid, usage=usage) + "\n"
 
         win = tk.Toplevel(root)
         win.title(tr("details"))
@@ -709,7 +928,7 @@ def run_gui(
         frame = ttk.Frame(win, padding=12)
         frame.pack(fill="both", expand=True)
 
-        lbl = ttk.Label(frame, text=f"{row['name']}  (PID {row['pid']})", font=("Segoe UI", 10, "bold"))
+        lbl = ttk.Label(frame, text=f"{row.name}  (PID {row.pid})", font=("Segoe UI", 10, "bold"))
         lbl.pack(anchor="w")
 
         # Adapt height to content to reduce empty space
@@ -757,7 +976,7 @@ def run_gui(
                 summary_var.set(
                     tr("summary_targets", targets=", ".join(target_processes))
                     + "    "
-                    + tr("summary_cpu", count=cpu_count_state)
+                    + tr("summary_cpu", count=cpu_count_state, cpus=guard_cpus_disp())
                 )
             else:
                 summary_var.set(tr("summary_targets", targets=", ".join(target_processes)))
@@ -783,6 +1002,7 @@ def run_gui(
             settings_menu.entryconfig(settings_choose_index, label=tr("menu_choose_wegame"))
             settings_menu.entryconfig(settings_redetect_index, label=tr("menu_redetect_wegame"))
             help_menu.entryconfig(help_github_index, label=tr("menu_github"))
+            help_menu.entryconfig(help_stats_index, label=tr("menu_stats"))
         except Exception:
             pass
 
@@ -796,14 +1016,8 @@ def run_gui(
         refresh_wegame_line()
 
         # Re-render existing rows under the new language
-        last_cpu_disp = last_cpu_state if last_cpu_state is not None else "?"
-        for pid, row in row_state.items():
-            eff_text = tr("eff_ok") if row["ok_eff"] else tr("failed")
-            aff_text = tr("aff_ok", last=last_cpu_disp) if row["ok_aff"] else tr("failed")
-            detail_text = tr("detail_action")
-            iid = str(pid)
-            if tree.exists(iid):
-                tree.item(iid, values=(row["name"], pid, eff_text, aff_text, detail_text))
+        for row in row_state.values():
+            render_row(row)
 
         # Re-render current status text under the new language
         try:
@@ -830,15 +1044,23 @@ def run_gui(
             root.withdraw()
         except Exception:
             pass
-
-    root.after(100, poll_events)
-    # 启动时自动跑一次，更像“监控面板”
-    root.after(200, start)
+        schedule_teardown()
+
+    if event_driven:
+        root.bind("<<AntiAceEvents>>", lambda _evt: schedule_poll())
+        # Register once the main loop runs: waking from another thread before that would fail.
+        root.after_idle(lambda: events.set_waker(wake, controls_only=not visible))
+    else:
+        schedule_poll()
+    if auto_scan:
+        # 启动时自动跑一次，更像“监控面板”。后台模式下表格由后台监控填充。
+        root.after(200, start)
     root.mainloop()
+    events.set_waker(None)
 
     if tray is not None:
         try:
             tray.stop()
         except Exception:
             pass
-    return 0
+    return TORN_DOWN if torn_down else 0
@@ -0,0 +1,500 @@
+"""Single background instance and its control channel.
+
+Only one `run_background` may run per user session: two would each have a
+tray icon, a monitor thread and their own scans, and fight over the same
+targets. The first one takes an `InstanceLock` and serves a small
+request/response protocol; later invocations talk to it instead of starting
+over:
+
+- Windows: a named mutex (`Local\\AntiACE.Background`, per session) and a
+  local-only named pipe `\\\\.\\pipe\\AntiACE-<user>` that only the current
+  user can open (see `PipeControlServer`).
+- Linux/macOS: `flock` on `<config dir>/background.lock` and a Unix socket
+  `<config dir>/background.sock` (mode 0600).
+
+Protocol: one connection per request; the client writes one JSON object
+and a newline (`{"cmd": "status"}`), the server answers with one JSON line
+(`{"ok": true, ...}` or `{"ok": false, "error": "..."}`).
+
+The client side (`request`) only needs the standard library, so
+`--cli status` stays cheap; the Windows server side loads the kernel32
+bindings when it starts.
+"""
+
+from __future__ import annotations
+
+import abc
+import getpass
+import json
+import os
+import socket
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from .paths import config_path
+
+Handler = Callable[[dict], dict]
+
+# Requests and responses are small; anything longer is refused.
+MAX_MESSAGE = 1 << 20
+
+_MUTEX_NAME = "Local\\AntiACE.Background"
+
+# CreateNamedPipeW
+PIPE_ACCESS_DUPLEX = 0x00000003
+PIPE_TYPE_BYTE = 0x00000000
+PIPE_READMODE_BYTE = 0x00000000
+PIPE_WAIT = 0x00000000
+PIPE_REJECT_REMOTE_CLIENTS = 0x00000008
+FILE_FLAG_OVERLAPPED = 0x40000000
+FILE_FLAG_FIRST_PIPE_INSTANCE = 0x00080000
+ERROR_ALREADY_EXISTS = 183
+ERROR_PIPE_CONNECTED = 535
+ERROR_IO_PENDING = 997
+WAIT_OBJECT_0 = 0
+INFINITE = 0xFFFFFFFF
+# Protected DACL for the pipe (OpenProcessToken / GetTokenInformation / SDDL).
+TOKEN_QUERY = 0x0008
+TOKEN_USER = 1
+SDDL_REVISION_1 = 1
+
+
+def _user() -> str:
+    try:
+        return "".join(c for c in getpass.getuser() if c.isalnum()) or "user"
+    except Exception:
+        return "user"
+
+
+def pipe_path() -> str:
+    return f"\\\\.\\pipe\\AntiACE-{_user()}"
+
+
+def socket_path() -> Path:
+    return config_path().with_name("background.sock")
+
+
+def lock_path() -> Path:
+    return config_path().with_name("background.lock")
+
+
+class InstanceLock:
+    """Held by the running background instance until `release()` or exit."""
+
+    def __init__(self, handle: object, release: Callable[[], None]) -> None:
+        self._handle = handle
+        self._release = release
+
+    def release(self) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            try:
+                release()
+            except Exception:
+                pass
+
+
+def acquire() -> InstanceLock | None:
+    """Take the single-instance lock; None if another instance holds it."""
+    if os.name == "nt":
+        return _acquire_mutex()
+    return _acquire_flock()
+
+
+def _acquire_mutex() -> InstanceLock | None:
+    import ctypes
+
+    # Loaded here: clients never need the kernel32 bindings.
+    from .windows import _kernel32
+
+    k32 = _kernel32()
+    handle = k32.CreateMutexW(None, False, _MUTEX_NAME)
+    if not handle:
+        return None
+    if ctypes.get_last_error() == ERROR_ALREADY_EXISTS:
+        k32.CloseHandle(handle)
+        return None
+    return InstanceLock(handle, lambda: k32.CloseHandle(handle))
+
+
+def _acquire_flock() -> InstanceLock | None:
+    import fcntl
+
+    path = lock_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    os.ftruncate(fd, 0)
+    os.write(fd, f"{os.getpid()}\n".encode("ascii"))
+
+    # The file itself stays: unlinking it would let a later process lock a fresh inode
+    # while a racing one still holds the old.
+    return InstanceLock(fd, lambda: os.close(fd))
+
+
+def _encode(message: dict) -> bytes:
+    return json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _decode(data: bytes) -> dict:
+    message = json.loads(data.decode("utf-8"))
+    if not isinstance(message, dict):
+        raise ValueError("expected a JSON object")
+    return message
+
+
+def _respond(handler: Handler, data: bytes) -> bytes:
+    try:
+        response = handler(_decode(data))
+    except Exception as exc:
+        response = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+    return _encode(response)
+
+
+class ControlServer(abc.ABC):
+    """Answers requests on a background thread; `handler` runs on that thread.
+
+    Clients are served one at a time, each within `io_timeout` seconds.
+    """
+
+    io_timeout = 2.0
+
+    def __init__(self, handler: Handler) -> None:
+        self._handler = handler
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="antiace-control", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        # The serving thread blocks waiting for a client; be that client.
+        try:
+            request({"cmd": "ping"}, timeout=0.5)
+        except Exception:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self._close()
+
+    @abc.abstractmethod
+    def _run(self) -> None:
+        """Serve clients until `_stop_event` is set; runs on the control thread."""
+
+    def _close(self) -> None:
+        pass
+
+
+class SocketControlServer(ControlServer):
+    def __init__(self, handler: Handler) -> None:
+        super().__init__(handler)
+        self._path = socket_path()
+        # Safe while we hold the instance lock: a leftover socket is from a dead instance.
+        try:
+            self._path.unlink()
+        except OSError:
+            pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(str(self._path))
+        os.chmod(self._path, 0o600)
+        self._sock.listen(8)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                conn, _addr = self._sock.accept()
+            except OSError:
+                if self._stop_event.is_set():
+                    return
+                time.sleep(0.1)
+                continue
+            with conn:
+                try:
+                    self._serve(conn)
+                except Exception:
+                    pass
+                if self._stop_event.is_set():
+                    return
+
+    def _serve(self, conn: socket.socket) -> None:
+        # A socket timeout bounds each recv, not the client: a client trickling one byte
+        # at a time would hold the channel for minutes. Shrink it to what is left instead.
+        deadline = time.monotonic() + self.io_timeout
+
+        def remaining() -> float:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise TimeoutError("client too slow")
+            return left
+
+        def recv(n: int) -> bytes:
+            conn.settimeout(remaining())
+            return conn.recv(n)
+
+        data = _read_line(recv)
+        if self._stop_event.is_set():
+            return
+        response = _respond(self._handler, data)
+        # sendall's timeout is the total for the whole answer.
+        conn.settimeout(remaining())
+        conn.sendall(response)
+
+    def _close(self) -> None:
+        try:
+            self._sock.close()
+        finally:
+            try:
+                self._path.unlink()
+            except OSError:
+                pass
+
+
+class PipeControlServer(ControlServer):
+    """Windows: one overlapped pipe instance, reused for every client.
+
+    - Created with FILE_FLAG_FIRST_PIPE_INSTANCE, so it fails if another
+      process already owns the name, and never closed between clients, so
+      the name cannot be taken over later.
+    - Its DACL grants access to the current user's SID only.
+    - Reads and writes are overlapped with a deadline of `io_timeout`
+      seconds per client: a client that never sends its newline (or never
+      reads the answer) is dropped instead of blocking the channel.
+    """
+
+    def __init__(self, handler: Handler) -> None:
+        super().__init__(handler)
+        import ctypes
+
+        from .windows import OVERLAPPED, SECURITY_ATTRIBUTES, _kernel32
+
+        k32 = _kernel32()
+        self._k32 = k32
+        self._path = pipe_path()
+        self._sd = self._user_only_descriptor()
+        sa = SECURITY_ATTRIBUTES(ctypes.sizeof(SECURITY_ATTRIBUTES), self._sd, False)
+        pipe = k32.CreateNamedPipeW(
+            self._path,
+            PIPE_ACCESS_DUPLEX | FILE_FLAG_OVERLAPPED | FILE_FLAG_FIRST_PIPE_INSTANCE,
+            PIPE_TYPE_BYTE | PIPE_READMODE_BYTE | PIPE_WAIT | PIPE_REJECT_REMOTE_CLIENTS,
+            1,
+            65536,
+            65536,
+            0,
+            ctypes.byref(sa),
+        )
+        if not pipe or pipe == ctypes.c_void_p(-1).value:
+            err = ctypes.get_last_error()
+            k32.LocalFree(self._sd)
+            raise OSError(f"CreateNamedPipe({self._path}) failed errno={err}")
+        self._pipe = pipe
+        # Manual-reset events: one for the pending I/O, one to interrupt it on stop().
+        self._io_event = k32.CreateEventW(None, True, False, None)
+        self._stop_handle = k32.CreateEventW(None, True, False, None)
+        self._overlapped = OVERLAPPED()
+        self._overlapped.hEvent = self._io_event
+
+    def _user_only_descriptor(self) -> int:
+        """Security descriptor with a protected DACL allowing only the current user."""
+        import ctypes
+        from ctypes import wintypes
+
+        k32 = self._k32
+        token = wintypes.HANDLE()
+        if not k32.OpenProcessToken(k32.GetCurrentProcess(), TOKEN_QUERY, ctypes.byref(token)):
+            raise OSError(f"OpenProcessToken failed errno={ctypes.get_last_error()}")
+        try:
+            size = wintypes.DWORD(0)
+            k32.GetTokenInformation(token, TOKEN_USER, None, 0, ctypes.byref(size))
+            info = ctypes.create_string_buffer(size.value)
+            if not k32.GetTokenInformation(token, TOKEN_USER, info, size, ctypes.byref(size)):
+                raise OSError(f"GetTokenInformation failed errno={ctypes.get_last_error()}")
+            # TOKEN_USER starts with the SID pointer.
+            sid = ctypes.c_void_p.from_buffer(info).value
+            text = wintypes.LPWSTR()
+            if not k32.ConvertSidToStringSidW(sid, ctypes.byref(text)):
+                raise OSError(f"ConvertSidToStringSid failed errno={ctypes.get_last_error()}")
+            try:
+                user = text.value
+            finally:
+                k32.LocalFree(ctypes.cast(text, ctypes.c_void_p))
+        finally:
+            k32.CloseHandle(token)
+        sd = wintypes.LPVOID()
+        if not k32.ConvertStringSecurityDescriptorToSecurityDescriptorW(
+            f"D:P(A;;GA;;;{user})", SDDL_REVISION_1, ctypes.byref(sd), None
+        ):
+            raise OSError(f"ConvertStringSecurityDescriptor failed errno={ctypes.get_last_error()}")
+        return sd.value
+
+    def _complete(self, started: bool, deadline: float | None) -> int | None:
+        """Finish the overlapped call just issued: bytes transferred, or None if it
+        failed, missed `deadline` or the server is stopping (the call is cancelled)."""
+        import ctypes
+        from ctypes import wintypes
+
+        k32 = self._k32
+        count = wintypes.DWORD(0)
+        ov = ctypes.byref(self._overlapped)
+        if not started:
+            err = ctypes.get_last_error()
+            if err == ERROR_PIPE_CONNECTED:
+                return 0
+            if err != ERROR_IO_PENDING:
+                return None
+            timeout = INFINITE if deadline is None else max(0, int((deadline - time.monotonic()) * 1000))
+            handles = (wintypes.HANDLE * 2)(self._io_event, self._stop_handle)
+            if k32.WaitForMultipleObjects(2, handles, False, timeout) != WAIT_OBJECT_0:
+                k32.CancelIoEx(self._pipe, ov)
+                # Wait for the cancellation so the OVERLAPPED and buffer are free again.
+                k32.GetOverlappedResult(self._pipe, ov, ctypes.byref(count), True)
+                return None
+        if not k32.GetOverlappedResult(self._pipe, ov, ctypes.byref(count), False):
+            return None
+        return count.value
+
+    def _serve(self, buf) -> None:
+        import ctypes
+
+        k32 = self._k32
+        pipe = self._pipe
+        ov = ctypes.byref(self._overlapped)
+        deadline = time.monotonic() + self.io_timeout
+
+        def read() -> int | None:
+            k32.ResetEvent(self._io_event)
+            return self._complete(k32.ReadFile(pipe, buf, len(buf), None, ov), deadline)
+
+        def recv(_size: int) -> bytes:
+            n = read()
+            if n is None:
+                raise TimeoutError("client did not send a request in time")
+            return buf.raw[:n]
+
+        data = _respond(self._handler, _read_line(recv))
+        while data:
+            k32.ResetEvent(self._io_event)
+            n = self._complete(k32.WriteFile(pipe, data, len(data), None, ov), deadline)
+            if not n:
+                return
+            data = data[n:]
+        # Instead of FlushFileBuffers (which waits for the client without a limit):
+        # wait until the client closes its end after reading the answer.
+        read()
+
+    def _run(self) -> None:
+        import ctypes
+
+        k32 = self._k32
+        buf = ctypes.create_string_buffer(4096)
+        while not self._stop_event.is_set():
+            k32.ResetEvent(self._io_event)
+            connected = self._complete(k32.ConnectNamedPipe(self._pipe, ctypes.byref(self._overlapped)), None)
+            if self._stop_event.is_set():
+                break
+            if connected is not None:
+                try:
+                    self._serve(buf)
+                except Exception:
+                    pass
+            k32.DisconnectNamedPipe(self._pipe)
+            if connected is None:
+                # Avoid a hot loop if connecting keeps failing.
+                self._stop_event.wait(0.1)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._k32.SetEvent(self._stop_handle)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            if self._thread.is_alive():
+                # Still inside a call using the handles below; the process is exiting anyway.
+                return
+        self._close()
+
+    def _close(self) -> None:
+        k32 = self._k32
+        for handle in (self._pipe, self._io_event, self._stop_handle):
+            if handle:
+                k32.CloseHandle(handle)
+        self._pipe = self._io_event = self._stop_handle = None
+        if self._sd:
+            k32.LocalFree(self._sd)
+            self._sd = None
+
+
+def start_server(handler: Handler) -> ControlServer | None:
+    """Serve `handler` for other invocations; None if the channel can't be opened."""
+    try:
+        server: ControlServer = PipeControlServer(handler) if os.name == "nt" else SocketControlServer(handler)
+        server.start()
+        return server
+    except Exception:
+        return None
+
+
+def _read_line(recv: Callable[[int], bytes]) -> bytes:
+    data = b""
+    while b"\n" not in data:
+        chunk = recv(4096)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_MESSAGE:
+            raise ValueError("message too long")
+    return data.split(b"\n", 1)[0]
+
+
+def _exchange(message: dict, timeout: float) -> dict | None:
+    if os.name != "nt":
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            try:
+                sock.connect(str(socket_path()))
+            except OSError:
+                return None
+            sock.sendall(_encode(message))
+            return _decode(_read_line(sock.recv))
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            pipe = open(pipe_path(), "r+b", buffering=0)
+            break
+        except FileNotFoundError:
+            return None
+        except OSError:
+            # ERROR_PIPE_BUSY: the server is between two clients.
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+    with pipe:
+        pipe.write(_encode(message))
+        return _decode(_read_line(pipe.read))
+
+
+def request(message: dict, *, timeout: float = 2.0) -> dict | None:
+    """Send one request to the running instance; None if there is none (or it didn't answer)."""
+    result: list[dict | None] = [None]
+
+    def run() -> None:
+        try:
+            result[0] = _exchange(message, timeout)
+        except Exception:
+            result[0] = None
+
+    if os.name != "nt":
+        run()
+        return result[0]
+    # Reads from a pipe can't time out on their own.
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return result[0]
@@ -0,0 +1,89 @@
+"""Per-target disk I/O before and after the policy was applied.
+
+`IoStats.start()` is called right before a target's first apply. It records
+the process's cumulative read/write bytes (`psutil` `io_counters`) and its
+age, so the "before" rate is the average over the target's life until then.
+`report()` compares that with the average rate since the apply, which shows
+whether idle I/O priority and `io.max` actually reduce background disk churn.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+import psutil
+
+
+@dataclass(frozen=True)
+class IoRates:
+    # Bytes per second before and since the first apply.
+    read_before: float
+    write_before: float
+    read_after: float
+    write_after: float
+    # Seconds covered by the "after" rates.
+    seconds: float
+
+
+@dataclass(frozen=True)
+class _Baseline:
+    read_bytes: int
+    write_bytes: int
+    at: float
+    age: float
+
+
+def _io_bytes(pid: int) -> tuple[int, int] | None:
+    try:
+        io = psutil.Process(pid).io_counters()
+    except (psutil.Error, AttributeError, NotImplementedError):
+        return None
+    return int(io.read_bytes), int(io.write_bytes)
+
+
+class IoStats:
+    def __init__(self) -> None:
+        self._baselines: dict[int, _Baseline] = {}
+
+    def start(self, pid: int) -> None:
+        """Record the target's counters; does nothing if it is already tracked."""
+        pid = int(pid)
+        if pid in self._baselines:
+            return
+        counters = _io_bytes(pid)
+        if counters is None:
+            return
+        now = time.time()
+        try:
+            age = max(0.0, now - psutil.Process(pid).create_time())
+        except psutil.Error:
+            age = 0.0
+        self._baselines[pid] = _Baseline(counters[0], counters[1], now, age)
+
+    def forget(self, pid: int) -> None:
+        self._baselines.pop(int(pid), None)
+
+    def report(self, pid: int) -> IoRates | None:
+        """Average read/write rates before and since the first apply, or None if unknown."""
+        pid = int(pid)
+        base = self._baselines.get(pid)
+        if base is None:
+            return None
+        counters = _io_bytes(pid)
+        if counters is None:
+            return None
+        elapsed = time.time() - base.at
+        if elapsed <= 0:
+            return None
+
+        def rate(count: float, seconds: float) -> float:
+            return count / seconds if seconds > 0 else 0.0
+
+        return IoRates(
+            read_before=rate(base.read_bytes, base.age),
+            write_before=rate(base.write_bytes, base.age),
+            read_after=rate(max(0, counters[0] - base.read_bytes), elapsed),
+            write_after=rate(max(0, counters[1] - base.write_bytes), elapsed),
+            seconds=elapsed,
+        )
@@ -0,0 +1,403 @@
+"""Hard CPU rate caps for guard processes.
+
+Priority and affinity still let a guard use 100% of its core; a limiter
+caps it at a fixed share of one logical CPU:
+- Linux: each target is moved into its own cgroup under a managed cgroup
+  v2 subtree (`<root>/antiace/<name>-<pid>`) with `cpu.max` (and optionally
+  `cpu.weight`). `root` defaults to `/sys/fs/cgroup` and can point at any
+  directory (e.g. a fake cgroupfs in a temporary directory).
+- Windows: each target is assigned to its own job object with
+  `JOBOBJECT_CPU_RATE_CONTROL_INFORMATION` (hard cap).
+
+Caps are in percent of one logical CPU; 0 removes the cap. `release()`
+moves a target back where it came from (Linux, only if the pid is still in
+its managed group) or lifts the cap (Windows).
+
+The cgroup limiter can also limit disk bandwidth with `io.max` (read/write
+bytes per second on every whole disk) and memory with `memory.high`. There is
+no on-demand `memory.reclaim`: pages stay charged to the cgroup that
+allocated them, so reclaiming the managed group of a guard that was moved
+there after its start frees next to nothing. Windows has no per-process equivalent of these, so the job object limiter
+only supports the CPU cap.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import os
+import re
+from ctypes import wintypes
+from pathlib import Path
+
+from .policy import logical_cpu_count
+from .windows import PROCESS_QUERY_LIMITED_INFORMATION, PROCESS_SET_QUOTA, PROCESS_TERMINATE, _kernel32
+
+# cpu.max period in microseconds.
+CPU_MAX_PERIOD = 100_000
+
+
+class CpuLimiter:
+    """No-op limiter for platforms without a cap mechanism."""
+
+    name = "none"
+
+    def available(self) -> bool:
+        return False
+
+    def apply(self, pid: int, name: str, cap: float) -> tuple[bool, str]:
+        return False, "hard CPU cap not supported on this platform"
+
+    def check(self, pid: int, cap: float) -> bool | None:
+        """True if `pid` is capped at `cap`, False if not, None if unknown."""
+        return None
+
+    def io_available(self) -> bool:
+        return False
+
+    def apply_io(self, pid: int, name: str, rbps: int, wbps: int) -> tuple[bool, str]:
+        return False, "I/O bandwidth limits not supported on this platform"
+
+    def check_io(self, pid: int, rbps: int, wbps: int) -> bool | None:
+        return None
+
+    def memory_available(self) -> bool:
+        return False
+
+    def apply_memory(self, pid: int, name: str, high: int) -> tuple[bool, str]:
+        return False, "memory limits not supported on this platform"
+
+    def check_memory(self, pid: int, high: int) -> bool | None:
+        return None
+
+    def release(self, pid: int) -> None:
+        pass
+
+    def release_all(self) -> None:
+        pass
+
+
+def _cgroup_slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name) or "target"
+
+
+class CgroupLimiter(CpuLimiter):
+    name = "cgroup2"
+
+    def __init__(
+        self,
+        root: Path | str = "/sys/fs/cgroup",
+        *,
+        group: str = "antiace",
+        weight: int | None = None,
+        proc_root: Path | str = "/proc",
+        sys_root: Path | str = "/sys",
+    ) -> None:
+        self._root = Path(root)
+        self._sys = Path(sys_root)
+        self._base = self._root / group
+        self._weight = weight
+        self._proc = Path(proc_root)
+        # pid -> (managed cgroup dir, original cgroup path relative to root)
+        self._groups: dict[int, tuple[Path, str | None]] = {}
+
+    def _controllers(self) -> list[str]:
+        try:
+            return (self._root / "cgroup.controllers").read_text(encoding="ascii").split()
+        except OSError:
+            return []
+
+    def available(self) -> bool:
+        return "cpu" in self._controllers() and os.access(self._root, os.W_OK)
+
+    def io_available(self) -> bool:
+        return "io" in self._controllers() and os.access(self._root, os.W_OK) and bool(self._disks())
+
+    def memory_available(self) -> bool:
+        return "memory" in self._controllers() and os.access(self._root, os.W_OK)
+
+    def _ensure_base(self) -> None:
+        if self._base.is_dir():
+            return
+        # Enable the controllers for our subtree (and for its children); io and memory are optional.
+        for path in (self._root, self._base):
+            if path == self._base:
+                self._base.mkdir(exist_ok=True)
+            (path / "cgroup.subtree_control").write_text("+cpu", encoding="ascii")
+            for optional in ("+io", "+memory"):
+                try:
+                    (path / "cgroup.subtree_control").write_text(optional, encoding="ascii")
+                except OSError:
+                    pass
+
+    def _group(self, pid: int, name: str) -> Path:
+        """The target's managed cgroup, moving it there on first use."""
+        entry = self._groups.get(pid)
+        if entry is None:
+            self._ensure_base()
+            path = self._base / f"{_cgroup_slug(name)}-{pid}"
+            path.mkdir(exist_ok=True)
+            original = self._original_cgroup(pid)
+            (path / "cgroup.procs").write_text(str(pid), encoding="ascii")
+            entry = (path, original)
+            self._groups[pid] = entry
+        return entry[0]
+
+    def _disks(self) -> list[str]:
+        """MAJ:MIN of every whole disk (partitions, loop and ram devices excluded)."""
+        disks: list[str] = []
+        try:
+            entries = sorted((self._sys / "class" / "block").iterdir())
+        except OSError:
+            return disks
+        for entry in entries:
+            if entry.name.startswith(("loop", "ram", "zram")) or (entry / "partition").exists():
+                continue
+            try:
+                disks.append((entry / "dev").read_text(encoding="ascii").strip())
+            except OSError:
+                continue
+        return disks
+
+    def _original_cgroup(self, pid: int) -> str | None:
+        try:
+            lines = (self._proc / str(pid) / "cgroup").read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return None
+        for line in lines:
+            # cgroup v2 entry: "0::/user.slice/..."
+            if line.startswith("0::"):
+                return line[3:]
+        return None
+
+    def apply(self, pid: int, name: str, cap: float) -> tuple[bool, str]:
+        pid = int(pid)
+        try:
+            path = self._group(pid, name)
+            (path / "cpu.max").write_text(self._cpu_max(cap), encoding="ascii")
+            if self._weight is not None:
+                (path / "cpu.weight").write_text(str(int(self._weight)), encoding="ascii")
+        except OSError as e:
+            return False, f"cgroup: {type(e).__name__}: {e}"
+        if cap <= 0:
+            return True, "cpu_cap=off"
+        return True, f"cpu_cap={cap:g}% cgroup={path.name}"
+
+    @staticmethod
+    def _cpu_max(cap: float) -> str:
+        if cap <= 0:
+            return f"max {CPU_MAX_PERIOD}"
+        # The kernel rejects quotas below 1 ms.
+        quota = max(1000, int(CPU_MAX_PERIOD * float(cap) / 100.0))
+        return f"{quota} {CPU_MAX_PERIOD}"
+
+    def check(self, pid: int, cap: float) -> bool | None:
+        entry = self._groups.get(int(pid))
+        if entry is None:
+            return False
+        path = entry[0]
+        try:
+            procs = (path / "cgroup.procs").read_text(encoding="ascii").split()
+            cpu_max = (path / "cpu.max").read_text(encoding="ascii").strip()
+        except OSError:
+            return None
+        return str(int(pid)) in procs and cpu_max == self._cpu_max(cap)
+
+    @staticmethod
+    def _io_limit(value: int) -> str:
+        return str(int(value)) if value > 0 else "max"
+
+    def apply_io(self, pid: int, name: str, rbps: int, wbps: int) -> tuple[bool, str]:
+        pid = int(pid)
+        disks = self._disks()
+        if not disks:
+            return False, "io.max: no block devices found"
+        try:
+            path = self._group(pid, name)
+            for dev in disks:
+                # One device per write; the kernel parses a single line at a time.
+                line = f"{dev} rbps={self._io_limit(rbps)} wbps={self._io_limit(wbps)}"
+                (path / "io.max").write_text(line, encoding="ascii")
+        except OSError as e:
+            return False, f"cgroup: {type(e).__name__}: {e}"
+        if rbps <= 0 and wbps <= 0:
+            return True, "io_max=off"
+        return True, f"io_max=r:{self._io_limit(rbps)} w:{self._io_limit(wbps)} B/s devices={len(disks)}"
+
+    def check_io(self, pid: int, rbps: int, wbps: int) -> bool | None:
+        entry = self._groups.get(int(pid))
+        if entry is None:
+            return False
+        try:
+            lines = (entry[0] / "io.max").read_text(encoding="ascii").splitlines()
+        except OSError:
+            return None
+        # The kernel omits devices without limits; a fake cgroupfs keeps the last line written.
+        want = f"rbps={self._io_limit(rbps)} wbps={self._io_limit(wbps)}"
+        if rbps <= 0 and wbps <= 0:
+            return all(want in line or not line.strip() for line in lines)
+        limited = {line.split()[0] for line in lines if want in line}
+        return bool(limited) and (len(limited) == len(self._disks()) or len(lines) == 1)
+
+    @staticmethod
+    def _memory_high(high: int) -> str:
+        return str(int(high)) if high > 0 else "max"
+
+    def apply_memory(self, pid: int, name: str, high: int) -> tuple[bool, str]:
+        pid = int(pid)
+        try:
+            path = self._group(pid, name)
+            (path / "memory.high").write_text(self._memory_high(high), encoding="ascii")
+        except OSError as e:
+            return False, f"cgroup: {type(e).__name__}: {e}"
+        if high <= 0:
+            return True, "memory_high=off"
+        return True, f"memory_high={int(high) // (1024 * 1024)}MiB"
+
+    def check_memory(self, pid: int, high: int) -> bool | None:
+        entry = self._groups.get(int(pid))
+        if entry is None:
+            return False
+        try:
+            current = (entry[0] / "memory.high").read_text(encoding="ascii").strip()
+        except OSError:
+            return None
+        return current == self._memory_high(high)
+
+    @staticmethod
+    def _in_group(path: Path, pid: int) -> bool:
+        try:
+            return str(pid) in (path / "cgroup.procs").read_text(encoding="ascii").split()
+        except OSError:
+            return False
+
+    def release(self, pid: int) -> None:
+        entry = self._groups.pop(int(pid), None)
+        if entry is None:
+            return
+        path, original = entry
+        # Only move the pid back while it is still ours: after the target exited the
+        # pid may belong to an unrelated process that must stay where it is.
+        if original is not None and self._in_group(path, int(pid)):
+            try:
+                (self._root / original.lstrip("/") / "cgroup.procs").write_text(str(int(pid)), encoding="ascii")
+            except OSError:
+                pass
+        try:
+            path.rmdir()
+        except OSError:
+            # Still populated (or a plain directory in a fake cgroupfs with files in it).
+            pass
+
+    def release_all(self) -> None:
+        for pid in list(self._groups):
+            self.release(pid)
+
+
+class JOBOBJECT_CPU_RATE_CONTROL_INFORMATION(ctypes.Structure):
+    _fields_ = [
+        ("ControlFlags", wintypes.DWORD),
+        # Union of CpuRate / Weight / (MinRate, MaxRate); CpuRate is used here.
+        ("CpuRate", wintypes.DWORD),
+    ]
+
+
+JobObjectCpuRateControlInformation = 15
+JOB_OBJECT_CPU_RATE_CONTROL_ENABLE = 0x1
+JOB_OBJECT_CPU_RATE_CONTROL_HARD_CAP = 0x4
+
+
+class JobObjectLimiter(CpuLimiter):
+    name = "job_object"
+
+    def __init__(self) -> None:
+        # pid -> job handle
+        self._jobs: dict[int, object] = {}
+
+    def available(self) -> bool:
+        return _kernel32() is not None
+
+    @staticmethod
+    def _cpu_rate(cap: float) -> int:
+        # CpuRate is in 1/100 percent of the whole machine.
+        cpus = max(1, logical_cpu_count())
+        return max(1, min(10000, int(round(float(cap) * 100.0 / cpus))))
+
+    def _set_rate(self, job: object, cap: float) -> bool:
+        k32 = _kernel32()
+        info = JOBOBJECT_CPU_RATE_CONTROL_INFORMATION()
+        if cap > 0:
+            info.ControlFlags = JOB_OBJECT_CPU_RATE_CONTROL_ENABLE | JOB_OBJECT_CPU_RATE_CONTROL_HARD_CAP
+            info.CpuRate = self._cpu_rate(cap)
+        return bool(
+            k32.SetInformationJobObject(
+                job, JobObjectCpuRateControlInformation, ctypes.byref(info), ctypes.sizeof(info)
+            )
+        )
+
+    def apply(self, pid: int, name: str, cap: float) -> tuple[bool, str]:
+        k32 = _kernel32()
+        if k32 is None:
+            return False, "Not running on Windows"
+        pid = int(pid)
+        job = self._jobs.get(pid)
+        if job is None:
+            job = k32.CreateJobObjectW(None, None)
+            if not job:
+                return False, f"CreateJobObject failed errno={ctypes.get_last_error()}"
+            access = PROCESS_SET_QUOTA | PROCESS_TERMINATE | PROCESS_QUERY_LIMITED_INFORMATION
+            handle = k32.OpenProcess(access, False, pid)
+            if not handle:
+                k32.CloseHandle(job)
+                return False, f"OpenProcess failed (pid={pid}) errno={ctypes.get_last_error()}"
+            try:
+                if not k32.AssignProcessToJobObject(job, handle):
+                    err = ctypes.get_last_error()
+                    k32.CloseHandle(job)
+                    return False, f"AssignProcessToJobObject failed errno={err}"
+            finally:
+                k32.CloseHandle(handle)
+            self._jobs[pid] = job
+        if not self._set_rate(job, cap):
+            return False, f"SetInformationJobObject(CpuRateControl) failed errno={ctypes.get_last_error()}"
+        if cap <= 0:
+            return True, "cpu_cap=off"
+        return True, f"cpu_cap={cap:g}% job_rate={self._cpu_rate(cap)}"
+
+    def check(self, pid: int, cap: float) -> bool | None:
+        k32 = _kernel32()
+        job = self._jobs.get(int(pid))
+        if job is None:
+            return False
+        if k32 is None:
+            return None
+        info = JOBOBJECT_CPU_RATE_CONTROL_INFORMATION()
+        if not k32.QueryInformationJobObject(
+            job, JobObjectCpuRateControlInformation, ctypes.byref(info), ctypes.sizeof(info), None
+        ):
+            return None
+        if cap <= 0:
+            return not info.ControlFlags & JOB_OBJECT_CPU_RATE_CONTROL_ENABLE
+        return bool(info.ControlFlags & JOB_OBJECT_CPU_RATE_CONTROL_HARD_CAP) and info.CpuRate == self._cpu_rate(cap)
+
+    def release(self, pid: int) -> None:
+        job = self._jobs.pop(int(pid), None)
+        if job is None:
+            return
+        k32 = _kernel32()
+        try:
+            # A process cannot leave a job; lift the cap before dropping our handle.
+            self._set_rate(job, 0)
+        finally:
+            k32.CloseHandle(job)
+
+    def release_all(self) -> None:
+        for pid in list(self._jobs):
+            self.release(pid)
+
+
+def default_limiter(*, weight: int | None = None) -> CpuLimiter:
+    if os.name == "nt":
+        return JobObjectLimiter()
+    if os.path.isdir("/sys/fs/cgroup"):
+        return CgroupLimiter(weight=weight)
+    return CpuLimiter()
@@ -0,0 +1,249 @@
+"""Linux implementation of the apply pipeline.
+
+Guard processes also run as ordinary Linux processes under Wine/Proton
+(`SGuard64.exe` shows up as the process name), so the same policy can be
+applied with native calls:
+- priority: `sched_setscheduler(SCHED_IDLE)` + `setpriority` (nice)
+- affinity: `sched_setaffinity`
+- I/O priority: `ioprio_set(IOPRIO_CLASS_IDLE)`
+
+Scheduling class, nice value, affinity and I/O priority are per thread on
+Linux, so every step is applied to each task in `/proc/<pid>/task`; that
+also lets `tune_thread()` lower single hot threads (antiace.threads).
+There is no per-process power throttling on Linux; that step is skipped.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import os
+import platform
+
+import psutil
+
+from .policy import (
+    PRIORITY_BELOW_NORMAL,
+    PRIORITY_IDLE,
+    PRIORITY_NORMAL,
+    STEP_AFFINITY,
+    STEP_IO_PRIORITY,
+    STEP_PRIORITY,
+    ApplyResult,
+    Policy,
+    logical_cpu_count,
+)
+
+# priority -> (scheduling policy, nice)
+_PRIORITY_SCHED = {
+    PRIORITY_IDLE: (getattr(os, "SCHED_IDLE", 5), 19),
+    PRIORITY_BELOW_NORMAL: (getattr(os, "SCHED_OTHER", 0), 10),
+    PRIORITY_NORMAL: (getattr(os, "SCHED_OTHER", 0), 0),
+}
+
+# linux/ioprio.h
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_IDLE = 3
+
+_IO_PRIORITIES = {
+    PRIORITY_IDLE: IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT,
+    PRIORITY_NORMAL: (IOPRIO_CLASS_BE << IOPRIO_CLASS_SHIFT) | 4,
+}
+
+# (ioprio_set, ioprio_get) syscall numbers; no libc wrappers exist for these.
+_IOPRIO_SYSCALLS = {
+    "x86_64": (251, 252),
+    "amd64": (251, 252),
+    "i386": (289, 290),
+    "i686": (289, 290),
+    "aarch64": (30, 31),
+    "arm64": (30, 31),
+    "armv7l": (314, 315),
+}
+
+_SUPPORTED_STEPS = (STEP_PRIORITY, STEP_AFFINITY, STEP_IO_PRIORITY)
+
+_libc = None
+
+
+def _syscall():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(None, use_errno=True)
+    return _libc.syscall
+
+
+def _ioprio_set(tid: int, value: int) -> None:
+    nums = _IOPRIO_SYSCALLS.get(platform.machine().lower())
+    if nums is None:
+        # Unknown architecture: psutil knows the syscall number.
+        cls = value >> IOPRIO_CLASS_SHIFT
+        psutil.Process(tid).ionice(cls, None if cls == IOPRIO_CLASS_IDLE else value & 0x1FFF)
+        return
+    if _syscall()(nums[0], IOPRIO_WHO_PROCESS, int(tid), int(value)) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+
+def _ioprio_get(tid: int) -> int:
+    nums = _IOPRIO_SYSCALLS.get(platform.machine().lower())
+    if nums is None:
+        cls, value = psutil.Process(tid).ionice()
+        return (int(cls) << IOPRIO_CLASS_SHIFT) | int(value or 0)
+    rc = _syscall()(nums[1], IOPRIO_WHO_PROCESS, int(tid))
+    if rc < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return int(rc)
+
+
+def _thread_ids(pid: int) -> list[int]:
+    try:
+        return [int(t) for t in os.listdir(f"/proc/{int(pid)}/task")]
+    except FileNotFoundError:
+        raise psutil.NoSuchProcess(int(pid)) from None
+    except OSError:
+        return [int(pid)]
+
+
+def _for_each_thread(tids: list[int], fn) -> str | None:
+    """Run `fn(tid)` on every thread; return an error message if none succeeded."""
+    done = 0
+    last_error: OSError | None = None
+    for tid in tids:
+        try:
+            fn(tid)
+            done += 1
+        except ProcessLookupError:
+            # Thread exited meanwhile.
+            continue
+        except OSError as e:
+            last_error = e
+    if done == 0 and last_error is not None:
+        return f"{type(last_error).__name__}: {last_error}"
+    return None
+
+
+def apply_policy(pid: int, policy: Policy) -> ApplyResult:
+    """Apply `policy` to every thread of `pid`; each step records its own result."""
+    pid = int(pid)
+    result = ApplyResult(pid)
+    steps = [s for s in policy.steps() if s in _SUPPORTED_STEPS]
+    if not steps:
+        return result
+
+    try:
+        tids = _thread_ids(pid)
+    except psutil.NoSuchProcess as e:
+        result.fail_all(steps, f"NoSuchProcess: {e}")
+        return result
+
+    if policy.priority is not None:
+        sched = _PRIORITY_SCHED.get(policy.priority)
+        if sched is None:
+            result.add(STEP_PRIORITY, False, f"Unknown priority {policy.priority!r}")
+        else:
+            sched_policy, nice = sched
+
+            def set_priority(tid: int) -> None:
+                os.sched_setscheduler(tid, sched_policy, os.sched_param(0))
+                os.setpriority(os.PRIO_PROCESS, tid, nice)
+
+            err = _for_each_thread(tids, set_priority)
+            if err:
+                result.add(STEP_PRIORITY, False, err)
+            else:
+                result.add(STEP_PRIORITY, True, f"priority={policy.priority} nice={nice} threads={len(tids)}")
+
+    if policy.affinity is not None:
+        cpus = sorted(set(policy.affinity))
+        err = _for_each_thread(tids, lambda tid: os.sched_setaffinity(tid, cpus))
+        if err:
+            result.add(STEP_AFFINITY, False, err)
+        else:
+            result.add(STEP_AFFINITY, True, f"cpu_count={logical_cpu_count()} affinity={cpus}")
+
+    if policy.io_priority is not None:
+        value = _IO_PRIORITIES.get(policy.io_priority)
+        if value is None:
+            result.add(STEP_IO_PRIORITY, False, f"Unsupported io priority {policy.io_priority!r}")
+        else:
+            err = _for_each_thread(tids, lambda tid: _ioprio_set(tid, value))
+            if err:
+                result.add(STEP_IO_PRIORITY, False, err)
+            else:
+                result.add(STEP_IO_PRIORITY, True, f"io_priority={policy.io_priority}")
+
+    return result
+
+
+def tune_thread(tid: int, priority: str | None, cpu: int | None) -> tuple[bool, str]:
+    """Lower one thread's priority. Linux has no ideal processor, so `cpu` is ignored.
+
+    Pinning the thread instead would fight the process-wide affinity step.
+    """
+    if priority is None:
+        return True, "unchanged"
+    sched = _PRIORITY_SCHED.get(priority)
+    if sched is None:
+        return False, f"Unknown priority {priority!r}"
+    try:
+        os.sched_setscheduler(int(tid), sched[0], os.sched_param(0))
+        os.setpriority(os.PRIO_PROCESS, int(tid), sched[1])
+    except OSError as e:
+        return False, f"{type(e).__name__}: {e}"
+    return True, f"priority={priority} nice={sched[1]}"
+
+
+def _detect_policy_drift(
+    pid: int, policy: Policy, skip_threads: frozenset[int] = frozenset()
+) -> tuple[bool, list[str] | str]:
+    """Read-only check of every thread against `policy`; returns drifted step names.
+
+    Threads in `skip_threads` were tuned individually and are left out of the priority check.
+    """
+    try:
+        tids = _thread_ids(int(pid))
+    except psutil.NoSuchProcess as e:
+        return False, f"NoSuchProcess: {e}"
+
+    drifted: list[str] = []
+    try:
+        if policy.priority is not None and policy.priority in _PRIORITY_SCHED:
+            want = _PRIORITY_SCHED[policy.priority]
+            for tid in tids:
+                if tid in skip_threads:
+                    continue
+                try:
+                    if (os.sched_getscheduler(tid), os.getpriority(os.PRIO_PROCESS, tid)) != want:
+                        drifted.append(STEP_PRIORITY)
+                        break
+                except ProcessLookupError:
+                    continue
+
+        if policy.affinity is not None:
+            want_cpus = set(policy.affinity)
+            for tid in tids:
+                try:
+                    # The kernel keeps only the pinned CPUs the target's cpuset allows; a subset is
+                    # what was applied, and re-writing it would never change it.
+                    if not os.sched_getaffinity(tid) <= want_cpus:
+                        drifted.append(STEP_AFFINITY)
+                        break
+                except ProcessLookupError:
+                    continue
+
+        if policy.io_priority is not None and policy.io_priority in _IO_PRIORITIES:
+            want_io = _IO_PRIORITIES[policy.io_priority]
+            for tid in tids:
+                try:
+                    if _ioprio_get(tid) != want_io:
+                        drifted.append(STEP_IO_PRIORITY)
+                        break
+                except (ProcessLookupError, psutil.NoSuchProcess):
+                    continue
+    except (OSError, psutil.Error) as e:
+        return False, f"{type(e).__name__}: {e}"
+
+    return True, drifted
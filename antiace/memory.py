@@ -0,0 +1,138 @@
+"""Working-set trimming for guard processes.
+
+Low memory priority (Windows) and `memory.high` (Linux cgroup v2) are part of
+the policy; this module adds periodic trims on top. `MemoryTrimmer` tracks
+each target's RSS (`psutil` `memory_info`) and asks the backend to page it
+out (`SetProcessWorkingSetSize(-1, -1)`; Windows only, Linux relies on
+`memory.high`) when:
+
+- the RSS is at least `min_rss`, and
+- it grew by `regrow` (a fraction) since the last trim, and
+- the last trim of that target is at least `min_interval` seconds old.
+
+At most one target is trimmed per `spacing` seconds, so trims never pile up
+into a page-fault storm when the trimmed pages are touched again. Every trim
+reports the RSS before and after it.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import psutil
+
+from .backend import PlatformBackend
+
+MIB = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class TrimResult:
+    pid: int
+    name: str
+    ok: bool
+    message: str
+    rss_before: int
+    rss_after: int
+    at: float
+
+    @property
+    def freed(self) -> int:
+        return max(0, self.rss_before - self.rss_after)
+
+    def describe(self) -> str:
+        if not self.ok:
+            return f"trim failed: {self.message}"
+        return (
+            f"trimmed {self.freed / MIB:.1f} MiB "
+            f"(rss {self.rss_before / MIB:.1f} -> {self.rss_after / MIB:.1f} MiB)"
+        )
+
+
+@dataclass
+class _Target:
+    trims: int = 0
+    freed: int = 0
+    last_at: float = 0.0
+    # RSS right after the last trim; growth is measured from here.
+    last_rss: int = 0
+
+
+def _rss(pid: int) -> int | None:
+    try:
+        return int(psutil.Process(pid).memory_info().rss)
+    except psutil.Error:
+        return None
+
+
+class MemoryTrimmer:
+    def __init__(
+        self,
+        backend: PlatformBackend,
+        *,
+        min_rss: int = 32 * MIB,
+        regrow: float = 0.25,
+        min_interval: float = 600.0,
+        spacing: float = 5.0,
+        history: int = 64,
+    ) -> None:
+        self._backend = backend
+        self._min_rss = int(min_rss)
+        self._regrow = float(regrow)
+        self._min_interval = float(min_interval)
+        self._spacing = float(spacing)
+        self._last_trim = 0.0
+        self._targets: dict[int, _Target] = {}
+        self.results: deque[TrimResult] = deque(maxlen=max(1, int(history)))
+
+    @property
+    def available(self) -> bool:
+        return self._backend.can_trim
+
+    def forget(self, pid: int) -> None:
+        self._targets.pop(int(pid), None)
+
+    def _due(self, target: _Target, rss: int, now: float) -> bool:
+        if rss < self._min_rss:
+            return False
+        if target.trims and now - target.last_at < self._min_interval:
+            return False
+        return not target.trims or rss >= target.last_rss * (1.0 + self._regrow)
+
+    def sample(self, targets: list[tuple[int, str]], now: float | None = None) -> TrimResult | None:
+        """Trim the largest target that is due, if any; returns the result."""
+        now = time.time() if now is None else float(now)
+        if not self.available or now - self._last_trim < self._spacing:
+            return None
+        due: list[tuple[int, int, str]] = []
+        for pid, name in targets:
+            rss = _rss(pid)
+            if rss is None:
+                continue
+            target = self._targets.setdefault(int(pid), _Target())
+            if self._due(target, rss, now):
+                due.append((rss, int(pid), name))
+        if not due:
+            return None
+
+        rss, pid, name = max(due)
+        ok, message = self._backend.trim_memory(pid, name=name, nbytes=rss)
+        after = _rss(pid)
+        result = TrimResult(pid, name, ok, message, rss, after if after is not None else rss, now)
+        target = self._targets[pid]
+        target.trims += 1
+        target.last_at = now
+        target.last_rss = result.rss_after
+        target.freed += result.freed
+        self._last_trim = now
+        self.results.append(result)
+        return result
+
+    def stats(self, pid: int) -> tuple[int, int] | None:
+        """(trims, total bytes freed) for a target, or None if never trimmed."""
+        target = self._targets.get(int(pid))
+        if target is None or not target.trims:
+            return None
+        return target.trims, target.freed
@@ -1,42 +1,454 @@
 from __future__ import annotations
 
 import time
+from dataclasses import replace
 
-import psutil
-
-from .windows import _set_processor_affinity_last_cpu, _set_windows_efficiency_mode
+from .config import AppConfig, config_path
+from .controller import BudgetController
+from .iostats import IoRates, IoStats
+from .memory import MemoryTrimmer, TrimResult
+from .placement import DynamicPlacer
+from .processes import ProcessSnapshot, get_snapshot, get_tracker
+from .backend import PlatformBackend, get_backend
+from .policy import PRIORITY_IDLE, STEP_AFFINITY, Policy, guard_policy
+from .rules import Rule, RulePolicy, RuleSet, load_rules
+from .threads import ThreadProfiler
+from .topology import efficient_cpus, get_topology, select_guard_cpus
 
 
 class Optimizer:
-    def __init__(self, *, reapply_after_seconds: int = 300):
+    def __init__(
+        self,
+        *,
+        reapply_after_seconds: int = 300,
+        verify_after_seconds: float = 5.0,
+        policy: Policy | None = None,
+        backend: PlatformBackend | None = None,
+        placer: DynamicPlacer | None = None,
+        controller: BudgetController | None = None,
+        caps: dict[str, float] | None = None,
+        io_limits: dict[str, tuple[int, int]] | None = None,
+        memory_limits: dict[str, int] | None = None,
+        trimmer: MemoryTrimmer | None = None,
+        profiler: ThreadProfiler | None = None,
+        rules: RuleSet | None = None,
+    ):
+        self._policy = policy if policy is not None else guard_policy()
+        self._backend = backend if backend is not None else get_backend()
+        # Blind re-apply cadence, used only when the current state cannot be queried.
         self._reapply_after = int(reapply_after_seconds)
+        # Drift checks are cheap read-only queries, so they can run often.
+        self._verify_after = float(verify_after_seconds)
         self._last_applied: dict[int, float] = {}
+        self._last_verified: dict[int, float] = {}
+        # pid -> step -> when writing it last failed; such steps are retried on the
+        # reapply cadence only, not on every drift check.
+        self._failed_steps: dict[int, dict[str, float]] = {}
+        self._names: dict[int, str] = {}
+        # pid -> create_time seen when last applied; a change means the PID was reused.
+        self._create_times: dict[int, float | None] = {}
+        # Optional load-aware placement; moves the affinity pin between cores.
+        self._placer = placer
+        # Pin chosen at start-up, restored when no CPUs are reserved for a game.
+        self._base_affinity = self._policy.affinity
+        self._reserved: frozenset[int] = frozenset()
+        # Optional feedback loop: per-target escalation level instead of one fixed policy.
+        self._controller = controller
+        # Hard CPU cap per target name (lower-cased), in percent of one logical CPU.
+        self._caps = {name.lower(): float(cap) for name, cap in (caps or {}).items()}
+        # Disk bandwidth limit per target name, (read, write) bytes per second.
+        self._io_limits = {name.lower(): tuple(limit) for name, limit in (io_limits or {}).items()}
+        # memory.high per target name, in bytes.
+        self._memory_limits = {name.lower(): int(high) for name, high in (memory_limits or {}).items()}
+        # Read/write bytes before and after the first apply.
+        self._io_stats = IoStats()
+        # Optional periodic working-set trims.
+        self._trimmer = trimmer
+        # Optional hot-thread tuning; pid -> tid -> result of tuning that thread.
+        self._profiler = profiler
+        self._tuned_threads: dict[int, dict[int, str]] = {}
+        # Which processes are targets; pid -> the rule each target matched.
+        self._rules = rules if rules is not None else RuleSet.default()
+        self._matched: dict[int, Rule] = {}
+        self._found: list[tuple[str, int, Rule]] = []
+
+    @property
+    def verify_interval(self) -> float:
+        return self._verify_after
+
+    @property
+    def policy(self) -> Policy:
+        return self._policy
+
+    @property
+    def placer(self) -> DynamicPlacer | None:
+        return self._placer
+
+    @property
+    def reserved(self) -> frozenset[int]:
+        return self._reserved
+
+    @property
+    def controller(self) -> BudgetController | None:
+        return self._controller
+
+    @property
+    def rules(self) -> RuleSet:
+        return self._rules
+
+    def _with_limits(self, pid: int, policy: Policy, *, fixed: bool = True) -> Policy:
+        """Use the configured CPU cap, disk bandwidth and memory limits for this target's name.
+
+        With a controller the cap only applies at its capped level; without one
+        it is part of the fixed policy. The bandwidth and memory limits always
+        apply; pass fixed=False for partial applies that must not touch them.
+        The target's rule overrides both the limits and the policy itself.
+        """
+        name = self._names.get(pid, "").lower()
+        rule = self._matched.get(pid)
+        overrides = rule.policy if rule is not None else RulePolicy()
+        policy = overrides.override(policy, fixed=fixed)
+        cap = overrides.cpu_cap if overrides.cpu_cap is not None else self._caps.get(name)
+        if cap is not None and (
+            self._controller is None or (policy.cpu_cap is not None and policy.cpu_cap > 0)
+        ):
+            policy = replace(policy, cpu_cap=cap)
+        io_max = overrides.io_max if overrides.io_max is not None else self._io_limits.get(name)
+        if fixed and io_max is not None:
+            policy = replace(policy, io_max=io_max)
+        memory_high = overrides.memory_high if overrides.memory_high is not None else self._memory_limits.get(name)
+        if fixed and memory_high is not None:
+            policy = replace(policy, memory_high=memory_high)
+        return policy
+
+    def _policy_for(self, pid: int) -> Policy:
+        if self._controller is None:
+            return self._with_limits(pid, self._policy)
+        return self._with_limits(pid, self._controller.current_policy(pid, self._policy))
+
+    def io_reports(self) -> dict[int, IoRates]:
+        """Disk read/write rates of every tracked target before and since it was first optimized."""
+        reports: dict[int, IoRates] = {}
+        for pid in list(self._last_applied):
+            report = self._io_stats.report(pid)
+            if report is not None:
+                reports[pid] = report
+        return reports
+
+    def trim_memory(self) -> TrimResult | None:
+        """Trim the working set of at most one tracked target, if one is due (antiace.memory)."""
+        if self._trimmer is None:
+            return None
+        return self._trimmer.sample([(pid, self._names.get(pid, "")) for pid in list(self._last_applied)])
+
+    def memory_stats(self, pid: int) -> tuple[int, int] | None:
+        """(trims, total bytes freed) for a target."""
+        return self._trimmer.stats(pid) if self._trimmer is not None else None
+
+    def tune_threads(self) -> dict[int, list[tuple[int, float, bool, str]]]:
+        """Sample per-thread CPU of every target and lower the hot threads (antiace.threads).
+
+        Hot threads get idle thread priority and, while the target is pinned, a
+        guard CPU as ideal processor (round robin). A thread is tuned once; a
+        later priority or affinity apply resets that, so it is tuned again.
+
+        Returns pid -> [(tid, usage %, hot, tuning result)] for the busiest threads.
+        """
+        profiler = self._profiler
+        if profiler is None:
+            return {}
+        breakdown: dict[int, list[tuple[int, float, bool, str]]] = {}
+        for pid in list(self._last_applied):
+            usage = profiler.sample(pid)
+            if usage is None:
+                continue
+            tuned = self._tuned_threads.setdefault(pid, {})
+            cpus = self._policy_for(pid).affinity or ()
+            for i, thread in enumerate(u for u in usage if u.hot):
+                if thread.tid in tuned:
+                    continue
+                cpu = cpus[i % len(cpus)] if cpus else None
+                ok, msg = self._backend.tune_thread(thread.tid, priority=PRIORITY_IDLE, cpu=cpu)
+                tuned[thread.tid] = msg if ok else f"failed: {msg}"
+            live = {u.tid for u in usage}
+            for tid in [t for t in tuned if t not in live]:
+                del tuned[tid]
+            breakdown[pid] = [(u.tid, round(u.usage, 1), u.hot, tuned.get(u.tid, "")) for u in usage[:8]]
+        return breakdown
+
+    def forget(self, pid: int) -> None:
+        """Drop per-PID state once the process has exited."""
+        self._last_applied.pop(int(pid), None)
+        self._last_verified.pop(int(pid), None)
+        self._failed_steps.pop(int(pid), None)
+        self._names.pop(int(pid), None)
+        self._create_times.pop(int(pid), None)
+        self._matched.pop(int(pid), None)
+        self._rules.forget(pid)
+        if self._controller is not None:
+            self._controller.forget(pid)
+        self._io_stats.forget(pid)
+        if self._trimmer is not None:
+            self._trimmer.forget(pid)
+        if self._profiler is not None:
+            self._profiler.forget(pid)
+        self._tuned_threads.pop(int(pid), None)
+        self._backend.release(int(pid))
+        get_tracker().forget(pid)
+
+    def release_all(self) -> None:
+        """Lift caps kept outside the targets (cgroups, job objects), e.g. on exit."""
+        self._backend.release_all()
+
+    def _apply(
+        self, pid: int, policy: Policy, now: float, *, full: bool = False
+    ) -> tuple[bool, bool, str, bool, str]:
+        if pid not in self._last_applied:
+            self._io_stats.start(pid)
+        policy = self._with_limits(pid, policy, fixed=full)
+        if policy.priority is not None or policy.affinity is not None:
+            # Process-wide priority/affinity overrides per-thread tuning (every thread on Linux).
+            self._tuned_threads.pop(pid, None)
+        result = self._backend.apply_policy(pid, policy, name=self._names.get(pid, ""))
+        self._last_applied[pid] = now
+        self._last_verified[pid] = now
+        failed = self._failed_steps.setdefault(pid, {})
+        for step in result.steps:
+            if step.ok:
+                failed.pop(step.step, None)
+            else:
+                failed[step.step] = now
+        ok_eff, msg_eff = result.efficiency()
+        ok_aff, msg_aff = result.affinity()
+        return True, ok_eff, msg_eff, ok_aff, msg_aff
+
+    def _apply_labeled(self, pid: int, policy: Policy, now: float, label: str) -> tuple[bool, bool, str, bool, str]:
+        did_apply, ok_eff, msg_eff, ok_aff, msg_aff = self._apply(pid, policy, now)
+        if msg_eff != "unchanged":
+            msg_eff = f"{label}: {msg_eff}"
+        if msg_aff != "unchanged":
+            msg_aff = f"{label}: {msg_aff}"
+        return did_apply, ok_eff, msg_eff, ok_aff, msg_aff
 
     def optimize_pid(self, pid: int) -> tuple[bool, bool, str, bool, str]:
+        """Apply the policy once, then only re-write settings that have drifted.
+
+        With a BudgetController, each verify interval also measures the target's
+        CPU usage and escalates or relaxes it by one level.
+
+        Returns (did_apply, ok_eff, msg_eff, ok_aff, msg_aff); did_apply is False
+        when nothing needed writing.
+        """
+        pid = int(pid)
         now = time.time()
-        last = self._last_applied.get(int(pid), 0.0)
-        if now - last < self._reapply_after:
+        last = self._last_applied.get(pid)
+        if last is None:
+            if self._controller is not None:
+                return self._apply(pid, self._controller.policy_for(pid, self._policy), now, full=True)
+            return self._apply(pid, self._policy, now, full=True)
+
+        if now - self._last_verified.get(pid, last) < self._verify_after:
             return False, False, "", False, ""
+        self._last_verified[pid] = now
+
+        if self._controller is not None:
+            change = self._controller.update(pid, self._policy)
+            if change is not None and change.policy.steps():
+                return self._apply_labeled(pid, change.policy, now, change.describe(self._controller.budget))
 
-        ok_eff, msg_eff = _set_windows_efficiency_mode(int(pid))
-        ok_aff, msg_aff = _set_processor_affinity_last_cpu(int(pid))
-        self._last_applied[int(pid)] = now
-        return True, bool(ok_eff), str(msg_eff), bool(ok_aff), str(msg_aff)
+        policy = self._policy_for(pid)
+        ok, drifted = self._backend.detect_drift(
+            pid, policy, skip_threads=frozenset(self._tuned_threads.get(pid, ()))
+        )
+        if not ok or not isinstance(drifted, list):
+            # Cannot read the current state: fall back to blind re-application.
+            if now - last < self._reapply_after:
+                return False, False, "", False, ""
+            return self._apply(pid, policy, now, full=True)
 
-    def optimize_by_names(self, names: list[str]) -> list[tuple[str, int, bool, str, bool, str]]:
-        targets = {n.lower() for n in names}
+        # A write that failed (access denied, missing privilege) fails the same way on the
+        # next tick; retry it on the reapply cadence instead of reporting it every few seconds.
+        failed = self._failed_steps.get(pid, {})
+        drifted = [s for s in drifted if now - failed.get(s, now - self._reapply_after) >= self._reapply_after]
+        if not drifted:
+            return False, False, "", False, ""
+
+        return self._apply_labeled(pid, policy.only(drifted), now, "drift corrected")
+
+    def check_drift(self) -> list[tuple[str, int, bool, str, bool, str]]:
+        """Verify every tracked target and correct the ones that drifted from policy."""
+        rows: list[tuple[str, int, bool, str, bool, str]] = []
+        for pid in list(self._last_applied):
+            did_apply, ok_eff, msg_eff, ok_aff, msg_aff = self.optimize_pid(pid)
+            if did_apply:
+                rows.append((self._names.get(pid, str(pid)), pid, ok_eff, msg_eff, ok_aff, msg_aff))
+        return rows
+
+    def rebalance(self) -> list[tuple[str, int, bool, str, bool, str]]:
+        """Sample CPU load and, if the placer decides to move, re-pin every tracked target.
+
+        The new CPUs become part of the policy, so drift checks keep them in place.
+        """
+        placer = self._placer
+        if placer is None or self._policy.affinity is None:
+            return []
+        placer.sample()
+        decision = placer.choose()
+        if decision is None:
+            return []
+
+        started = time.perf_counter()
+        rows = self._repin(
+            decision.to_cpus,
+            f"moved {list(decision.from_cpus)}->{list(decision.to_cpus)} "
+            f"(load {decision.from_load}%->{decision.to_load}%)",
+        )
+        placer.commit(decision, targets=len(rows), apply_seconds=time.perf_counter() - started)
+        return rows
+
+    def reserve(self, cpus: frozenset[int]) -> list[tuple[str, int, bool, str, bool, str]]:
+        """Keep targets off `cpus` (the game's cores); an empty set restores the start-up pin.
+
+        Targets are only moved when their CPUs (or SMT siblings) clash with the
+        reservation, so a fluctuating hot set does not make them bounce. Targets
+        the budget controller relaxed off the pin run on every CPU outside the
+        reservation.
+        """
+        cpus = frozenset(cpus)
+        if cpus == self._reserved:
+            return []
+        current = self._policy.affinity
+        base = self._base_affinity
+        if current is None or base is None:
+            self._reserved = cpus
+            return []
+
+        topology = get_topology()
+        target = current
+        label = "game exited"
+        if cpus:
+            label = f"kept off game CPUs {sorted(cpus)}"
+            for i in current:
+                cpu = topology.get(i)
+                if cpus & set(cpu.siblings if cpu is not None else (i,)):
+                    target = select_guard_cpus(topology, count=len(base), preferred=base, exclude=cpus)
+                    break
+        elif self._placer is None:
+            # Dynamic placement already keeps the pin where load is lowest.
+            target = base
+
+        if self._placer is not None:
+            self._placer.reset(target, reserved=cpus)
+        return self._repin(target, f"{label}: {list(current)}->{list(target)}", reserved=cpus)
+
+    def _repin(
+        self, cpus: tuple[int, ...], label: str, *, reserved: frozenset[int] | None = None
+    ) -> list[tuple[str, int, bool, str, bool, str]]:
+        """Make `cpus` the policy affinity (and `reserved` the game's CPUs) and re-apply targets whose CPUs changed."""
+        before = {pid: self._policy_for(pid).affinity for pid in self._last_applied}
+        self._policy = replace(self._policy, affinity=tuple(cpus))
+        if reserved is not None:
+            self._reserved = reserved
+            if self._controller is not None:
+                self._controller.reserve(reserved)
+        rows: list[tuple[str, int, bool, str, bool, str]] = []
+        now = time.time()
+        for pid, old in before.items():
+            policy = self._policy_for(pid)
+            if policy.affinity is None or policy.affinity == old:
+                continue
+            _did_apply, _ok_eff, _msg_eff, ok_aff, msg_aff = self._apply(pid, policy.only([STEP_AFFINITY]), now)
+            if msg_aff != "unchanged":
+                msg_aff = f"{label}: {msg_aff}"
+            rows.append((self._names.get(pid, str(pid)), pid, True, "unchanged", ok_aff, msg_aff))
+        return rows
+
+    def _optimize_found(
+        self, name: str, pid: int, create_time: float | None, rule: Rule
+    ) -> tuple[str, int, bool, str, bool, str] | None:
+        if self._create_times.get(pid, create_time) != create_time:
+            self.forget(pid)
+        self._create_times[pid] = create_time
+        self._names[pid] = name
+        self._matched[pid] = rule
+        get_tracker().track(pid)
+        did_apply, ok_eff, msg_eff, ok_aff, msg_aff = self.optimize_pid(pid)
+        if not did_apply:
+            return None
+        return name, pid, ok_eff, msg_eff, ok_aff, msg_aff
+
+    def optimize_matching(
+        self,
+        *,
+        snapshot: ProcessSnapshot | None = None,
+    ) -> list[tuple[str, int, bool, str, bool, str]]:
+        """Optimize every process in `snapshot` that one of the rules matches.
+
+        Returns the rows that were applied; `matched()` has every target found.
+        """
+        snap = snapshot if snapshot is not None else get_snapshot()
         applied_rows: list[tuple[str, int, bool, str, bool, str]] = []
-        for proc in psutil.process_iter(["pid", "name"]):
-            try:
-                name = (proc.info.get("name") or "").lower()
-                pid = proc.info.get("pid")
-                if pid is None:
-                    continue
-                if name in targets:
-                    did_apply, ok_eff, msg_eff, ok_aff, msg_aff = self.optimize_pid(int(pid))
-                    if did_apply:
-                        applied_rows.append((str(proc.info.get("name") or name), int(pid), ok_eff, msg_eff, ok_aff, msg_aff))
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
+        self._found = self._rules.find(snap)
+        for name, pid, rule in self._found:
+            row = self._optimize_found(name, pid, snap.create_time(pid), rule)
+            if row is not None:
+                applied_rows.append(row)
+
+        return applied_rows
+
+    def matched(self) -> list[tuple[str, int, Rule]]:
+        """(name, pid, rule) of every target the last `optimize_matching` found."""
+        return list(self._found)
+
+    def optimize_started(self, pids: list[int]) -> list[tuple[str, int, bool, str, bool, str]]:
+        """Handle "process started" events from a ProcessWatcher.
+
+        Only the reported PIDs are looked up (re-read, since exec/comm events
+        change the name of a PID we may already know).
+        """
+        tracker = get_tracker()
+        applied_rows: list[tuple[str, int, bool, str, bool, str]] = []
+        for pid in pids:
+            found = tracker.lookup(pid, refresh=True)
+            if found is None:
+                continue
+            name, create_time = found
+            rule = self._rules.match(name, pid, create_time)
+            if rule is None:
+                continue
+            row = self._optimize_found(name, int(pid), create_time, rule)
+            if row is not None:
+                applied_rows.append(row)
 
         return applied_rows
+
+
+def optimizer_from_config(cfg: AppConfig, *, verify_after_seconds: float = 5.0) -> Optimizer:
+    """The optimizer the background monitor runs, with everything `cfg` turns on."""
+    policy = guard_policy(cfg.guard_cpus)
+    placer = None
+    if cfg.dynamic_placement and policy.affinity:
+        placer = DynamicPlacer(
+            policy.affinity,
+            eligible=efficient_cpus(get_topology()),
+            log_path=config_path().with_name("placement.jsonl"),
+        )
+    controller = None
+    if cfg.cpu_budget > 0:
+        controller = BudgetController(budget=cfg.cpu_budget, supported_steps=get_backend().steps)
+    trimmer = None
+    if cfg.memory_trim_interval > 0:
+        trimmer = MemoryTrimmer(get_backend(), min_interval=cfg.memory_trim_interval)
+    return Optimizer(
+        reapply_after_seconds=300,
+        verify_after_seconds=verify_after_seconds,
+        policy=policy,
+        placer=placer,
+        controller=controller,
+        caps=cfg.cpu_caps,
+        io_limits=cfg.io_limits,
+        memory_limits=cfg.memory_limits,
+        trimmer=trimmer,
+        profiler=ThreadProfiler() if cfg.thread_tuning else None,
+        rules=load_rules(cfg.rules),
+    )
@@ -0,0 +1,34 @@
+"""Where the config file lives, and its raw contents.
+
+Kept apart from antiace.config so the one-shot `--cli` can read the config
+without importing `dataclasses` (which brings `inspect`, `ast` and
+`tokenize`): with antiace.config imported up front, scripts/bench_startup.py
+measures about 90 ms of --cli import overhead and 94 modules here, against
+about 55 ms and 79 modules without it, and the --check budget is 80 ms.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+
+def _config_dir() -> Path:
+    appdata = os.environ.get("APPDATA")
+    if appdata:
+        return Path(appdata) / "antiace"
+    return Path.home() / ".antiace"
+
+
+def config_path() -> Path:
+    return _config_dir() / "config.json"
+
+
+def read_config_data() -> dict:
+    """The parsed config file; empty if it is missing or not a JSON object."""
+    try:
+        data = json.loads(config_path().read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
@@ -0,0 +1,203 @@
+"""Load-aware placement of guard processes.
+
+`DynamicPlacer` samples per-CPU utilisation over a sliding window and moves
+the guard pin to the least-loaded eligible CPU(s). A move happens only when
+the current CPUs are busier than the best candidate by a margin
+(`hysteresis`) and the last move is at least `min_dwell` seconds old, so
+targets do not bounce between cores on short bursts.
+
+Every decision is kept in memory (and optionally appended to a JSONL file)
+together with the loads it was based on and how long it took to apply.
+`stats()` also tracks the average load of the CPUs the guard sat on, to
+compare against a static pin.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import psutil
+
+
+@dataclass(frozen=True)
+class PlacementDecision:
+    at: float
+    from_cpus: tuple[int, ...]
+    to_cpus: tuple[int, ...]
+    # Window-average utilisation (percent) of the old and new CPUs.
+    from_load: float
+    to_load: float
+    # Number of targets re-pinned and how long applying took.
+    targets: int = 0
+    apply_seconds: float = 0.0
+
+
+class LoadSampler:
+    """Sliding window of `psutil.cpu_percent(percpu=True)` samples.
+
+    Each sample covers the time since the previous call, so the average is
+    weighted by that gap. At least `min_samples` samples are kept however old
+    they are: when the caller samples less often than `window / min_samples`
+    (drift checks backed off, see antiace.scheduler) the window stretches to
+    the last `min_samples` gaps instead of never holding enough of them.
+    """
+
+    def __init__(self, *, window: float = 30.0, min_samples: int = 1) -> None:
+        self._window = float(window)
+        self._min_samples = max(1, int(min_samples))
+        # (time, seconds covered, per-CPU loads)
+        self._samples: deque[tuple[float, float, list[float]]] = deque()
+        self._last = time.time()
+        # The first non-blocking call only sets the baseline.
+        try:
+            psutil.cpu_percent(percpu=True)
+        except Exception:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def sample(self, now: float | None = None) -> list[float] | None:
+        """Record utilisation since the previous call; return it, or None on failure."""
+        now = time.time() if now is None else float(now)
+        try:
+            loads = [float(x) for x in psutil.cpu_percent(percpu=True)]
+        except Exception:
+            return None
+        gap = max(0.0, now - self._last)
+        self._last = now
+        self._samples.append((now, gap, loads))
+        while len(self._samples) > self._min_samples and now - self._samples[0][0] > self._window:
+            self._samples.popleft()
+        return loads
+
+    def average(self) -> list[float] | None:
+        if not self._samples:
+            return None
+        width = min(len(loads) for _t, _gap, loads in self._samples)
+        total = sum(gap for _t, gap, _loads in self._samples)
+        if total <= 0:
+            n = len(self._samples)
+            return [sum(loads[i] for _t, _gap, loads in self._samples) / n for i in range(width)]
+        return [sum(loads[i] * gap for _t, gap, loads in self._samples) / total for i in range(width)]
+
+
+class DynamicPlacer:
+    def __init__(
+        self,
+        initial: tuple[int, ...],
+        *,
+        eligible: tuple[int, ...] | None = None,
+        window: float = 30.0,
+        min_samples: int = 3,
+        hysteresis: float = 20.0,
+        min_dwell: float = 60.0,
+        history: int = 256,
+        log_path: Path | None = None,
+    ) -> None:
+        self._current = tuple(sorted(initial))
+        self._eligible = tuple(sorted(set(eligible))) if eligible else None
+        # CPUs currently reserved for the game (antiace.games); never candidates.
+        self._reserved: frozenset[int] = frozenset()
+        self._min_samples = max(1, int(min_samples))
+        self._sampler = LoadSampler(window=window, min_samples=self._min_samples)
+        self._hysteresis = float(hysteresis)
+        self._min_dwell = float(min_dwell)
+        self._last_move = 0.0
+        self._log_path = log_path
+        self.decisions: deque[PlacementDecision] = deque(maxlen=max(1, int(history)))
+        # Running sum of the load on the CPUs the guard was pinned to, per sample.
+        self._placed_load_sum = 0.0
+        self._best_load_sum = 0.0
+        self._load_samples = 0
+
+    @property
+    def current(self) -> tuple[int, ...]:
+        return self._current
+
+    def reset(self, current: tuple[int, ...], *, reserved: frozenset[int] = frozenset()) -> None:
+        """Adopt a pin chosen elsewhere (e.g. after a game reservation change)."""
+        self._current = tuple(sorted(current))
+        self._reserved = frozenset(reserved)
+        self._last_move = time.time()
+
+    def sample(self, now: float | None = None) -> None:
+        loads = self._sampler.sample(now)
+        if not loads:
+            return
+        eligible = self._candidates(len(loads))
+        if not eligible:
+            return
+        self._placed_load_sum += self._load_of(self._current, loads)
+        self._best_load_sum += min(loads[i] for i in eligible)
+        self._load_samples += 1
+
+    def _candidates(self, cpu_count: int) -> list[int]:
+        pool = self._eligible if self._eligible is not None else tuple(range(cpu_count))
+        return [i for i in pool if 0 <= i < cpu_count and i not in self._reserved]
+
+    @staticmethod
+    def _load_of(cpus: tuple[int, ...], loads: list[float]) -> float:
+        picked = [loads[i] for i in cpus if 0 <= i < len(loads)]
+        return sum(picked) / len(picked) if picked else 0.0
+
+    def choose(self, now: float | None = None) -> PlacementDecision | None:
+        """Return a move to less loaded CPUs, or None to stay put."""
+        now = time.time() if now is None else float(now)
+        if len(self._sampler) < self._min_samples or now - self._last_move < self._min_dwell:
+            return None
+        loads = self._sampler.average()
+        if not loads:
+            return None
+        candidates = self._candidates(len(loads))
+        count = max(1, len(self._current))
+        if len(candidates) < count:
+            return None
+
+        # Least loaded first; ties keep the current CPUs, then the higher index (away from CPU 0).
+        ranked = sorted(candidates, key=lambda i: (loads[i], i not in self._current, -i))
+        best = tuple(sorted(ranked[:count]))
+        if best == self._current:
+            return None
+        current_load = self._load_of(self._current, loads)
+        best_load = self._load_of(best, loads)
+        if current_load - best_load < self._hysteresis:
+            return None
+        return PlacementDecision(now, self._current, best, round(current_load, 1), round(best_load, 1))
+
+    def commit(self, decision: PlacementDecision, *, targets: int, apply_seconds: float) -> PlacementDecision:
+        """Record a decision once it has been applied."""
+        done = PlacementDecision(
+            decision.at,
+            decision.from_cpus,
+            decision.to_cpus,
+            decision.from_load,
+            decision.to_load,
+            int(targets),
+            round(float(apply_seconds), 6),
+        )
+        self._current = done.to_cpus
+        self._last_move = done.at
+        self.decisions.append(done)
+        if self._log_path is not None:
+            try:
+                self._log_path.parent.mkdir(parents=True, exist_ok=True)
+                with self._log_path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(asdict(done)) + "\n")
+            except Exception:
+                pass
+        return done
+
+    def stats(self) -> dict[str, float | int]:
+        """Migrations so far and the average load of the guard's CPUs vs the idlest CPU."""
+        n = self._load_samples
+        return {
+            "migrations": len(self.decisions),
+            "samples": n,
+            "placed_load_avg": round(self._placed_load_sum / n, 1) if n else 0.0,
+            "idlest_load_avg": round(self._best_load_sum / n, 1) if n else 0.0,
+        }
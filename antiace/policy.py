@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import functools
+import os
+from dataclasses import dataclass, field
+
+import psutil
+
+PRIORITY_IDLE = "idle"
+PRIORITY_BELOW_NORMAL = "below_normal"
+PRIORITY_NORMAL = "normal"
+
+STEP_PRIORITY = "priority"
+STEP_POWER_THROTTLING = "power_throttling"
+STEP_AFFINITY = "affinity"
+STEP_IO_PRIORITY = "io_priority"
+STEP_CPU_CAP = "cpu_cap"
+STEP_IO_MAX = "io_max"
+STEP_MEMORY_PRIORITY = "memory_priority"
+STEP_MEMORY_HIGH = "memory_high"
+
+# Steps shown together in the GUI "Efficiency mode" column.
+EFFICIENCY_STEPS = (
+    STEP_PRIORITY,
+    STEP_POWER_THROTTLING,
+    STEP_IO_PRIORITY,
+    STEP_MEMORY_PRIORITY,
+    STEP_CPU_CAP,
+    STEP_IO_MAX,
+    STEP_MEMORY_HIGH,
+)
+
+
+@functools.lru_cache(maxsize=1)
+def logical_cpu_count() -> int:
+    """Logical CPU count, read once per process."""
+    return psutil.cpu_count(logical=True) or os.cpu_count() or 0
+
+
+@dataclass(frozen=True)
+class Policy:
+    """What to apply to a target. `None` fields are left untouched."""
+
+    priority: str | None = PRIORITY_IDLE
+    power_throttling: bool | None = True
+    affinity: tuple[int, ...] | None = None
+    io_priority: str | None = None
+    # Page priority of the working set (Windows); idle pages are the first to be trimmed.
+    memory_priority: str | None = None
+    # Hard CPU rate cap in percent of one logical CPU; 0 removes the cap.
+    cpu_cap: float | None = None
+    # Disk bandwidth limit as (read, write) bytes per second; 0 means unlimited.
+    io_max: tuple[int, int] | None = None
+    # Memory usage above which the target is throttled and reclaimed, in bytes; 0 removes the limit.
+    memory_high: int | None = None
+
+    def steps(self) -> list[str]:
+        """Names of the steps this policy asks for, in apply order."""
+        steps: list[str] = []
+        if self.priority is not None:
+            steps.append(STEP_PRIORITY)
+        if self.power_throttling is not None:
+            steps.append(STEP_POWER_THROTTLING)
+        if self.affinity is not None:
+            steps.append(STEP_AFFINITY)
+        if self.io_priority is not None:
+            steps.append(STEP_IO_PRIORITY)
+        if self.memory_priority is not None:
+            steps.append(STEP_MEMORY_PRIORITY)
+        if self.cpu_cap is not None:
+            steps.append(STEP_CPU_CAP)
+        if self.io_max is not None:
+            steps.append(STEP_IO_MAX)
+        if self.memory_high is not None:
+            steps.append(STEP_MEMORY_HIGH)
+        return steps
+
+    def only(self, steps: list[str] | tuple[str, ...]) -> Policy:
+        """Return a copy that keeps only the given steps (used to re-apply drifted settings)."""
+        return Policy(
+            priority=self.priority if STEP_PRIORITY in steps else None,
+            power_throttling=self.power_throttling if STEP_POWER_THROTTLING in steps else None,
+            affinity=self.affinity if STEP_AFFINITY in steps else None,
+            io_priority=self.io_priority if STEP_IO_PRIORITY in steps else None,
+            memory_priority=self.memory_priority if STEP_MEMORY_PRIORITY in steps else None,
+            cpu_cap=self.cpu_cap if STEP_CPU_CAP in steps else None,
+            io_max=self.io_max if STEP_IO_MAX in steps else None,
+            memory_high=self.memory_high if STEP_MEMORY_HIGH in steps else None,
+        )
+
+
+def guard_cpus(preferred: tuple[int, ...] | None = None) -> tuple[int, ...]:
+    """Logical CPUs for guard processes: `preferred` if valid here, else the least valuable core."""
+    # Imported lazily: topology depends on this module.
+    from .topology import get_topology, select_guard_cpus
+
+    return select_guard_cpus(get_topology(), preferred=preferred)
+
+
+def guard_policy(cpus: tuple[int, ...] | None = None) -> Policy:
+    """Default policy for guard processes: idle CPU/I/O/memory priority, power throttling, pinned to `guard_cpus()`."""
+    affinity = guard_cpus(cpus) if logical_cpu_count() > 0 else None
+    return Policy(affinity=affinity or None, io_priority=PRIORITY_IDLE, memory_priority=PRIORITY_IDLE)
+
+
+@dataclass(frozen=True)
+class StepResult:
+    step: str
+    ok: bool
+    message: str
+
+
+@dataclass
+class ApplyResult:
+    pid: int
+    steps: list[StepResult] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return all(s.ok for s in self.steps)
+
+    def add(self, step: str, ok: bool, message: str) -> None:
+        self.steps.append(StepResult(step, bool(ok), str(message)))
+
+    def fail_all(self, steps: list[str], message: str) -> None:
+        for step in steps:
+            self.add(step, False, message)
+
+    def group(self, steps: tuple[str, ...]) -> tuple[bool, str]:
+        """Collapse several steps into one (ok, message) pair; "unchanged" if none ran."""
+        picked = [s for s in self.steps if s.step in steps]
+        if not picked:
+            return True, "unchanged"
+        failed = [s for s in picked if not s.ok]
+        if failed:
+            return False, "; ".join(dict.fromkeys(s.message for s in failed))
+        return True, "ok (" + " + ".join(s.message for s in picked) + ")"
+
+    def efficiency(self) -> tuple[bool, str]:
+        return self.group(EFFICIENCY_STEPS)
+
+    def affinity(self) -> tuple[bool, str]:
+        return self.group((STEP_AFFINITY,))
@@ -1,22 +1,275 @@
 from __future__ import annotations
 
+import os
+import threading
+import time
+
 import psutil
 
 
-def search_process(process_names: list[str] | tuple[str, ...]) -> list[tuple[str, int]]:
-    """搜索指定名称的进程，返回匹配到的 (name, pid) 列表"""
-    target_names = {name.lower() for name in process_names}
-    found: list[tuple[str, int]] = []
+class ProcessSnapshot:
+    """One view of the process table, indexed by lowercase name.
+
+    A monitor tick takes a single snapshot and hands it to every check
+    (launcher detection, optimizer, GUI scan) instead of letting each of them
+    walk the process table on its own.
+    """
+
+    def __init__(
+        self,
+        entries: list[tuple[str, int]],
+        *,
+        create_times: dict[int, float | None] | None = None,
+        parents: dict[int, int] | None = None,
+        taken_at: float | None = None,
+    ):
+        self.taken_at = time.monotonic() if taken_at is None else float(taken_at)
+        self._count = len(entries)
+        self._create_times = create_times or {}
+        self._parents = parents or {}
+        self._by_name: dict[str, list[tuple[str, int]]] = {}
+        self._by_pid: dict[int, str] = {}
+        for name, pid in entries:
+            self._by_name.setdefault(name.lower(), []).append((name, int(pid)))
+            self._by_pid[int(pid)] = name
+
+    def __len__(self) -> int:
+        return self._count
+
+    def age(self) -> float:
+        return time.monotonic() - self.taken_at
+
+    def create_time(self, pid: int) -> float | None:
+        return self._create_times.get(int(pid))
+
+    def name(self, pid: int) -> str | None:
+        return self._by_pid.get(int(pid))
+
+    def parent(self, pid: int) -> int | None:
+        """Parent PID as read when the process was first seen."""
+        return self._parents.get(int(pid))
+
+    def descendants(self, roots: set[int] | list[int]) -> list[int]:
+        """PIDs below `roots` in the parent links of this snapshot, ordered by PID.
+
+        A child must not predate its parent, so a link to a PID that has since
+        been reused by a younger process is not followed.
+        """
+        children: dict[int, list[int]] = {}
+        for pid, ppid in self._parents.items():
+            if pid != ppid:
+                children.setdefault(ppid, []).append(pid)
+        found: set[int] = set()
+        stack = [int(pid) for pid in roots]
+        while stack:
+            parent = stack.pop()
+            parent_ct = self._create_times.get(parent)
+            for child in children.get(parent, ()):
+                child_ct = self._create_times.get(child)
+                if child in found or (parent_ct is not None and child_ct is not None and child_ct < parent_ct):
+                    continue
+                found.add(child)
+                stack.append(child)
+        return sorted(found)
+
+    def names(self) -> list[str]:
+        """Every distinct lowercase name in the snapshot (for pattern matching)."""
+        return list(self._by_name)
+
+    def pids(self, name: str) -> list[int]:
+        key = name.lower()
+        return [pid for _name, pid in self._by_name.get(key, ())]
+
+    def is_running(self, name: str) -> bool:
+        key = name.lower()
+        return key in self._by_name
+
+    def find(self, names: list[str] | tuple[str, ...]) -> list[tuple[str, int]]:
+        """Return (name, pid) for every process matching one of `names`, ordered by PID."""
+        keys = {n.lower() for n in names}
+        found: list[tuple[str, int]] = []
+        for key in keys:
+            found.extend(self._by_name.get(key, ()))
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+class ProcessTracker:
+    """Incrementally maintained `(pid, create_time) -> (name, parent pid)` table.
+
+    `refresh()` lists PIDs (cheap: EnumProcesses / `/proc` listing), drops the
+    ones that went away and reads name and parent only for PIDs it has not
+    seen before, so a steady-state refresh costs O(new processes).
+
+    A PID reused between two listings is caught through create_time, which is
+    re-read only where it matters: every refresh for the PIDs callers `track()`
+    (optimized targets, the launcher), and for a rotating slice of
+    `verify_batch` other PIDs, so every entry is re-validated within
+    `len(table) / verify_batch` refreshes. Exit notifications (`forget()`) and
+    watcher start events (`lookup(refresh=True)`) evict the rest sooner.
+    """
+
+    def __init__(self, *, verify_batch: int = 64):
+        self._lock = threading.Lock()
+        # pid -> (create_time, name, parent pid)
+        self._table: dict[int, tuple[float | None, str, int | None]] = {}
+        self._tracked: set[int] = set()
+        self._verify_batch = max(0, int(verify_batch))
+        # PIDs still to re-validate in the current rotation, consumed from the end.
+        self._rotation: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    @staticmethod
+    def _read(pid: int, parents: dict[int, int] | None = None) -> tuple[float | None, str, int | None] | None:
+        """`parents` is a pid -> ppid map read in bulk (Windows); otherwise ppid is read per process."""
+        try:
+            # Process() reads create_time itself to build its identity.
+            proc = psutil.Process(pid)
+            create_time = proc.create_time()
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+        except psutil.AccessDenied:
+            create_time = None
+            proc = None
+        name = ""
+        ppid = parents.get(pid) if parents is not None else None
+        if proc is not None:
+            try:
+                # One /proc/<pid>/stat read for both on Linux.
+                with proc.oneshot():
+                    name = proc.name() or ""
+                    if parents is None:
+                        ppid = proc.ppid()
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                return None
+            except psutil.AccessDenied:
+                pass
+        return create_time, name, ppid
 
-    for proc in psutil.process_iter(["pid", "name"]):
+    @staticmethod
+    def _read_create_time(pid: int) -> float | None:
         try:
-            name = proc.info.get("name") or ""
-            pid = proc.info.get("pid")
-            if pid is None:
-                continue
-            if name.lower() in target_names:
-                found.append((name, int(pid)))
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-
-    return found
+            return psutil.Process(pid).create_time()
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return -1.0
+        except psutil.AccessDenied:
+            return None
+
+    @staticmethod
+    def _bulk_parents() -> dict[int, int] | None:
+        if os.name != "nt":
+            return None
+        # psutil's Windows ppid() walks the whole process table per call; one
+        # Toolhelp32 pass covers every new PID. Imported here to keep ctypes out of
+        # the tracker's import cost on the --cli path.
+        from .windows import parent_pids
+
+        return parent_pids() or None
+
+    def lookup(self, pid: int, *, refresh: bool = False) -> tuple[str, float | None] | None:
+        """Return `(name, create_time)` for `pid`, reading it once if the PID is new.
+
+        `refresh=True` re-reads a known PID, e.g. after an exec/comm event changed its name.
+        """
+        pid = int(pid)
+        with self._lock:
+            entry = None if refresh else self._table.get(pid)
+            if entry is None:
+                entry = self._read(pid)
+                if entry is None:
+                    self._table.pop(pid, None)
+                    return None
+                self._table[pid] = entry
+            create_time, name, _ppid = entry
+            if not name:
+                return None
+            return name, create_time
+
+    def track(self, pid: int) -> None:
+        """Re-validate `pid` against create_time on every refresh until it goes away."""
+        with self._lock:
+            self._tracked.add(int(pid))
+
+    def forget(self, pid: int) -> None:
+        """Drop `pid`, e.g. once its exit was reported; it is read again if it reappears."""
+        with self._lock:
+            self._table.pop(int(pid), None)
+            self._tracked.discard(int(pid))
+
+    def _suspects(self) -> list[int]:
+        table = self._table
+        suspects = [pid for pid in self._tracked if pid in table]
+        rotation = self._rotation
+        if not rotation:
+            rotation.extend(table)
+        batch = rotation[-self._verify_batch :] if self._verify_batch else []
+        del rotation[len(rotation) - len(batch) :]
+        suspects.extend(pid for pid in batch if pid in table)
+        return suspects
+
+    def refresh(self) -> ProcessSnapshot:
+        with self._lock:
+            current = set(psutil.pids())
+            table = self._table
+
+            for pid in table.keys() - current:
+                del table[pid]
+            self._tracked &= current
+
+            for pid in self._suspects():
+                if pid not in table:
+                    continue
+                known_ct = table[pid][0]
+                ct = self._read_create_time(pid)
+                if ct is not None and ct != known_ct:
+                    # Exited (-1) or a different process reusing the PID: re-read below.
+                    del table[pid]
+                    self._tracked.discard(pid)
+
+            new = current - table.keys()
+            parents = self._bulk_parents() if new else None
+            for pid in new:
+                entry = self._read(pid, parents)
+                if entry is not None:
+                    table[pid] = entry
+
+            entries = [(name, pid) for pid, (_ct, name, _ppid) in table.items() if name]
+            create_times = {pid: ct for pid, (ct, _name, _ppid) in table.items()}
+            ppids = {pid: ppid for pid, (_ct, _name, ppid) in table.items() if ppid is not None}
+        return ProcessSnapshot(entries, create_times=create_times, parents=ppids)
+
+
+_tracker = ProcessTracker()
+_snapshot_lock = threading.Lock()
+_last_snapshot: ProcessSnapshot | None = None
+
+
+def get_tracker() -> ProcessTracker:
+    return _tracker
+
+
+def get_snapshot(*, max_age: float = 2.0) -> ProcessSnapshot:
+    """Return the shared snapshot, refreshing the tracker only if it is older than `max_age` seconds.
+
+    Pass `max_age=0` to force a refresh (the monitor does this once per tick);
+    other callers in the same tick then reuse that result.
+    """
+    global _last_snapshot
+    with _snapshot_lock:
+        snap = _last_snapshot
+        if snap is None or max_age <= 0 or snap.age() > max_age:
+            snap = _tracker.refresh()
+            _last_snapshot = snap
+        return snap
+
+
+def search_process(
+    process_names: list[str] | tuple[str, ...],
+    *,
+    snapshot: ProcessSnapshot | None = None,
+) -> list[tuple[str, int]]:
+    """搜索指定名称的进程，返回匹配到的 (name, pid) 列表"""
+    snap = snapshot if snapshot is not None else get_snapshot()
+    return snap.find(process_names)
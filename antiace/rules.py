@@ -0,0 +1,321 @@
+"""Target rules: which processes get optimized, and with which policy.
+
+A rule always matches on the process name (case-insensitive, `*` / `?`
+wildcards allowed) and optionally on:
+
+- `exe`: glob on the full executable path (case-insensitive),
+- `cmdline`: regular expression searched in the command line (arguments
+  joined by spaces),
+- `parent`: name of the parent process (case-insensitive),
+
+and carries a `policy` with overrides of the default guard policy. Rules
+come from `"rules"` in config.json; the first matching rule wins:
+
+    "rules": [
+      {"name": "SGuard64.exe", "parent": "wegame.exe"},
+      {"name": "SGuardSvc64.exe", "policy": {"cpu_cap": 5}},
+      {"name": "*.exe", "exe": "*\\\\Tencent\\\\*", "cmdline": "--guard", "policy": {"pin": false}}
+    ]
+
+Without rules every name in `GUARD_PROCESSES` is a rule with the default
+policy. Invalid rules (bad regex, unknown policy value) are skipped.
+
+`RuleSet` compiles the rules once. Exact names go into a dict and wildcard
+names into one combined regex, so the per-process test is a dict lookup.
+Only processes whose name passes have their exe / cmdline / parent read,
+and that verdict is cached per (pid, create_time), so a scan with 50 rules
+costs what a scan with two names does.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import re
+import threading
+from dataclasses import dataclass, field, replace
+
+import psutil
+
+from .policy import PRIORITY_BELOW_NORMAL, PRIORITY_IDLE, PRIORITY_NORMAL, Policy
+from .processes import ProcessSnapshot, get_tracker
+from .wegame import GUARD_PROCESSES
+
+_PRIORITIES = (PRIORITY_IDLE, PRIORITY_BELOW_NORMAL, PRIORITY_NORMAL)
+
+
+@dataclass(frozen=True)
+class RulePolicy:
+    """Overrides of the guard policy for the targets of one rule; None keeps the default."""
+
+    priority: str | None = None
+    power_throttling: bool | None = None
+    io_priority: str | None = None
+    memory_priority: str | None = None
+    # False leaves the affinity alone instead of pinning to the guard CPUs.
+    pin: bool = True
+    # Same meaning as the per-name cpu_caps / io_limits / memory_limits; these take precedence.
+    cpu_cap: float | None = None
+    io_max: tuple[int, int] | None = None
+    memory_high: int | None = None
+
+    def override(self, policy: Policy, *, fixed: bool = True) -> Policy:
+        """Apply the priority / throttling / pinning overrides to `policy`.
+
+        With fixed=False (a partial re-apply) only steps `policy` already has are overridden.
+        """
+        changes: dict[str, object] = {}
+        for name in ("priority", "power_throttling", "io_priority", "memory_priority"):
+            value = getattr(self, name)
+            if value is not None and (fixed or getattr(policy, name) is not None):
+                changes[name] = value
+        if not self.pin and policy.affinity is not None:
+            changes["affinity"] = None
+        return replace(policy, **changes) if changes else policy
+
+    @property
+    def has_limits(self) -> bool:
+        """True if the rule sets a hard limit (cpu_cap / io_max / memory_high)."""
+        return self.cpu_cap is not None or self.io_max is not None or self.memory_high is not None
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    exe: str | None = None
+    cmdline: str | None = None
+    parent: str | None = None
+    policy: RulePolicy = field(default_factory=RulePolicy)
+
+    @property
+    def needs_details(self) -> bool:
+        """True if matching needs more than the process name."""
+        return self.exe is not None or self.cmdline is not None or self.parent is not None
+
+
+def _is_number(value: object) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _parse_policy(data: object) -> RulePolicy | None:
+    if data is None:
+        return RulePolicy()
+    if not isinstance(data, dict):
+        return None
+    values: dict[str, object] = {}
+    for name in ("priority", "io_priority", "memory_priority"):
+        value = data.get(name)
+        if value is not None:
+            if value not in _PRIORITIES:
+                return None
+            values[name] = value
+    for name in ("power_throttling", "pin"):
+        value = data.get(name)
+        if value is not None:
+            if not isinstance(value, bool):
+                return None
+            values[name] = value
+    cap = data.get("cpu_cap")
+    if cap is not None:
+        if not _is_number(cap) or cap <= 0:
+            return None
+        values["cpu_cap"] = float(cap)
+    io_max = data.get("io_max")
+    if io_max is not None:
+        if not (
+            isinstance(io_max, list)
+            and len(io_max) == 2
+            and all(isinstance(v, int) and not isinstance(v, bool) and v >= 0 for v in io_max)
+        ):
+            return None
+        values["io_max"] = (io_max[0], io_max[1])
+    high = data.get("memory_high")
+    if high is not None:
+        if not isinstance(high, int) or isinstance(high, bool) or high <= 0:
+            return None
+        values["memory_high"] = high
+    return RulePolicy(**values)
+
+
+def parse_rule(data: object) -> Rule | None:
+    """Build a rule from its config entry; None if the entry is invalid."""
+    if not isinstance(data, dict):
+        return None
+    name = data.get("name")
+    if not isinstance(name, str) or not name.strip():
+        return None
+    attrs: dict[str, str | None] = {}
+    for key in ("exe", "cmdline", "parent"):
+        value = data.get(key)
+        if value is not None and not (isinstance(value, str) and value.strip()):
+            return None
+        attrs[key] = value.strip() if isinstance(value, str) else None
+    if attrs["cmdline"] is not None:
+        try:
+            re.compile(attrs["cmdline"])
+        except re.error:
+            return None
+    policy = _parse_policy(data.get("policy"))
+    if policy is None:
+        return None
+    return Rule(name=name.strip(), policy=policy, **attrs)
+
+
+def _has_wildcards(pattern: str) -> bool:
+    return any(c in pattern for c in "*?[")
+
+
+class _Details:
+    """exe / cmdline / parent name of one process, each read on first use."""
+
+    def __init__(self, pid: int) -> None:
+        self._pid = pid
+        self._proc: psutil.Process | None = None
+        self._values: dict[str, str | None] = {}
+
+    def _process(self) -> psutil.Process:
+        if self._proc is None:
+            self._proc = psutil.Process(self._pid)
+        return self._proc
+
+    def get(self, key: str) -> str | None:
+        """None when the attribute can't be read (exited, access denied)."""
+        if key not in self._values:
+            try:
+                if key == "exe":
+                    value = self._process().exe() or None
+                elif key == "cmdline":
+                    value = " ".join(self._process().cmdline()) or None
+                else:
+                    parent = get_tracker().lookup(self._process().ppid())
+                    value = parent[0] if parent else None
+            except psutil.Error:
+                value = None
+            self._values[key] = value
+        return self._values[key]
+
+
+class RuleSet:
+    def __init__(self, rules: list[Rule] | tuple[Rule, ...]) -> None:
+        self._rules = tuple(rules)
+        # lowercase name -> [(rule index, rule)] in config order.
+        self._exact: dict[str, list[tuple[int, Rule]]] = {}
+        self._globs: list[tuple[int, re.Pattern[str], Rule]] = []
+        self._details: list[tuple[re.Pattern[str] | None, re.Pattern[str] | None, str | None]] = []
+        for index, rule in enumerate(self._rules):
+            if _has_wildcards(rule.name):
+                pattern = re.compile(fnmatch.translate(rule.name.lower()))
+                self._globs.append((index, pattern, rule))
+            else:
+                self._exact.setdefault(rule.name.lower(), []).append((index, rule))
+            self._details.append(
+                (
+                    re.compile(fnmatch.translate(rule.exe.lower())) if rule.exe else None,
+                    re.compile(rule.cmdline) if rule.cmdline else None,
+                    rule.parent.lower() if rule.parent else None,
+                )
+            )
+        # One regex for every wildcard name: a non-candidate costs a single match.
+        self._any_glob = (
+            re.compile("|".join(f"(?:{p.pattern})" for _i, p, _r in self._globs)) if self._globs else None
+        )
+        # lowercase name -> candidate rules; process names repeat from scan to scan.
+        self._candidate_cache: dict[str, list[tuple[int, Rule]]] = {}
+        self._lock = threading.Lock()
+        # pid -> (create_time, name, matched rule) for processes that needed details.
+        self._verdicts: dict[int, tuple[float | None, str, Rule | None]] = {}
+
+    @classmethod
+    def default(cls) -> RuleSet:
+        """One name-only rule per `GUARD_PROCESSES` entry."""
+        return cls([Rule(name=name) for name in GUARD_PROCESSES])
+
+    @property
+    def rules(self) -> tuple[Rule, ...]:
+        return self._rules
+
+    def names(self) -> list[str]:
+        """Rule names (patterns included) in config order, for display."""
+        return list(dict.fromkeys(rule.name for rule in self._rules))
+
+    def exact_names(self) -> list[str]:
+        """Names that match without wildcards."""
+        return list(dict.fromkeys(rule.name for _key, rules in self._exact.items() for _i, rule in rules))
+
+    def is_candidate(self, name: str) -> bool:
+        """Whether a process called `name` could match a rule (exe / cmdline / parent not checked)."""
+        return bool(self._candidates(name.lower()))
+
+    def _candidates(self, key: str) -> list[tuple[int, Rule]]:
+        cache = self._candidate_cache
+        candidates = cache.get(key)
+        if candidates is None:
+            candidates = list(self._exact.get(key, ()))
+            if self._any_glob is not None and self._any_glob.match(key):
+                candidates += [(i, rule) for i, pattern, rule in self._globs if pattern.match(key)]
+                candidates.sort(key=lambda item: item[0])
+            if len(cache) >= 4096:
+                cache.clear()
+            cache[key] = candidates
+        return candidates
+
+    def _matches(self, index: int, details: _Details) -> bool:
+        exe, cmdline, parent = self._details[index]
+        if exe is not None:
+            value = details.get("exe")
+            if value is None or not exe.match(value.lower()):
+                return False
+        if cmdline is not None:
+            value = details.get("cmdline")
+            if value is None or not cmdline.search(value):
+                return False
+        if parent is not None:
+            value = details.get("parent")
+            if value is None or value.lower() != parent:
+                return False
+        return True
+
+    def match(self, name: str, pid: int, create_time: float | None = None) -> Rule | None:
+        """The first rule matching this process, or None."""
+        candidates = self._candidates(name.lower())
+        if not candidates:
+            return None
+        if not candidates[0][1].needs_details:
+            return candidates[0][1]
+        pid = int(pid)
+        with self._lock:
+            verdict = self._verdicts.get(pid)
+        if verdict is not None and verdict[:2] == (create_time, name):
+            return verdict[2]
+        details = _Details(pid)
+        matched = next((rule for index, rule in candidates if self._matches(index, details)), None)
+        with self._lock:
+            self._verdicts[pid] = (create_time, name, matched)
+        return matched
+
+    def find(self, snapshot: ProcessSnapshot) -> list[tuple[str, int, Rule]]:
+        """(name, pid, rule) of every matching process in `snapshot`, ordered by PID."""
+        keys = list(self._exact)
+        if self._any_glob is not None:
+            keys += [key for key in snapshot.names() if key not in self._exact and self._candidates(key)]
+        found: list[tuple[str, int, Rule]] = []
+        seen: set[int] = set()
+        for name, pid in snapshot.find(keys):
+            seen.add(pid)
+            rule = self.match(name, pid, snapshot.create_time(pid))
+            if rule is not None:
+                found.append((name, pid, rule))
+        # Every candidate was just seen: drop the verdicts of processes that are gone.
+        with self._lock:
+            for pid in [pid for pid in self._verdicts if pid not in seen]:
+                del self._verdicts[pid]
+        return found
+
+    def forget(self, pid: int) -> None:
+        with self._lock:
+            self._verdicts.pop(int(pid), None)
+
+
+def load_rules(raw: tuple[dict, ...] | list[dict] = ()) -> RuleSet:
+    """Compile the `rules` config entries; the default guard rules if none is valid."""
+    rules = [rule for rule in (parse_rule(entry) for entry in raw) if rule is not None]
+    return RuleSet(rules) if rules else RuleSet.default()
@@ -0,0 +1,186 @@
+"""Adaptive cadence for the background monitor loop.
+
+The loop waits on an event (process start/exit notifications, quit) and
+otherwise wakes for two kinds of periodic work: a full process scan and
+drift checks of the targets already optimized. `MonitorScheduler` decides
+when each is due:
+
+- While scans find the same process set and drift checks find nothing to
+  correct, both intervals grow by `factor` per quiet round, up to
+  `scan_max` / `verify_max`.
+- Churn (a target or launcher started or exited, the launcher restarted, a
+  drift was corrected) snaps both back to their base intervals.
+- While the system is busy (total CPU above `busy_load` percent), work the
+  caller marks as non-urgent is deferred, for at most `max_defer` seconds.
+
+`stats()` reports wakeups per minute over a sliding window: the monitor
+loop's own plus those of helper threads (process watcher, exit waiter)
+counted by `thread_wakeups`, next to the 60 per minute of the old loop that
+slept one second between scans.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Callable
+
+import psutil
+
+
+class MonitorScheduler:
+    def __init__(
+        self,
+        *,
+        scan_base: float = 30.0,
+        scan_max: float = 480.0,
+        verify_base: float = 5.0,
+        verify_max: float = 20.0,
+        factor: float = 2.0,
+        busy_load: float = 85.0,
+        max_defer: float = 60.0,
+        window: float = 600.0,
+        thread_wakeups: Callable[[], int] | None = None,
+    ) -> None:
+        self._scan_base = float(scan_base)
+        self._scan_max = max(self._scan_base, float(scan_max))
+        self._verify_base = float(verify_base)
+        self._verify_max = max(self._verify_base, float(verify_max))
+        self._factor = max(1.0, float(factor))
+        self._busy_load = float(busy_load)
+        self._max_defer = float(max_defer)
+        self._window = float(window)
+
+        self._scan_interval = self._scan_base
+        self._verify_interval = self._verify_base
+        self._process_set: frozenset[int] | None = None
+        now = time.monotonic()
+        self._started = now
+        self._next_scan = now
+        self._next_verify = now + self._verify_base
+        self._last_background = now
+        self._wakeups: deque[float] = deque()
+        # Running total of helper-thread wakeups, and (time, total) samples of it.
+        self._thread_wakeups = thread_wakeups
+        self._thread_samples: deque[tuple[float, int]] = deque([(now, self._read_threads())])
+        self._churn = 0
+        self._deferred = 0
+        self._load: float | None = None
+        # The first non-blocking call only sets the baseline.
+        try:
+            psutil.cpu_percent(interval=None)
+        except Exception:
+            pass
+
+    def _read_threads(self) -> int:
+        if self._thread_wakeups is None:
+            return 0
+        try:
+            return int(self._thread_wakeups())
+        except Exception:
+            return 0
+
+    def _sample_threads(self, now: float) -> int:
+        total = self._read_threads()
+        samples = self._thread_samples
+        samples.append((now, total))
+        # Keep the newest sample older than the window as the baseline of the rate.
+        while len(samples) > 2 and now - samples[1][0] >= self._window:
+            samples.popleft()
+        return total
+
+    @property
+    def scan_interval(self) -> float:
+        return self._scan_interval
+
+    @property
+    def verify_interval(self) -> float:
+        return self._verify_interval
+
+    def next_deadline(self) -> float:
+        """Monotonic time of the next scan or drift check, whichever comes first."""
+        return min(self._next_scan, self._next_verify)
+
+    def scan_due(self, now: float) -> bool:
+        return now >= self._next_scan
+
+    def verify_due(self, now: float) -> bool:
+        return now >= self._next_verify
+
+    def wakeup(self, now: float | None = None) -> None:
+        """Count one wakeup of the monitor loop."""
+        now = time.monotonic() if now is None else float(now)
+        self._wakeups.append(now)
+        while self._wakeups and now - self._wakeups[0] > self._window:
+            self._wakeups.popleft()
+        self._sample_threads(now)
+
+    def churn(self, now: float | None = None) -> None:
+        """Something changed: go back to the base intervals."""
+        now = time.monotonic() if now is None else float(now)
+        self._churn += 1
+        self._scan_interval = self._scan_base
+        self._verify_interval = self._verify_base
+        self._next_scan = min(self._next_scan, now + self._scan_interval)
+        self._next_verify = min(self._next_verify, now + self._verify_interval)
+
+    def scanned(self, process_set: frozenset[int], now: float | None = None, *, backoff: bool = True) -> None:
+        """Record a full scan; a different process set than last time counts as churn.
+
+        backoff=False keeps the base interval, e.g. while the scan is the only way
+        to notice that the launcher exited.
+        """
+        now = time.monotonic() if now is None else float(now)
+        changed = self._process_set is not None and process_set != self._process_set
+        self._process_set = process_set
+        if changed:
+            self.churn(now)
+        elif not backoff:
+            self._scan_interval = self._scan_base
+        else:
+            self._scan_interval = min(self._scan_max, self._scan_interval * self._factor)
+        self._next_scan = now + self._scan_interval
+
+    def verified(self, changed: bool, now: float | None = None) -> None:
+        """Record a round of drift checks; `changed` when anything had to be re-applied."""
+        now = time.monotonic() if now is None else float(now)
+        if changed:
+            self.churn(now)
+        else:
+            self._verify_interval = min(self._verify_max, self._verify_interval * self._factor)
+        self._next_verify = now + self._verify_interval
+        try:
+            self._load = float(psutil.cpu_percent(interval=None))
+        except Exception:
+            self._load = None
+
+    def defer(self, now: float | None = None) -> bool:
+        """True if non-urgent work should wait because the system is busy."""
+        now = time.monotonic() if now is None else float(now)
+        busy = self._load is not None and self._load >= self._busy_load
+        if busy and now - self._last_background < self._max_defer:
+            self._deferred += 1
+            return True
+        self._last_background = now
+        return False
+
+    def stats(self, now: float | None = None) -> dict[str, float | int]:
+        now = time.monotonic() if now is None else float(now)
+        span = min(self._window, max(1.0, now - self._started))
+        recent = sum(1 for t in self._wakeups if now - t <= span)
+        total = self._sample_threads(now)
+        since, base = self._thread_samples[0]
+        threads = (total - base) * 60.0 / max(1.0, now - since)
+        loop = recent * 60.0 / span
+        return {
+            "wakeups_per_minute": round(loop + threads, 2),
+            "loop_wakeups_per_minute": round(loop, 2),
+            "thread_wakeups_per_minute": round(threads, 2),
+            # The loop before this scheduler: one scan per second, no helper threads.
+            "baseline_per_minute": 60.0,
+            "scan_interval": round(self._scan_interval, 1),
+            "verify_interval": round(self._verify_interval, 1),
+            "churn": self._churn,
+            "deferred": self._deferred,
+            "load": round(self._load, 1) if self._load is not None else -1.0,
+        }
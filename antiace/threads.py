@@ -0,0 +1,109 @@
+"""Per-thread CPU attribution for guard processes.
+
+A guard usually does its scanning on one or two threads while the rest
+sleep. `ThreadProfiler.sample()` reads `psutil.Process.threads()` (one
+`/proc/<pid>/task/*/stat` pass on Linux, one thread snapshot on Windows) and
+turns the CPU-time deltas since the previous sample into per-thread usage in
+percent of one logical CPU. Threads carrying at least `min_share` of the
+process's CPU time (and `min_usage` percent of a CPU) are "hot"; at most
+`top` of them per process.
+
+The optimizer lowers only the hot threads (idle thread priority, and on
+Windows an ideal processor among the guard CPUs), leaving the idle threads
+alone. `stats()` reports how long sampling takes, to keep it cheap enough
+for every verify interval.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+import psutil
+
+
+@dataclass(frozen=True)
+class ThreadUsage:
+    tid: int
+    # Percent of one logical CPU since the previous sample.
+    usage: float
+    # Total CPU time of the thread so far.
+    cpu_seconds: float
+    hot: bool = False
+
+
+@dataclass
+class _Process:
+    times: dict[int, float]
+    at: float
+    usage: list[ThreadUsage]
+
+
+class ThreadProfiler:
+    def __init__(self, *, top: int = 2, min_share: float = 0.25, min_usage: float = 1.0) -> None:
+        self._top = max(1, int(top))
+        self._min_share = float(min_share)
+        self._min_usage = float(min_usage)
+        self._processes: dict[int, _Process] = {}
+        self._samples = 0
+        self._sample_seconds = 0.0
+
+    def forget(self, pid: int) -> None:
+        self._processes.pop(int(pid), None)
+
+    def sample(self, pid: int) -> list[ThreadUsage] | None:
+        """Per-thread usage since the previous sample, busiest first; None on the first sample or failure."""
+        pid = int(pid)
+        started = time.perf_counter()
+        try:
+            threads = psutil.Process(pid).threads()
+        except psutil.Error:
+            return None
+        now = time.monotonic()
+        times = {int(t.id): float(t.user_time + t.system_time) for t in threads}
+        prev = self._processes.get(pid)
+        usage: list[ThreadUsage] | None = None
+        if prev is not None and now > prev.at:
+            elapsed = now - prev.at
+            # New threads count from zero: their whole CPU time falls in this interval.
+            usage = sorted(
+                (
+                    ThreadUsage(tid, max(0.0, (cpu - prev.times.get(tid, 0.0)) / elapsed * 100.0), cpu)
+                    for tid, cpu in times.items()
+                ),
+                key=lambda u: u.usage,
+                reverse=True,
+            )
+            usage = self._mark_hot(usage)
+        self._processes[pid] = _Process(times, now, usage if usage is not None else prev.usage if prev else [])
+        self._samples += 1
+        self._sample_seconds += time.perf_counter() - started
+        return usage
+
+    def _mark_hot(self, usage: list[ThreadUsage]) -> list[ThreadUsage]:
+        total = sum(u.usage for u in usage)
+        marked: list[ThreadUsage] = []
+        for i, u in enumerate(usage):
+            hot = (
+                i < self._top
+                and total > 0
+                and u.usage >= self._min_usage
+                and u.usage / total >= self._min_share
+            )
+            marked.append(ThreadUsage(u.tid, u.usage, u.cpu_seconds, hot))
+        return marked
+
+    def last(self, pid: int) -> list[ThreadUsage]:
+        """Result of the most recent successful sample of `pid`."""
+        proc = self._processes.get(int(pid))
+        return proc.usage if proc is not None else []
+
+    def hot(self, pid: int) -> list[int]:
+        return [u.tid for u in self.last(pid) if u.hot]
+
+    def stats(self) -> dict[str, float | int]:
+        n = self._samples
+        return {
+            "samples": n,
+            "avg_sample_ms": round(self._sample_seconds / n * 1000.0, 3) if n else 0.0,
+        }
@@ -0,0 +1,289 @@
+"""CPU topology discovery and guard core selection.
+
+The topology (physical cores, SMT siblings, L3 domains, performance class)
+is read once per process from `/sys/devices/system/cpu` on Linux or
+`GetLogicalProcessorInformationEx` on Windows, with a flat fallback built
+from the logical CPU count.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import functools
+import os
+import struct
+from ctypes import wintypes
+from dataclasses import dataclass
+from pathlib import Path
+
+from .policy import logical_cpu_count
+from .windows import _kernel32
+
+
+@dataclass(frozen=True)
+class LogicalCpu:
+    index: int
+    package: int
+    # Physical core key, unique across packages.
+    core: int
+    # Logical CPUs sharing this physical core (SMT siblings), including this one.
+    siblings: tuple[int, ...]
+    # Last-level (L3) cache domain; -1 if unknown.
+    cache_domain: int
+    # Larger means more performant (Windows EfficiencyClass convention): E-cores < P-cores.
+    efficiency_class: int
+
+
+@dataclass(frozen=True)
+class CpuTopology:
+    cpus: tuple[LogicalCpu, ...]
+    source: str
+
+    def get(self, index: int) -> LogicalCpu | None:
+        for cpu in self.cpus:
+            if cpu.index == index:
+                return cpu
+        return None
+
+    @property
+    def indices(self) -> tuple[int, ...]:
+        return tuple(c.index for c in self.cpus)
+
+    @property
+    def has_smt(self) -> bool:
+        return any(len(c.siblings) > 1 for c in self.cpus)
+
+    @property
+    def is_hybrid(self) -> bool:
+        return len({c.efficiency_class for c in self.cpus}) > 1
+
+    def describe(self, index: int) -> str:
+        """Short human label, e.g. "15 (E-core)" or "31 (SMT of 15)"."""
+        cpu = self.get(index)
+        if cpu is None:
+            return str(index)
+        tags: list[str] = []
+        if self.is_hybrid:
+            lowest = min(c.efficiency_class for c in self.cpus)
+            tags.append("E-core" if cpu.efficiency_class == lowest else "P-core")
+        others = [s for s in cpu.siblings if s != cpu.index]
+        if others:
+            tags.append("SMT of " + ",".join(str(s) for s in others))
+        return f"{index} ({', '.join(tags)})" if tags else str(index)
+
+
+def _parse_cpu_list(text: str) -> list[int]:
+    """Parse a sysfs CPU list such as "0-3,8,10-11"."""
+    cpus: list[int] = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def _read(path: Path) -> str | None:
+    try:
+        return path.read_text(encoding="ascii").strip()
+    except OSError:
+        return None
+
+
+def _linux_topology(root: Path = Path("/sys/devices/system/cpu")) -> CpuTopology | None:
+    online = _read(root / "online")
+    if not online:
+        return None
+    indices = _parse_cpu_list(online)
+
+    # Hybrid Intel exposes separate PMUs listing the E-core (atom) and P-core CPUs.
+    devices = root.parent.parent
+    atom = set(_parse_cpu_list(_read(devices / "cpu_atom" / "cpus") or ""))
+    capacities: dict[int, int] = {}
+
+    raw: list[tuple[int, int, int, tuple[int, ...], int]] = []
+    for idx in indices:
+        base = root / f"cpu{idx}"
+        package = int(_read(base / "topology" / "physical_package_id") or 0)
+        core_id = int(_read(base / "topology" / "core_id") or idx)
+        siblings_text = _read(base / "topology" / "thread_siblings_list") or _read(base / "topology" / "core_cpus_list")
+        siblings = tuple(sorted(_parse_cpu_list(siblings_text))) if siblings_text else (idx,)
+
+        cache_domain = -1
+        cache_dir = base / "cache"
+        try:
+            entries = sorted(cache_dir.glob("index*"))
+        except OSError:
+            entries = []
+        best_level = 0
+        for entry in entries:
+            level = int(_read(entry / "level") or 0)
+            if level < best_level or (_read(entry / "type") or "") == "Instruction":
+                continue
+            shared = _read(entry / "shared_cpu_list")
+            cache_id = _read(entry / "id")
+            best_level = level
+            if cache_id is not None:
+                cache_domain = int(cache_id)
+            elif shared:
+                cache_domain = min(_parse_cpu_list(shared))
+
+        capacity = _read(base / "cpu_capacity")
+        if capacity is not None:
+            capacities[idx] = int(capacity)
+        raw.append((idx, package, core_id, siblings, cache_domain))
+
+    if atom:
+        classes = {idx: (0 if idx in atom else 1) for idx in indices}
+    elif len(set(capacities.values())) > 1:
+        # big.LITTLE: rank distinct capacities.
+        ranks = {cap: rank for rank, cap in enumerate(sorted(set(capacities.values())))}
+        classes = {idx: ranks.get(capacities.get(idx, 0), 0) for idx in indices}
+    else:
+        classes = {idx: 0 for idx in indices}
+
+    cpus: list[LogicalCpu] = []
+    for idx, package, core_id, siblings, cache_domain in raw:
+        core_key = package << 16 | core_id
+        cpus.append(LogicalCpu(idx, package, core_key, siblings, cache_domain, classes[idx]))
+    return CpuTopology(tuple(cpus), "sysfs")
+
+
+def _windows_topology() -> CpuTopology | None:
+    """GetLogicalProcessorInformationEx(RelationAll); processor group 0 only (like the affinity mask)."""
+    k32 = _kernel32()
+    fn = k32.GetLogicalProcessorInformationEx if k32 is not None else None
+    if fn is None:
+        return None
+
+    RelationProcessorCore = 0
+    RelationCache = 2
+    RelationProcessorPackage = 3
+    RelationAll = 0xFFFF
+
+    size = wintypes.DWORD(0)
+    fn(RelationAll, None, ctypes.byref(size))
+    if not size.value:
+        return None
+    buf = ctypes.create_string_buffer(size.value)
+    if not fn(RelationAll, buf, ctypes.byref(size)):
+        return None
+    data = buf.raw[: size.value]
+
+    def group0_mask(offset: int, count: int) -> int:
+        # GROUP_AFFINITY { KAFFINITY Mask; WORD Group; WORD Reserved[3]; }
+        for i in range(count):
+            mask, group = struct.unpack_from("<QH", data, offset + i * 16)
+            if group == 0:
+                return mask
+        return 0
+
+    def bits(mask: int) -> list[int]:
+        return [i for i in range(mask.bit_length()) if mask >> i & 1]
+
+    cores: list[tuple[list[int], int]] = []
+    packages: list[list[int]] = []
+    l3: list[list[int]] = []
+    offset = 0
+    while offset + 8 <= len(data):
+        relationship, item_size = struct.unpack_from("<II", data, offset)
+        if item_size <= 0:
+            break
+        body = offset + 8
+        if relationship in (RelationProcessorCore, RelationProcessorPackage):
+            # PROCESSOR_RELATIONSHIP { BYTE Flags; BYTE EfficiencyClass; BYTE Reserved[20];
+            #                          WORD GroupCount; GROUP_AFFINITY GroupMask[]; }
+            _flags, efficiency_class = struct.unpack_from("<BB", data, body)
+            (group_count,) = struct.unpack_from("<H", data, body + 22)
+            cpus = bits(group0_mask(body + 24, group_count))
+            if relationship == RelationProcessorCore:
+                cores.append((cpus, efficiency_class))
+            else:
+                packages.append(cpus)
+        elif relationship == RelationCache:
+            # CACHE_RELATIONSHIP { BYTE Level; BYTE Associativity; WORD LineSize; DWORD CacheSize;
+            #                      DWORD Type; BYTE Reserved[18]; WORD GroupCount; GROUP_AFFINITY GroupMask[]; }
+            (level,) = struct.unpack_from("<B", data, body)
+            (group_count,) = struct.unpack_from("<H", data, body + 30)
+            if level == 3:
+                l3.append(bits(group0_mask(body + 32, max(1, group_count))))
+        offset += item_size
+
+    if not cores:
+        return None
+
+    result: list[LogicalCpu] = []
+    for core_key, (cpus, efficiency_class) in enumerate(cores):
+        for idx in cpus:
+            package = next((p for p, members in enumerate(packages) if idx in members), 0)
+            cache_domain = next((d for d, members in enumerate(l3) if idx in members), -1)
+            result.append(LogicalCpu(idx, package, core_key, tuple(cpus), cache_domain, int(efficiency_class)))
+    result.sort(key=lambda c: c.index)
+    return CpuTopology(tuple(result), "GetLogicalProcessorInformationEx")
+
+
+def _flat_topology() -> CpuTopology:
+    n = logical_cpu_count()
+    return CpuTopology(tuple(LogicalCpu(i, 0, i, (i,), -1, 0) for i in range(max(1, n))), "cpu_count")
+
+
+@functools.lru_cache(maxsize=1)
+def get_topology() -> CpuTopology:
+    """Discover the CPU topology once per process."""
+    try:
+        if os.name == "nt":
+            topo = _windows_topology()
+        else:
+            topo = _linux_topology()
+    except Exception:
+        topo = None
+    return topo if topo is not None and topo.cpus else _flat_topology()
+
+
+def efficient_cpus(topology: CpuTopology) -> tuple[int, ...]:
+    """CPUs of the lowest performance class (all CPUs on non-hybrid machines)."""
+    lowest = min(c.efficiency_class for c in topology.cpus)
+    return tuple(c.index for c in topology.cpus if c.efficiency_class == lowest)
+
+
+def select_guard_cpus(
+    topology: CpuTopology,
+    *,
+    count: int = 1,
+    preferred: tuple[int, ...] | None = None,
+    exclude: frozenset[int] | set[int] = frozenset(),
+) -> tuple[int, ...]:
+    """Pick the least valuable logical CPU(s) for guard processes.
+
+    `preferred` (from config) wins when any of it exists on this machine
+    and does not share a core with `exclude`. Otherwise CPUs are ranked:
+    lowest performance class (E-cores) first, then the last L3 domain
+    (games tend to prefer the first CCD), then the last physical core, then
+    the last SMT sibling on that core. CPUs in `exclude`, and their SMT
+    siblings where possible, are avoided.
+    """
+    available = [c for c in topology.cpus if c.index not in exclude]
+    # Avoid sharing a physical core with an excluded CPU if there is any other choice.
+    clean = [c for c in available if not (set(c.siblings) & set(exclude))]
+    if preferred:
+        clean_indices = {c.index for c in clean}
+        picked = tuple(sorted(i for i in set(preferred) if i in clean_indices))
+        if picked:
+            return picked
+    if not available:
+        available = list(topology.cpus)
+
+    pool = clean or available
+
+    def rank(cpu: LogicalCpu) -> tuple[int, int, int, int]:
+        smt_pos = cpu.siblings.index(cpu.index) if cpu.index in cpu.siblings else 0
+        return (cpu.efficiency_class, -cpu.cache_domain, -cpu.core, -smt_pos)
+
+    ordered = sorted(pool, key=rank)
+    first = ordered[0]
+    # Fill further slots from the same physical core first, keeping the guard contained.
+    ordered = [c for c in ordered if c.core == first.core] + [c for c in ordered if c.core != first.core]
+    return tuple(sorted(c.index for c in ordered[: max(1, int(count))]))
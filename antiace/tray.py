@@ -2,31 +2,8 @@ from __future__ import annotations
 
 import threading
 
-from .resources import resource_path
-
-
-def _make_image(*, icon_path: str | None):
-    # Lazy import to avoid overhead if tray isn't used.
-    from PIL import Image, ImageDraw
-
-    # Prefer the app icon (icon.ico) for tray.
-    try:
-        p = icon_path or resource_path("icon.ico")
-        img = Image.open(p)
-        img = img.convert("RGBA")
-        # Pystray works best with a small RGBA image.
-        img = img.resize((64, 64), Image.LANCZOS)
-        return img
-    except Exception:
-        pass
-
-    size = 64
-    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    # Simple blue rounded square with white 'U'
-    draw.rounded_rectangle((4, 4, size - 4, size - 4), radius=14, fill=(37, 99, 235, 255))
-    draw.text((22, 16), "U", fill=(255, 255, 255, 255))
-    return img
+from . import trayicons
+from .trayicons import STATUS_IDLE, VARIANTS
 
 
 class TrayController:
@@ -36,20 +13,35 @@ class TrayController:
         self._icon_path = icon_path
         self._icon = None
         self._thread: threading.Thread | None = None
+        # status -> ready-made image; see trayicons for how they are produced.
+        self._images: dict[str, object] = {}
+        self._status = STATUS_IDLE
 
     def start(self) -> None:
         import pystray
 
+        self._images = trayicons.images(trayicons.load(self._icon_path))
         menu = pystray.Menu(
             pystray.MenuItem("显示主页面", lambda _icon, _item: self._on_show_main()),
             pystray.MenuItem("退出", lambda _icon, _item: self._on_exit()),
         )
-        self._icon = pystray.Icon("antiace", _make_image(icon_path=self._icon_path), "Anti-ACE", menu=menu)
+        self._icon = pystray.Icon("antiace", self._images[self._status], "Anti-ACE", menu=menu)
 
         # Run in background thread so we can keep monitor loop in main thread.
         self._thread = threading.Thread(target=self._icon.run, daemon=True)
         self._thread.start()
 
+    def set_status(self, status: str) -> None:
+        """Switch to the idle / optimized / error icon; a no-op if unchanged."""
+        if status == self._status or status not in VARIANTS:
+            return
+        self._status = status
+        if self._icon is not None and status in self._images:
+            try:
+                self._icon.icon = self._images[status]
+            except Exception:
+                pass
+
     def stop(self) -> None:
         if self._icon is not None:
             try:
@@ -0,0 +1,179 @@
+"""Pre-rendered tray icons.
+
+Decoding the 150 KB `icon.ico` and LANCZOS-resizing it on every start is the
+most expensive part of bringing the tray up. Instead, every status variant
+(`idle`, `optimized`, `error`) is rendered once at 16/32/64 px and stored as
+raw RGBA in a small asset file:
+
+- `tray-icons.bin` next to `icon.ico`, written at build time by
+  `scripts/build_tray_icons.py` and bundled by PyInstaller, or
+- `<config dir>/tray-icons-<hash>.bin`, written on first start when the
+  bundled file is missing or was built from a different icon.
+
+Both are keyed by the SHA-256 of `icon.ico` plus `PIPELINE_VERSION`, so a new
+icon or a change to the rendering below invalidates them. Loading an asset is
+one file read and one `Image.frombytes` per variant: no decoding, no
+resampling, and switching the tray status later just swaps a prepared image.
+
+File layout: one JSON header line (`key`, `sizes`, `variants`), then the RGBA
+pixels of every (variant, size) pair in header order.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from .config import config_path
+from .resources import resource_path
+
+# Bump when the rendering below changes; cached assets are then rebuilt.
+PIPELINE_VERSION = 1
+
+SIZES = (16, 32, 64)
+# Size handed to pystray; it scales down for the notification area itself.
+TRAY_SIZE = 64
+
+STATUS_IDLE = "idle"
+STATUS_OPTIMIZED = "optimized"
+STATUS_ERROR = "error"
+VARIANTS = (STATUS_IDLE, STATUS_OPTIMIZED, STATUS_ERROR)
+
+# Status dot in the lower-right corner; idle has none.
+_DOT_COLORS = {
+    STATUS_OPTIMIZED: (34, 197, 94, 255),
+    STATUS_ERROR: (239, 68, 68, 255),
+}
+
+ASSET_NAME = "tray-icons.bin"
+
+Assets = dict[tuple[str, int], bytes]
+
+
+def icon_key(icon_path: str) -> str | None:
+    """Cache key of an icon file, or None if it can't be read."""
+    try:
+        digest = hashlib.sha256(Path(icon_path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+    return f"{digest[:32]}-v{PIPELINE_VERSION}"
+
+
+def cache_path(key: str) -> Path:
+    return config_path().parent / f"tray-icons-{key}.bin"
+
+
+def render(icon_path: str | None) -> Assets:
+    """Render every (variant, size) as raw RGBA; draws a fallback icon without `icon_path`."""
+    # Only the build step and a cold cache pay for Pillow's decoders.
+    from PIL import Image, ImageDraw
+
+    base = None
+    if icon_path:
+        try:
+            with Image.open(icon_path) as img:
+                base = img.convert("RGBA")
+        except Exception:
+            pass
+
+    assets: Assets = {}
+    for size in SIZES:
+        if base is not None:
+            img = base.resize((size, size), Image.LANCZOS)
+        else:
+            img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(img)
+            # Simple blue rounded square with white 'U'
+            pad = max(1, size // 16)
+            box = (pad, pad, size - pad, size - pad)
+            draw.rounded_rectangle(box, radius=size * 14 // 64, fill=(37, 99, 235, 255))
+            draw.text((size * 22 // 64, size * 16 // 64), "U", fill=(255, 255, 255, 255))
+        for variant in VARIANTS:
+            out = img.copy()
+            color = _DOT_COLORS.get(variant)
+            if color is not None:
+                draw = ImageDraw.Draw(out)
+                d = max(5, size * 3 // 8)
+                ring = max(1, size // 32)
+                box = (size - d, size - d, size - 1, size - 1)
+                draw.ellipse(box, fill=color, outline=(255, 255, 255, 255), width=ring)
+            assets[(variant, size)] = out.tobytes()
+    return assets
+
+
+def dump(assets: Assets, key: str) -> bytes:
+    header = {"key": key, "sizes": list(SIZES), "variants": list(VARIANTS)}
+    parts = [json.dumps(header).encode("ascii") + b"\n"]
+    parts += [assets[(variant, size)] for variant in VARIANTS for size in SIZES]
+    return b"".join(parts)
+
+
+def parse(data: bytes, key: str) -> Assets | None:
+    """Split an asset file; None if it is for another icon or truncated."""
+    try:
+        line, _sep, pixels = data.partition(b"\n")
+        header = json.loads(line)
+        if header.get("key") != key:
+            return None
+        assets: Assets = {}
+        offset = 0
+        for variant in header["variants"]:
+            for size in header["sizes"]:
+                n = int(size) * int(size) * 4
+                chunk = pixels[offset : offset + n]
+                if len(chunk) != n:
+                    return None
+                assets[(str(variant), int(size))] = chunk
+                offset += n
+    except Exception:
+        return None
+    if any((variant, size) not in assets for variant in VARIANTS for size in SIZES):
+        return None
+    return assets
+
+
+def _read(path: Path, key: str) -> Assets | None:
+    try:
+        return parse(path.read_bytes(), key)
+    except OSError:
+        return None
+
+
+def _write(path: Path, data: bytes) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def load(icon_path: str | None = None) -> Assets:
+    """Assets for `icon_path`: bundled file, then config-dir cache, then render and cache."""
+    icon_path = icon_path or resource_path("icon.ico")
+    key = icon_key(icon_path)
+    if key is None:
+        return render(None)
+
+    bundled = Path(icon_path).with_name(ASSET_NAME)
+    assets = _read(bundled, key)
+    if assets is not None:
+        return assets
+    cached = cache_path(key)
+    assets = _read(cached, key)
+    if assets is not None:
+        return assets
+
+    assets = render(icon_path)
+    _write(cached, dump(assets, key))
+    return assets
+
+
+def images(assets: Assets, size: int = TRAY_SIZE) -> dict[str, object]:
+    """One PIL image per status variant, built straight from the RGBA bytes."""
+    from PIL import Image
+
+    return {variant: Image.frombytes("RGBA", (size, size), assets[(variant, size)]) for variant in VARIANTS}
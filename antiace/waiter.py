@@ -0,0 +1,290 @@
+"""Process exit notification.
+
+An `ExitWaiter` keeps one OS-level handle per watched process and blocks on
+all of them at once from a single thread, firing a callback when a process
+exits:
+- Linux: `pidfd_open` + `poll` (kernel 5.3+).
+- Windows: `OpenProcess(SYNCHRONIZE)` + `WaitForMultipleObjects`.
+- Elsewhere (or if the above fail): a 1 s `pid_exists` poll.
+
+Callbacks run on the waiter thread; keep them short (e.g. push to a queue).
+"""
+
+from __future__ import annotations
+
+import os
+import select
+import threading
+from ctypes import wintypes
+from typing import Callable
+
+import psutil
+
+from .windows import SYNCHRONIZE, _kernel32
+
+OnExit = Callable[[int], None]
+
+
+class ExitWaiter:
+    name = "polling"
+    _poll_interval = 1.0
+    # Times the waiter thread woke up, for MonitorScheduler.stats().
+    wakeups = 0
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # pid -> (handle, callback); the handle is backend specific.
+        self._watched: dict[int, tuple[object, OnExit]] = {}
+        self._stop_event = threading.Event()
+        self._wake_flag = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # --- backend hooks ---------------------------------------------------
+
+    def _open_handle(self, pid: int) -> object | None:
+        return pid if psutil.pid_exists(pid) else None
+
+    def _close_handle(self, handle: object) -> None:
+        pass
+
+    def _wake(self) -> None:
+        self._wake_flag.set()
+
+    def _wait(self, handles: dict[int, object]) -> list[int]:
+        """Block until at least one watched process exited (or woken); return exited PIDs."""
+        if handles:
+            self._wake_flag.wait(self._poll_interval)
+        else:
+            self._wake_flag.wait()
+        self._wake_flag.clear()
+        return [pid for pid in handles if not psutil.pid_exists(pid)]
+
+    # --- public API -----------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._watched)
+
+    def is_watching(self, pid: int) -> bool:
+        return int(pid) in self._watched
+
+    def watch(self, pid: int, on_exit: OnExit, *, create_time: float | None = None) -> bool:
+        """Start watching `pid`. Returns False if it is already gone.
+
+        Pass `create_time` to guard against the PID having been reused since it was seen.
+        """
+        pid = int(pid)
+        with self._lock:
+            if pid in self._watched:
+                return True
+        try:
+            handle = self._open_handle(pid)
+        except Exception:
+            handle = None
+        if handle is None:
+            return False
+        if create_time is not None:
+            try:
+                same = psutil.Process(pid).create_time() == create_time
+            except psutil.AccessDenied:
+                same = True
+            except psutil.Error:
+                same = False
+            if not same:
+                self._close_handle(handle)
+                return False
+        with self._lock:
+            self._watched[pid] = (handle, on_exit)
+        self._wake()
+        return True
+
+    def unwatch(self, pid: int) -> None:
+        with self._lock:
+            entry = self._watched.pop(int(pid), None)
+        if entry is not None:
+            self._close_handle(entry[0])
+            self._wake()
+
+    def start(self) -> bool:
+        self._thread = threading.Thread(target=self._run, name=f"antiace-exit-{self.name}", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake()
+        t = self._thread
+        if t is not None:
+            try:
+                t.join(timeout=1)
+            except Exception:
+                pass
+        with self._lock:
+            entries = list(self._watched.values())
+            self._watched.clear()
+        for handle, _cb in entries:
+            self._close_handle(handle)
+
+    def _run(self) -> None:
+        try:
+            while not self._stop_event.is_set():
+                with self._lock:
+                    handles = {pid: h for pid, (h, _cb) in self._watched.items()}
+                exited = self._wait(handles)
+                self.wakeups += 1
+                for pid in exited:
+                    with self._lock:
+                        entry = self._watched.pop(pid, None)
+                    if entry is None:
+                        continue
+                    handle, cb = entry
+                    self._close_handle(handle)
+                    try:
+                        cb(pid)
+                    except Exception:
+                        pass
+        except Exception:
+            # Never crash the app due to waiter issues.
+            pass
+
+
+class PidfdExitWaiter(ExitWaiter):
+    name = "pidfd"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+
+    def _open_handle(self, pid: int) -> object | None:
+        try:
+            return os.pidfd_open(pid)
+        except ProcessLookupError:
+            return None
+
+    def _close_handle(self, handle: object) -> None:
+        try:
+            os.close(int(handle))  # type: ignore[arg-type]
+        except OSError:
+            pass
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+
+    def _wait(self, handles: dict[int, object]) -> list[int]:
+        poller = select.poll()
+        poller.register(self._wake_r, select.POLLIN)
+        by_fd: dict[int, int] = {}
+        for pid, fd in handles.items():
+            by_fd[int(fd)] = pid  # type: ignore[arg-type]
+            poller.register(int(fd), select.POLLIN)  # type: ignore[arg-type]
+        exited: list[int] = []
+        for fd, _mask in poller.poll():
+            if fd == self._wake_r:
+                try:
+                    while os.read(self._wake_r, 512):
+                        pass
+                except OSError:
+                    pass
+                continue
+            pid = by_fd.get(fd)
+            if pid is not None:
+                exited.append(pid)
+        return exited
+
+    def stop(self) -> None:
+        super().stop()
+        for fd in (self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    @staticmethod
+    def available() -> bool:
+        if not hasattr(os, "pidfd_open"):
+            return False
+        try:
+            os.close(os.pidfd_open(os.getpid()))
+            return True
+        except OSError:
+            return False
+
+
+class HandleExitWaiter(ExitWaiter):
+    """Windows: one wait on the wake event plus up to 63 process handles per call."""
+
+    name = "handles"
+    _MAX_HANDLES = 63  # MAXIMUM_WAIT_OBJECTS minus the wake event
+
+    def __init__(self) -> None:
+        super().__init__()
+        k32 = _kernel32()
+        if k32 is None:
+            raise OSError("Not running on Windows")
+        self._k32 = k32
+        self._HANDLE_ARRAY = wintypes.HANDLE * (self._MAX_HANDLES + 1)
+        # Auto-reset event used to interrupt the wait when the watch set changes.
+        self._wake_event = k32.CreateEventW(None, False, False, None)
+        self._offset = 0
+
+    def _open_handle(self, pid: int) -> object | None:
+        handle = self._k32.OpenProcess(SYNCHRONIZE, False, int(pid))
+        return handle or None
+
+    def _close_handle(self, handle: object) -> None:
+        self._k32.CloseHandle(handle)
+
+    def _wake(self) -> None:
+        if self._wake_event:
+            self._k32.SetEvent(self._wake_event)
+
+    def _wait(self, handles: dict[int, object]) -> list[int]:
+        WAIT_OBJECT_0 = 0
+        WAIT_TIMEOUT = 0x102
+        INFINITE = 0xFFFFFFFF
+
+        items = list(handles.items())
+        if len(items) > self._MAX_HANDLES:
+            # Rotate through batches with a short timeout so every handle gets waited on.
+            start = self._offset % len(items)
+            items = (items[start:] + items[:start])[: self._MAX_HANDLES]
+            self._offset = start + self._MAX_HANDLES
+            timeout = 250
+        else:
+            timeout = INFINITE
+
+        arr = self._HANDLE_ARRAY(self._wake_event, *[h for _pid, h in items])
+        rc = self._k32.WaitForMultipleObjects(len(items) + 1, arr, False, timeout)
+        if rc == WAIT_TIMEOUT or rc == WAIT_OBJECT_0:
+            return []
+        idx = rc - WAIT_OBJECT_0 - 1
+        if 0 <= idx < len(items):
+            return [items[idx][0]]
+        # WAIT_FAILED / abandoned: avoid a hot loop.
+        self._stop_event.wait(self._poll_interval)
+        return []
+
+    def stop(self) -> None:
+        super().stop()
+        if self._wake_event:
+            self._k32.CloseHandle(self._wake_event)
+            self._wake_event = None
+
+
+def start_exit_waiter() -> ExitWaiter:
+    """Start the best available exit waiter for this platform."""
+    waiter: ExitWaiter
+    if os.name == "nt":
+        try:
+            waiter = HandleExitWaiter()
+        except Exception:
+            waiter = ExitWaiter()
+    elif PidfdExitWaiter.available():
+        waiter = PidfdExitWaiter()
+    else:
+        waiter = ExitWaiter()
+    waiter.start()
+    return waiter
@@ -0,0 +1,574 @@
+"""Process start detection.
+
+A `ProcessWatcher` pushes "process started" PIDs to a callback from its own
+thread so the monitor can optimize a freshly spawned guard right away instead
+of waiting for the next periodic scan. The periodic scan stays in place as a
+safety net; watchers only make detection faster.
+
+Backends, best first:
+- Linux: netlink proc connector (event driven, needs CAP_NET_ADMIN),
+  then `/proc` directory diffing once per second (about 1 s latency).
+- Windows: WMI process-start events (`Win32_ProcessStartTrace`, or
+  `__InstanceCreationEvent` without administrator rights), then PID-list
+  diffing once per second (about 1 s latency).
+- Anywhere: slow polling of the PID list.
+
+The PID-diff fallbacks never poll faster than `MIN_POLL_INTERVAL`: a diff is
+one listing, but a 50 ms loop is still 1200 wakeups a minute for a guard that
+takes seconds to start.
+"""
+
+from __future__ import annotations
+
+import abc
+import ctypes
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+from typing import Callable
+
+import psutil
+
+OnStarted = Callable[[int], None]
+
+MIN_POLL_INTERVAL = 1.0
+
+
+class ProcessWatcher:
+    name = "none"
+    # False when events arrive no faster than the periodic scan would find them.
+    event_driven = False
+    # Times the watcher thread woke up (poll ticks, socket reads), for MonitorScheduler.stats().
+    wakeups = 0
+
+    def start(self, on_started: OnStarted) -> bool:
+        """Start delivering events. Returns False if the backend is unavailable here."""
+        return False
+
+    def stop(self) -> None:
+        pass
+
+
+class _ThreadedWatcher(ProcessWatcher, abc.ABC):
+    def __init__(self) -> None:
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._on_started: OnStarted | None = None
+
+    def _open(self) -> bool:
+        """Acquire backend resources; called on the caller's thread before the worker starts."""
+        return True
+
+    @abc.abstractmethod
+    def _run(self) -> None:
+        """Deliver events through `_emit` until `_stop_event` is set; runs on the worker thread."""
+
+    def _emit(self, pid: int) -> None:
+        cb = self._on_started
+        if cb is None:
+            return
+        try:
+            cb(int(pid))
+        except Exception:
+            pass
+
+    def start(self, on_started: OnStarted) -> bool:
+        try:
+            if not self._open():
+                return False
+        except Exception:
+            return False
+        self._on_started = on_started
+        self._thread = threading.Thread(target=self._run_safe, name=f"antiace-watch-{self.name}", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run_safe(self) -> None:
+        try:
+            self._run()
+        except Exception:
+            # Never crash the app due to watcher issues; the periodic scan still runs.
+            pass
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        t = self._thread
+        if t is not None:
+            try:
+                t.join(timeout=1)
+            except Exception:
+                pass
+
+
+class PidDiffWatcher(_ThreadedWatcher):
+    """Reports PIDs that appear between two listings taken `interval` seconds apart."""
+
+    name = "pid-diff"
+    # A poll, not an event source: a start is seen up to `interval` later.
+    event_driven = False
+
+    def __init__(self, list_pids: Callable[[], set[int]] | None = None, *, interval: float = 0.1):
+        super().__init__()
+        self._list_pids = list_pids or (lambda: set(psutil.pids()))
+        self._interval = float(interval)
+        self._known: set[int] = set()
+
+    def _open(self) -> bool:
+        self._known = self._list_pids()
+        return True
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            self.wakeups += 1
+            try:
+                current = self._list_pids()
+            except Exception:
+                continue
+            new = current - self._known
+            self._known = current
+            for pid in sorted(new):
+                self._emit(pid)
+
+
+def _list_proc_dir() -> set[int]:
+    return {int(entry) for entry in os.listdir("/proc") if entry.isdigit()}
+
+
+class ProcDirWatcher(PidDiffWatcher):
+    """Linux fallback: diff the numeric entries of `/proc` (a single getdents, no per-PID reads)."""
+
+    name = "proc-dir"
+
+    def __init__(self, *, interval: float = MIN_POLL_INTERVAL):
+        super().__init__(_list_proc_dir, interval=max(MIN_POLL_INTERVAL, interval))
+
+    def _open(self) -> bool:
+        if not sys.platform.startswith("linux") or not os.path.isdir("/proc"):
+            return False
+        return super()._open()
+
+
+class WindowsProcessWatcher(PidDiffWatcher):
+    """Windows fallback when WMI is unavailable: diff EnumProcesses output."""
+
+    name = "windows"
+
+    def __init__(self, *, interval: float = MIN_POLL_INTERVAL):
+        super().__init__(interval=max(MIN_POLL_INTERVAL, interval))
+
+    def _open(self) -> bool:
+        if os.name != "nt":
+            return False
+        return super()._open()
+
+
+class _GUID(ctypes.Structure):
+    _fields_ = [
+        ("Data1", ctypes.c_ulong),
+        ("Data2", ctypes.c_ushort),
+        ("Data3", ctypes.c_ushort),
+        ("Data4", ctypes.c_ubyte * 8),
+    ]
+
+
+class _VARIANT(ctypes.Structure):
+    # vt + 3 reserved words, then the 8/16-byte union; only VT_I4 / VT_UNKNOWN are read.
+    _fields_ = [
+        ("vt", ctypes.c_ushort),
+        ("reserved", ctypes.c_ushort * 3),
+        ("value", ctypes.c_void_p),
+        ("extra", ctypes.c_void_p),
+    ]
+
+
+_CLSID_WBEM_LOCATOR = "{4590F811-1D3A-11D0-891F-00AA004B2E24}"
+_IID_IWBEM_LOCATOR = "{DC12A687-737F-11CF-884D-00AA004B2E24}"
+_IID_IWBEM_CLASS_OBJECT = "{DC12A681-737F-11CF-884D-00AA004B2E24}"
+_VT_I4 = 3
+_VT_UNKNOWN = 13
+_VT_UI4 = 19
+_WBEM_FLAG_RETURN_IMMEDIATELY = 0x10
+_WBEM_FLAG_FORWARD_ONLY = 0x20
+
+
+def _com_method(obj: int, index: int, *argtypes):
+    """Entry `index` of the vtable of COM object `obj`, bound to `obj`."""
+    vtbl = ctypes.cast(obj, ctypes.POINTER(ctypes.POINTER(ctypes.c_void_p))).contents
+    proto = ctypes.WINFUNCTYPE(ctypes.c_long, ctypes.c_void_p, *argtypes)
+    fn = proto(vtbl[index])
+    return lambda *args: fn(obj, *args)
+
+
+def _com_release(obj: int | None) -> None:
+    if obj:
+        _com_method(obj, 2)()
+
+
+class WmiProcessWatcher(_ThreadedWatcher):
+    """Windows: process-start events from WMI, through raw COM calls.
+
+    Subscribes to `Win32_ProcessStartTrace` (kernel trace events, needs
+    administrator rights) and otherwise to `__InstanceCreationEvent` on
+    `Win32_Process`, which the WMI service evaluates once per second on its
+    side. Either way this thread sleeps in `IEnumWbemClassObject::Next` until
+    an event arrives or `_NEXT_TIMEOUT_MS` passes to look at the stop flag.
+    COM objects are apartment bound, so the subscription is made on the
+    worker thread and `start()` waits for its outcome.
+    """
+
+    name = "wmi"
+    event_driven = True
+    # (query, embedded object holding ProcessId or None for the event itself, property)
+    _QUERIES = (
+        ("SELECT ProcessID FROM Win32_ProcessStartTrace", None, "ProcessID"),
+        (
+            "SELECT * FROM __InstanceCreationEvent WITHIN 1 WHERE TargetInstance ISA 'Win32_Process'",
+            "TargetInstance",
+            "ProcessId",
+        ),
+    )
+    _NEXT_TIMEOUT_MS = 5000
+    _START_TIMEOUT = 10.0
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._ready = threading.Event()
+        self._ok = False
+
+    def start(self, on_started: OnStarted) -> bool:
+        if os.name != "nt":
+            return False
+        self._on_started = on_started
+        self._thread = threading.Thread(target=self._run_safe, name=f"antiace-watch-{self.name}", daemon=True)
+        self._thread.start()
+        self._ready.wait(self._START_TIMEOUT)
+        if not self._ok:
+            self._stop_event.set()
+            return False
+        return True
+
+    def _run_safe(self) -> None:
+        try:
+            super()._run_safe()
+        finally:
+            # A failure before the subscription must not leave start() waiting.
+            self._ready.set()
+
+    @staticmethod
+    def _guid(text: str) -> _GUID:
+        guid = _GUID()
+        if ctypes.windll.ole32.CLSIDFromString(ctypes.c_wchar_p(text), ctypes.byref(guid)) < 0:
+            raise OSError(f"bad GUID {text}")
+        return guid
+
+    def _subscribe(self, oleaut32) -> tuple[int, int, tuple[str | None, str]]:
+        """Connect to root\\cimv2 and open the first query that works; returns (services, enum, query)."""
+        ole32 = ctypes.windll.ole32
+        vp = ctypes.c_void_p
+        locator = vp()
+        hr = ole32.CoCreateInstance(
+            ctypes.byref(self._guid(_CLSID_WBEM_LOCATOR)),
+            None,
+            1,  # CLSCTX_INPROC_SERVER
+            ctypes.byref(self._guid(_IID_IWBEM_LOCATOR)),
+            ctypes.byref(locator),
+        )
+        if hr < 0 or not locator.value:
+            raise OSError(f"CoCreateInstance(WbemLocator) failed: {hr:#x}")
+        services = vp()
+        namespace = oleaut32.SysAllocString("ROOT\\CIMV2")
+        try:
+            # IWbemLocator::ConnectServer
+            hr = _com_method(locator.value, 3, vp, vp, vp, vp, ctypes.c_long, vp, vp, ctypes.POINTER(vp))(
+                namespace, None, None, None, 0, None, None, ctypes.byref(services)
+            )
+        finally:
+            oleaut32.SysFreeString(namespace)
+            _com_release(locator.value)
+        if hr < 0 or not services.value:
+            raise OSError(f"IWbemLocator::ConnectServer failed: {hr:#x}")
+        # RPC_C_AUTHN_WINNT, RPC_C_AUTHZ_NONE, RPC_C_AUTHN_LEVEL_CALL, RPC_C_IMP_LEVEL_IMPERSONATE
+        ole32.CoSetProxyBlanket(services, 10, 0, None, 3, 3, None, 0)
+
+        language = oleaut32.SysAllocString("WQL")
+        try:
+            for query, embedded, prop in self._QUERIES:
+                text = oleaut32.SysAllocString(query)
+                enum = vp()
+                try:
+                    # IWbemServices::ExecNotificationQuery
+                    hr = _com_method(services.value, 22, vp, vp, ctypes.c_long, vp, ctypes.POINTER(vp))(
+                        language,
+                        text,
+                        _WBEM_FLAG_RETURN_IMMEDIATELY | _WBEM_FLAG_FORWARD_ONLY,
+                        None,
+                        ctypes.byref(enum),
+                    )
+                finally:
+                    oleaut32.SysFreeString(text)
+                if hr >= 0 and enum.value:
+                    ole32.CoSetProxyBlanket(enum, 10, 0, None, 3, 3, None, 0)
+                    return services.value, enum.value, (embedded, prop)
+        finally:
+            oleaut32.SysFreeString(language)
+        _com_release(services.value)
+        raise OSError("no WMI process-start query accepted")
+
+    @staticmethod
+    def _get(obj: int, name: str, var: _VARIANT) -> bool:
+        """IWbemClassObject::Get(name) into `var`."""
+        vp = ctypes.c_void_p
+        get = _com_method(obj, 4, ctypes.c_wchar_p, ctypes.c_long, vp, vp, vp)
+        return get(name, 0, ctypes.byref(var), None, None) >= 0
+
+    def _read_pid(self, oleaut32, event: int, embedded: str | None, prop: str) -> int | None:
+        var = _VARIANT()
+        obj = event
+        inner = None
+        try:
+            if embedded is not None:
+                # TargetInstance comes back as VT_UNKNOWN; query it for IWbemClassObject.
+                if not self._get(event, embedded, var) or var.vt != _VT_UNKNOWN or not var.value:
+                    return None
+                found = ctypes.c_void_p()
+                iid = self._guid(_IID_IWBEM_CLASS_OBJECT)
+                hr = _com_method(var.value, 0, ctypes.c_void_p, ctypes.POINTER(ctypes.c_void_p))(
+                    ctypes.byref(iid), ctypes.byref(found)
+                )
+                oleaut32.VariantClear(ctypes.byref(var))
+                if hr < 0 or not found.value:
+                    return None
+                inner = obj = found.value
+            if not self._get(obj, prop, var) or var.vt not in (_VT_I4, _VT_UI4):
+                return None
+            return (var.value or 0) & 0xFFFFFFFF
+        finally:
+            oleaut32.VariantClear(ctypes.byref(var))
+            _com_release(inner)
+
+    def _run(self) -> None:
+        ole32 = ctypes.windll.ole32
+        oleaut32 = ctypes.windll.oleaut32
+        oleaut32.SysAllocString.restype = ctypes.c_void_p
+        oleaut32.SysAllocString.argtypes = [ctypes.c_wchar_p]
+        oleaut32.SysFreeString.argtypes = [ctypes.c_void_p]
+        ole32.CoSetProxyBlanket.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_ulong,
+            ctypes.c_ulong,
+            ctypes.c_void_p,
+            ctypes.c_ulong,
+            ctypes.c_ulong,
+            ctypes.c_void_p,
+            ctypes.c_ulong,
+        ]
+        # COINIT_MULTITHREADED: no message pump on this thread.
+        initialized = ole32.CoInitializeEx(None, 0) >= 0
+        services = enum = None
+        try:
+            try:
+                services, enum, (embedded, prop) = self._subscribe(oleaut32)
+            except Exception:
+                return
+            self._ok = True
+            self._ready.set()
+            vp = ctypes.c_void_p
+            # IEnumWbemClassObject::Next
+            next_event = _com_method(
+                enum, 4, ctypes.c_long, ctypes.c_ulong, ctypes.POINTER(vp), ctypes.POINTER(ctypes.c_ulong)
+            )
+            while not self._stop_event.is_set():
+                event = vp()
+                returned = ctypes.c_ulong(0)
+                hr = next_event(self._NEXT_TIMEOUT_MS, 1, ctypes.byref(event), ctypes.byref(returned))
+                self.wakeups += 1
+                if hr < 0:
+                    # The WMI service went away; the periodic scan keeps working.
+                    return
+                if not returned.value or not event.value:
+                    continue
+                try:
+                    pid = self._read_pid(oleaut32, event.value, embedded, prop)
+                finally:
+                    _com_release(event.value)
+                if pid:
+                    self._emit(pid)
+        finally:
+            _com_release(enum)
+            _com_release(services)
+            if initialized:
+                ole32.CoUninitialize()
+
+
+class PollingWatcher(PidDiffWatcher):
+    """Last fallback: the old fixed-cadence polling, expressed as a watcher."""
+
+    name = "polling"
+    event_driven = False
+
+    def __init__(self, *, interval: float = 30.0):
+        super().__init__(interval=interval)
+
+
+# linux/netlink.h, linux/connector.h, linux/cn_proc.h
+_NETLINK_CONNECTOR = 11
+_NLMSG_DONE = 3
+_CN_IDX_PROC = 1
+_CN_VAL_PROC = 1
+_PROC_CN_MCAST_LISTEN = 1
+_PROC_CN_MCAST_IGNORE = 2
+_PROC_EVENT_EXEC = 0x00000002
+_PROC_EVENT_COMM = 0x00000200
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_CN_MSG = struct.Struct("=IIIIHH")
+_PROC_EVENT = struct.Struct("=IIQ")
+
+
+def _parse_proc_events(data: bytes) -> list[int]:
+    """PIDs of the exec and comm events in one proc connector datagram.
+
+    Only events of a thread group leader count (a thread renaming itself is
+    not a new process). Fork events are skipped: the child still carries its
+    parent's name, and the exec or comm that gives it its own follows.
+    """
+    pids: list[int] = []
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, _type, _flags, _seq, _pid = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            break
+        body = offset + _NLMSGHDR.size + _CN_MSG.size
+        ev = body + _PROC_EVENT.size
+        if ev + 8 <= min(offset + length, len(data)):
+            what, _cpu, _ts = _PROC_EVENT.unpack_from(data, body)
+            if what in (_PROC_EVENT_EXEC, _PROC_EVENT_COMM):
+                pid, tgid = struct.unpack_from("=II", data, ev)
+                if pid == tgid:
+                    pids.append(tgid)
+        offset += (length + 3) & ~3
+    return pids
+
+
+class NetlinkProcWatcher(_ThreadedWatcher):
+    """Linux proc connector: the kernel multicasts exec/comm events to us.
+
+    Wine/Proton processes get their `SGuard64.exe` name only after exec or a
+    later PR_SET_NAME. The kernel reports these for every process on the
+    system, so a build can produce thousands a second. With `wanted`, the
+    name of each process is checked on the watcher thread and only the
+    processes `wanted(name)` accepts wake the monitor.
+    """
+
+    name = "netlink"
+    event_driven = True
+
+    def __init__(self, wanted: Callable[[str], bool] | None = None) -> None:
+        super().__init__()
+        self._wanted = wanted
+        self._sock: socket.socket | None = None
+        self._wake_r: int | None = None
+        self._wake_w: int | None = None
+
+    def _control(self, op: int) -> None:
+        assert self._sock is not None
+        payload = struct.pack("=I", op)
+        cn = _CN_MSG.pack(_CN_IDX_PROC, _CN_VAL_PROC, 0, 0, len(payload), 0)
+        total = _NLMSGHDR.size + len(cn) + len(payload)
+        hdr = _NLMSGHDR.pack(total, _NLMSG_DONE, 0, 0, os.getpid())
+        self._sock.send(hdr + cn + payload)
+
+    def _open(self) -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, _NETLINK_CONNECTOR)
+        try:
+            sock.bind((0, _CN_IDX_PROC))
+            self._sock = sock
+            self._control(_PROC_CN_MCAST_LISTEN)
+        except OSError:
+            # Typically EPERM without CAP_NET_ADMIN.
+            sock.close()
+            self._sock = None
+            return False
+        self._wake_r, self._wake_w = os.pipe()
+        return True
+
+    def _accept(self, pid: int) -> bool:
+        wanted = self._wanted
+        if wanted is None:
+            return True
+        try:
+            name = psutil.Process(pid).name()
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return False
+        except psutil.Error:
+            return True
+        try:
+            return not name or bool(wanted(name))
+        except Exception:
+            return True
+
+    def _run(self) -> None:
+        sock = self._sock
+        assert sock is not None and self._wake_r is not None
+        try:
+            while not self._stop_event.is_set():
+                ready, _w, _x = select.select([sock, self._wake_r], [], [])
+                self.wakeups += 1
+                if self._wake_r in ready:
+                    break
+                try:
+                    data = sock.recv(65536)
+                except OSError:
+                    # ENOBUFS on event bursts: drop them; the periodic scan catches up.
+                    continue
+                for pid in _parse_proc_events(data):
+                    if self._accept(pid):
+                        self._emit(pid)
+        finally:
+            try:
+                self._control(_PROC_CN_MCAST_IGNORE)
+            except OSError:
+                pass
+            sock.close()
+            fds = (self._wake_r, self._wake_w)
+            self._wake_r = self._wake_w = None
+            for fd in fds:
+                if fd is not None:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"x")
+            except OSError:
+                pass
+        super().stop()
+
+
+def start_watcher(on_started: OnStarted, *, wanted: Callable[[str], bool] | None = None) -> ProcessWatcher:
+    """Start the best available watcher for this platform; falls back to polling.
+
+    `wanted(name)` filters the system-wide netlink events before they reach
+    `on_started`; the other backends report every new PID.
+    """
+    if sys.platform.startswith("linux"):
+        candidates: list[ProcessWatcher] = [NetlinkProcWatcher(wanted), ProcDirWatcher()]
+    elif os.name == "nt":
+        candidates = [WmiProcessWatcher(), WindowsProcessWatcher()]
+    else:
+        candidates = []
+    candidates.append(PollingWatcher())
+
+    for watcher in candidates:
+        if watcher.start(on_started):
+            return watcher
+    return ProcessWatcher()
@@ -3,18 +3,17 @@ from __future__ import annotations
 import os
 from pathlib import Path
 
-import psutil
+from .processes import ProcessSnapshot, get_snapshot
 
 
-def is_wegame_running() -> bool:
-    for proc in psutil.process_iter(["name"]):
-        try:
-            name = (proc.info.get("name") or "").lower()
-            if name == "wegame.exe":
-                return True
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-    return False
+WEGAME_EXE = "wegame.exe"
+# ACE guard processes shipped with WeGame games; these are what gets tuned.
+GUARD_PROCESSES = ("SGuard64.exe", "SGuardSvc64.exe")
+
+
+def is_wegame_running(snapshot: ProcessSnapshot | None = None) -> bool:
+    snap = snapshot if snapshot is not None else get_snapshot()
+    return snap.is_running(WEGAME_EXE)
 
 
 def start_wegame(wegame_path: str) -> tuple[bool, str]:
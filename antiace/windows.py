@@ -1,11 +1,295 @@
 from __future__ import annotations
 
+import ctypes
+import os
+import threading
+from ctypes import wintypes
+
 import psutil
 
+from .policy import (
+    PRIORITY_BELOW_NORMAL,
+    PRIORITY_IDLE,
+    PRIORITY_NORMAL,
+    STEP_AFFINITY,
+    STEP_IO_PRIORITY,
+    STEP_MEMORY_PRIORITY,
+    STEP_POWER_THROTTLING,
+    STEP_PRIORITY,
+    ApplyResult,
+    Policy,
+    logical_cpu_count,
+)
+
+# Access rights / constants used by the bindings below.
+PROCESS_SET_INFORMATION = 0x0200
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+SYNCHRONIZE = 0x00100000
+PROCESS_TERMINATE = 0x0001
+PROCESS_SET_QUOTA = 0x0100
+THREAD_SET_INFORMATION = 0x0020
+THREAD_QUERY_LIMITED_INFORMATION = 0x0800
+
+IDLE_PRIORITY_CLASS = 0x00000040
+BELOW_NORMAL_PRIORITY_CLASS = 0x00004000
+NORMAL_PRIORITY_CLASS = 0x00000020
+
+_PRIORITY_CLASSES = {
+    PRIORITY_IDLE: IDLE_PRIORITY_CLASS,
+    PRIORITY_BELOW_NORMAL: BELOW_NORMAL_PRIORITY_CLASS,
+    PRIORITY_NORMAL: NORMAL_PRIORITY_CLASS,
+}
+
+THREAD_PRIORITY_IDLE = -15
+THREAD_PRIORITY_LOWEST = -2
+THREAD_PRIORITY_NORMAL = 0
+
+_THREAD_PRIORITIES = {
+    PRIORITY_IDLE: THREAD_PRIORITY_IDLE,
+    PRIORITY_BELOW_NORMAL: THREAD_PRIORITY_LOWEST,
+    PRIORITY_NORMAL: THREAD_PRIORITY_NORMAL,
+}
+
+# https://learn.microsoft.com/windows/win32/api/processthreadsapi/ne-processthreadsapi-process_information_class
+# SetProcessInformation(..., ProcessPowerThrottling, ...)
+ProcessPowerThrottling = 4
+PROCESS_POWER_THROTTLING_CURRENT_VERSION = 1
+POWER_THROTTLING_EXECUTION_SPEED = 0x1
+
+# SetProcessInformation(..., ProcessMemoryPriority, ...) takes a MEMORY_PRIORITY_INFORMATION (ULONG).
+ProcessMemoryPriority = 0
+MEMORY_PRIORITY_VERY_LOW = 1
+MEMORY_PRIORITY_BELOW_NORMAL = 4
+MEMORY_PRIORITY_NORMAL = 5
+
+_MEMORY_PRIORITIES = {
+    PRIORITY_IDLE: MEMORY_PRIORITY_VERY_LOW,
+    PRIORITY_BELOW_NORMAL: MEMORY_PRIORITY_BELOW_NORMAL,
+    PRIORITY_NORMAL: MEMORY_PRIORITY_NORMAL,
+}
+
+
+# NtSetInformationProcess(..., ProcessIoPriority, ...) takes an IO_PRIORITY_HINT (ULONG).
+ProcessIoPriority = 33
+IoPriorityVeryLow = 0
+IoPriorityLow = 1
+IoPriorityNormal = 2
+
+_IO_PRIORITIES = {
+    PRIORITY_IDLE: IoPriorityVeryLow,
+    PRIORITY_BELOW_NORMAL: IoPriorityLow,
+    PRIORITY_NORMAL: IoPriorityNormal,
+}
+
+
+class PROCESS_POWER_THROTTLING_STATE(ctypes.Structure):
+    _fields_ = [
+        ("Version", wintypes.ULONG),
+        ("ControlMask", wintypes.ULONG),
+        ("StateMask", wintypes.ULONG),
+    ]
+
+
+class PROCESSENTRY32W(ctypes.Structure):
+    _fields_ = [
+        ("dwSize", wintypes.DWORD),
+        ("cntUsage", wintypes.DWORD),
+        ("th32ProcessID", wintypes.DWORD),
+        ("th32DefaultHeapID", ctypes.c_size_t),
+        ("th32ModuleID", wintypes.DWORD),
+        ("cntThreads", wintypes.DWORD),
+        ("th32ParentProcessID", wintypes.DWORD),
+        ("pcPriClassBase", wintypes.LONG),
+        ("dwFlags", wintypes.DWORD),
+        ("szExeFile", wintypes.WCHAR * 260),
+    ]
+
+
+class OVERLAPPED(ctypes.Structure):
+    _fields_ = [
+        ("Internal", ctypes.c_size_t),
+        ("InternalHigh", ctypes.c_size_t),
+        ("Offset", wintypes.DWORD),
+        ("OffsetHigh", wintypes.DWORD),
+        ("hEvent", wintypes.HANDLE),
+    ]
+
+
+class SECURITY_ATTRIBUTES(ctypes.Structure):
+    _fields_ = [
+        ("nLength", wintypes.DWORD),
+        ("lpSecurityDescriptor", wintypes.LPVOID),
+        ("bInheritHandle", wintypes.BOOL),
+    ]
+
+
+TH32CS_SNAPPROCESS = 0x00000002
+INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+
+
+class _Kernel32:
+    """kernel32 entry points (plus the few ntdll / advapi32 ones used), resolved and typed once per process.
+
+    Optional entry points (missing on older Windows) are None.
+    """
+
+    def __init__(self) -> None:
+        k32 = ctypes.WinDLL("kernel32", use_last_error=True)  # type: ignore[attr-defined]
+        ntdll = ctypes.WinDLL("ntdll")  # type: ignore[attr-defined]
+        advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)  # type: ignore[attr-defined]
+
+        def fn(name: str, restype, argtypes, *, optional: bool = False, dll=k32):
+            try:
+                f = getattr(dll, name)
+            except AttributeError:
+                if optional:
+                    return None
+                raise
+            f.argtypes = argtypes
+            f.restype = restype
+            return f
+
+        HANDLE, DWORD, BOOL = wintypes.HANDLE, wintypes.DWORD, wintypes.BOOL
+        PSIZE_T = ctypes.POINTER(ctypes.c_size_t)
+
+        self.OpenProcess = fn("OpenProcess", HANDLE, [DWORD, BOOL, DWORD])
+        self.CloseHandle = fn("CloseHandle", BOOL, [HANDLE])
+        self.SetPriorityClass = fn("SetPriorityClass", BOOL, [HANDLE, DWORD])
+        self.GetPriorityClass = fn("GetPriorityClass", DWORD, [HANDLE])
+        self.GetProcessAffinityMask = fn("GetProcessAffinityMask", BOOL, [HANDLE, PSIZE_T, PSIZE_T])
+        self.SetProcessAffinityMask = fn("SetProcessAffinityMask", BOOL, [HANDLE, ctypes.c_size_t])
+        # Per-thread tuning (antiace.threads).
+        self.OpenThread = fn("OpenThread", HANDLE, [DWORD, BOOL, DWORD])
+        self.SetThreadPriority = fn("SetThreadPriority", BOOL, [HANDLE, wintypes.INT])
+        self.SetThreadIdealProcessor = fn("SetThreadIdealProcessor", DWORD, [HANDLE, DWORD])
+        # Working-set trim (antiace.memory): (SIZE_T)-1 for both sizes empties the working set.
+        self.SetProcessWorkingSetSize = fn(
+            "SetProcessWorkingSetSize", BOOL, [HANDLE, ctypes.c_size_t, ctypes.c_size_t]
+        )
+        # SetProcessInformation exists on Windows 8+, GetProcessInformation(ProcessPowerThrottling) on Windows 11+.
+        self.SetProcessInformation = fn(
+            "SetProcessInformation", BOOL, [HANDLE, wintypes.INT, wintypes.LPVOID, DWORD], optional=True
+        )
+        self.GetProcessInformation = fn(
+            "GetProcessInformation", BOOL, [HANDLE, wintypes.INT, wintypes.LPVOID, DWORD], optional=True
+        )
+        # I/O priority: no documented Win32 API; NTSTATUS results (0 = success).
+        self.NtSetInformationProcess = fn(
+            "NtSetInformationProcess", wintypes.LONG, [HANDLE, wintypes.INT, wintypes.LPVOID, wintypes.ULONG], dll=ntdll
+        )
+        self.NtQueryInformationProcess = fn(
+            "NtQueryInformationProcess",
+            wintypes.LONG,
+            [HANDLE, wintypes.INT, wintypes.LPVOID, wintypes.ULONG, ctypes.POINTER(wintypes.ULONG)],
+            dll=ntdll,
+        )
+        # CPU topology (antiace.topology); Windows 7+.
+        self.GetLogicalProcessorInformationEx = fn(
+            "GetLogicalProcessorInformationEx",
+            BOOL,
+            [wintypes.INT, wintypes.LPVOID, ctypes.POINTER(DWORD)],
+            optional=True,
+        )
+        # Job objects (antiace.limits).
+        self.CreateJobObjectW = fn("CreateJobObjectW", HANDLE, [wintypes.LPVOID, wintypes.LPCWSTR])
+        self.SetInformationJobObject = fn(
+            "SetInformationJobObject", BOOL, [HANDLE, wintypes.INT, wintypes.LPVOID, DWORD]
+        )
+        self.QueryInformationJobObject = fn(
+            "QueryInformationJobObject", BOOL, [HANDLE, wintypes.INT, wintypes.LPVOID, DWORD, ctypes.POINTER(DWORD)]
+        )
+        self.AssignProcessToJobObject = fn("AssignProcessToJobObject", BOOL, [HANDLE, HANDLE])
+        # Parent PIDs of the whole process table in one pass (antiace.processes).
+        self.CreateToolhelp32Snapshot = fn("CreateToolhelp32Snapshot", HANDLE, [DWORD, DWORD])
+        self.Process32FirstW = fn("Process32FirstW", BOOL, [HANDLE, ctypes.POINTER(PROCESSENTRY32W)])
+        self.Process32NextW = fn("Process32NextW", BOOL, [HANDLE, ctypes.POINTER(PROCESSENTRY32W)])
+        # Waiting (antiace.waiter).
+        self.CreateEventW = fn("CreateEventW", HANDLE, [wintypes.LPVOID, BOOL, BOOL, wintypes.LPCWSTR])
+        self.SetEvent = fn("SetEvent", BOOL, [HANDLE])
+        self.WaitForMultipleObjects = fn("WaitForMultipleObjects", DWORD, [DWORD, wintypes.LPVOID, BOOL, DWORD])
+        # Single instance and its control pipe (antiace.instance).
+        self.CreateMutexW = fn("CreateMutexW", HANDLE, [wintypes.LPVOID, BOOL, wintypes.LPCWSTR])
+        self.CreateNamedPipeW = fn(
+            "CreateNamedPipeW", HANDLE, [wintypes.LPCWSTR, DWORD, DWORD, DWORD, DWORD, DWORD, DWORD, wintypes.LPVOID]
+        )
+        self.ConnectNamedPipe = fn("ConnectNamedPipe", BOOL, [HANDLE, wintypes.LPVOID])
+        self.DisconnectNamedPipe = fn("DisconnectNamedPipe", BOOL, [HANDLE])
+        self.FlushFileBuffers = fn("FlushFileBuffers", BOOL, [HANDLE])
+        self.ReadFile = fn("ReadFile", BOOL, [HANDLE, wintypes.LPVOID, DWORD, ctypes.POINTER(DWORD), wintypes.LPVOID])
+        self.WriteFile = fn(
+            "WriteFile", BOOL, [HANDLE, wintypes.LPCVOID, DWORD, ctypes.POINTER(DWORD), wintypes.LPVOID]
+        )
+        self.ResetEvent = fn("ResetEvent", BOOL, [HANDLE])
+        self.CancelIoEx = fn("CancelIoEx", BOOL, [HANDLE, wintypes.LPVOID])
+        self.GetOverlappedResult = fn(
+            "GetOverlappedResult", BOOL, [HANDLE, wintypes.LPVOID, ctypes.POINTER(DWORD), BOOL]
+        )
+        self.GetCurrentProcess = fn("GetCurrentProcess", HANDLE, [])
+        self.LocalFree = fn("LocalFree", wintypes.LPVOID, [wintypes.LPVOID])
+        # The pipe's DACL: the current user's SID only.
+        self.OpenProcessToken = fn(
+            "OpenProcessToken", BOOL, [HANDLE, DWORD, ctypes.POINTER(HANDLE)], dll=advapi32
+        )
+        self.GetTokenInformation = fn(
+            "GetTokenInformation",
+            BOOL,
+            [HANDLE, wintypes.INT, wintypes.LPVOID, DWORD, ctypes.POINTER(DWORD)],
+            dll=advapi32,
+        )
+        self.ConvertSidToStringSidW = fn(
+            "ConvertSidToStringSidW", BOOL, [wintypes.LPVOID, ctypes.POINTER(wintypes.LPWSTR)], dll=advapi32
+        )
+        self.ConvertStringSecurityDescriptorToSecurityDescriptorW = fn(
+            "ConvertStringSecurityDescriptorToSecurityDescriptorW",
+            BOOL,
+            [wintypes.LPCWSTR, DWORD, ctypes.POINTER(wintypes.LPVOID), ctypes.POINTER(wintypes.ULONG)],
+            dll=advapi32,
+        )
+
+
+_kernel32_lock = threading.Lock()
+_kernel32_instance: _Kernel32 | None = None
+
+# SetProcessInformation only reads this, so one instance is shared by all calls and threads.
+_THROTTLE_ON = PROCESS_POWER_THROTTLING_STATE(
+    Version=PROCESS_POWER_THROTTLING_CURRENT_VERSION,
+    ControlMask=POWER_THROTTLING_EXECUTION_SPEED,
+    StateMask=POWER_THROTTLING_EXECUTION_SPEED,
+)
+_THROTTLE_OFF = PROCESS_POWER_THROTTLING_STATE(
+    Version=PROCESS_POWER_THROTTLING_CURRENT_VERSION,
+    ControlMask=POWER_THROTTLING_EXECUTION_SPEED,
+    StateMask=0,
+)
+# Output buffers are written by the kernel, so they are per thread.
+_tls = threading.local()
+
+
+def _kernel32() -> _Kernel32 | None:
+    """Return the shared kernel32 binding, or None when not running on Windows."""
+    global _kernel32_instance
+    if os.name != "nt":
+        return None
+    inst = _kernel32_instance
+    if inst is None:
+        with _kernel32_lock:
+            inst = _kernel32_instance
+            if inst is None:
+                inst = _Kernel32()
+                _kernel32_instance = inst
+    return inst
+
+
+def _thread_buffers() -> tuple[PROCESS_POWER_THROTTLING_STATE, ctypes.c_size_t, ctypes.c_size_t]:
+    bufs = getattr(_tls, "bufs", None)
+    if bufs is None:
+        bufs = (PROCESS_POWER_THROTTLING_STATE(), ctypes.c_size_t(0), ctypes.c_size_t(0))
+        _tls.bufs = bufs
+    return bufs
+
 
 def _get_system_info() -> tuple[str, str]:
     """Return (os_version, cpu_model) in a best-effort way."""
-    import os
     import platform
     import sys
 
@@ -69,114 +353,310 @@ def _get_system_info() -> tuple[str, str]:
     return os_version, cpu_model
 
 
-def _set_windows_efficiency_mode(pid: int) -> tuple[bool, str]:
-    """尽力将指定 PID 的进程设置为 Efficiency mode。
-
-    近似实现：
-    - 降低进程优先级（Low / Idle）
-    - 启用 Process Power Throttling（Execution Speed throttling / EcoQoS 相关）
+_SUPPORTED_STEPS = (STEP_PRIORITY, STEP_POWER_THROTTLING, STEP_AFFINITY, STEP_IO_PRIORITY, STEP_MEMORY_PRIORITY)
 
-    说明：某些受保护/高权限进程可能会失败（Access Denied）。
-    """
-    import os
-    import ctypes
-    from ctypes import wintypes
 
-    if os.name != "nt":
-        return False, "Not running on Windows"
+def _mask_cpus(affinity: tuple[int, ...]) -> list[int]:
+    """policy.affinity 中能写进单个 64 位亲和性掩码的 CPU（处理器组 0）。"""
+    return sorted({c for c in affinity if 0 <= c < 64})
 
-    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
 
-    PROCESS_SET_INFORMATION = 0x0200
-    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+def apply_policy(pid: int, policy: Policy) -> ApplyResult:
+    """一次打开目标进程，批量应用 policy 中的各项设置。
 
-    IDLE_PRIORITY_CLASS = 0x00000040
+    - 优先级类（Idle / Below normal / Normal）
+    - Process Power Throttling（Execution Speed throttling / EcoQoS 相关）
+    - CPU 亲和性
+    - I/O 优先级（NtSetInformationProcess(ProcessIoPriority)，Idle 对应 Very low）
+    - 内存优先级（SetProcessInformation(ProcessMemoryPriority)，Idle 对应 Very low）
 
-    # https://learn.microsoft.com/windows/win32/api/processthreadsapi/ne-processthreadsapi-process_information_class
-    # SetProcessInformation(..., ProcessPowerThrottling, ...)
-    ProcessPowerThrottling = 4
-    PROCESS_POWER_THROTTLING_CURRENT_VERSION = 1
-    POWER_THROTTLING_EXECUTION_SPEED = 0x1
+    只申请一个句柄（各步骤所需访问权限的并集），每一步独立执行并记录结果；
+    某一步失败不影响其余步骤。某些受保护/高权限进程可能会失败（Access Denied）。
+    """
+    pid = int(pid)
+    result = ApplyResult(pid)
+    steps = [s for s in policy.steps() if s in _SUPPORTED_STEPS]
+    if not steps:
+        return result
+
+    k32 = _kernel32()
+    if k32 is None:
+        for step in steps:
+            if step == STEP_AFFINITY:
+                result.add(step, *_set_affinity_psutil(pid, policy.affinity or ()))
+            else:
+                result.add(step, False, "Not running on Windows")
+        return result
 
-    class PROCESS_POWER_THROTTLING_STATE(ctypes.Structure):
-        _fields_ = [
-            ("Version", wintypes.ULONG),
-            ("ControlMask", wintypes.ULONG),
-            ("StateMask", wintypes.ULONG),
-        ]
+    desired_access = PROCESS_SET_INFORMATION | PROCESS_QUERY_LIMITED_INFORMATION
+    handle = k32.OpenProcess(desired_access, False, pid)
+    if not handle:
+        result.fail_all(steps, f"OpenProcess failed (pid={pid}) errno={ctypes.get_last_error()}")
+        return result
 
-    OpenProcess = kernel32.OpenProcess
-    OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
-    OpenProcess.restype = wintypes.HANDLE
+    try:
+        if policy.priority is not None:
+            priority_class = _PRIORITY_CLASSES.get(policy.priority)
+            if priority_class is None:
+                result.add(STEP_PRIORITY, False, f"Unknown priority {policy.priority!r}")
+            elif k32.SetPriorityClass(handle, priority_class):
+                result.add(STEP_PRIORITY, True, f"priority={policy.priority}")
+            else:
+                result.add(STEP_PRIORITY, False, f"SetPriorityClass failed errno={ctypes.get_last_error()}")
+
+        if policy.power_throttling is not None:
+            if k32.SetProcessInformation is None:
+                result.add(
+                    STEP_POWER_THROTTLING, False, "SetProcessInformation not available on this Windows version"
+                )
+            else:
+                state = _THROTTLE_ON if policy.power_throttling else _THROTTLE_OFF
+                if k32.SetProcessInformation(handle, ProcessPowerThrottling, ctypes.byref(state), ctypes.sizeof(state)):
+                    mode = "execution_speed" if policy.power_throttling else "off"
+                    result.add(STEP_POWER_THROTTLING, True, f"power_throttling={mode}")
+                else:
+                    result.add(
+                        STEP_POWER_THROTTLING,
+                        False,
+                        f"SetProcessInformation(ProcessPowerThrottling) failed errno={ctypes.get_last_error()}",
+                    )
+
+        if policy.affinity is not None:
+            cpus = _mask_cpus(policy.affinity)
+            mask = sum(1 << c for c in cpus)
+            if not mask:
+                result.add(STEP_AFFINITY, False, f"Invalid affinity {list(policy.affinity)}")
+            elif k32.SetProcessAffinityMask(handle, mask):
+                result.add(STEP_AFFINITY, True, f"cpu_count={logical_cpu_count()} affinity={cpus}")
+            else:
+                result.add(STEP_AFFINITY, False, f"SetProcessAffinityMask failed errno={ctypes.get_last_error()}")
+
+        if policy.io_priority is not None:
+            hint = _IO_PRIORITIES.get(policy.io_priority)
+            if hint is None:
+                result.add(STEP_IO_PRIORITY, False, f"Unsupported io priority {policy.io_priority!r}")
+            else:
+                value = wintypes.ULONG(hint)
+                status = k32.NtSetInformationProcess(
+                    handle, ProcessIoPriority, ctypes.byref(value), ctypes.sizeof(value)
+                )
+                if status == 0:
+                    result.add(STEP_IO_PRIORITY, True, f"io_priority={policy.io_priority}")
+                else:
+                    result.add(
+                        STEP_IO_PRIORITY,
+                        False,
+                        f"NtSetInformationProcess(ProcessIoPriority) failed status=0x{status & 0xFFFFFFFF:08X}",
+                    )
+
+        if policy.memory_priority is not None:
+            level = _MEMORY_PRIORITIES.get(policy.memory_priority)
+            if level is None:
+                result.add(STEP_MEMORY_PRIORITY, False, f"Unsupported memory priority {policy.memory_priority!r}")
+            elif k32.SetProcessInformation is None:
+                result.add(
+                    STEP_MEMORY_PRIORITY, False, "SetProcessInformation not available on this Windows version"
+                )
+            else:
+                info = wintypes.ULONG(level)
+                if k32.SetProcessInformation(handle, ProcessMemoryPriority, ctypes.byref(info), ctypes.sizeof(info)):
+                    result.add(STEP_MEMORY_PRIORITY, True, f"memory_priority={policy.memory_priority}")
+                else:
+                    result.add(
+                        STEP_MEMORY_PRIORITY,
+                        False,
+                        f"SetProcessInformation(ProcessMemoryPriority) failed errno={ctypes.get_last_error()}",
+                    )
+
+        return result
+    finally:
+        k32.CloseHandle(handle)
 
-    CloseHandle = kernel32.CloseHandle
-    CloseHandle.argtypes = [wintypes.HANDLE]
-    CloseHandle.restype = wintypes.BOOL
 
-    SetPriorityClass = kernel32.SetPriorityClass
-    SetPriorityClass.argtypes = [wintypes.HANDLE, wintypes.DWORD]
-    SetPriorityClass.restype = wintypes.BOOL
+def parent_pids() -> dict[int, int]:
+    """一次 Toolhelp32 快照得到所有进程的父 PID（pid -> ppid）。
 
-    # SetProcessInformation exists on Windows 8+.
+    psutil 在 Windows 上每次 `ppid()` 都会枚举整个进程表，逐个读取代价是 O(n²)。
+    失败时返回空字典。
+    """
+    k32 = _kernel32()
+    if k32 is None:
+        return {}
+    snap = k32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+    if not snap or snap == INVALID_HANDLE_VALUE:
+        return {}
+    parents: dict[int, int] = {}
     try:
-        SetProcessInformation = kernel32.SetProcessInformation
-    except AttributeError:
-        return False, "SetProcessInformation not available on this Windows version"
-    SetProcessInformation.argtypes = [
-        wintypes.HANDLE,
-        wintypes.INT,
-        wintypes.LPVOID,
-        wintypes.DWORD,
-    ]
-    SetProcessInformation.restype = wintypes.BOOL
+        entry = PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(entry)
+        ok = k32.Process32FirstW(snap, ctypes.byref(entry))
+        while ok:
+            parents[int(entry.th32ProcessID)] = int(entry.th32ParentProcessID)
+            ok = k32.Process32NextW(snap, ctypes.byref(entry))
+    finally:
+        k32.CloseHandle(snap)
+    return parents
 
-    desired_access = PROCESS_SET_INFORMATION | PROCESS_QUERY_LIMITED_INFORMATION
-    handle = OpenProcess(desired_access, False, int(pid))
+
+def trim_working_set(pid: int) -> tuple[bool, str]:
+    """清空目标进程的工作集（SetProcessWorkingSetSize(-1, -1)）。
+
+    页面只是移到待机列表，进程再次访问时会缺页调回，因此调用方需要限制频率。
+    """
+    k32 = _kernel32()
+    if k32 is None:
+        return False, "Not running on Windows"
+    handle = k32.OpenProcess(PROCESS_SET_QUOTA | PROCESS_QUERY_LIMITED_INFORMATION, False, int(pid))
     if not handle:
         return False, f"OpenProcess failed (pid={pid}) errno={ctypes.get_last_error()}"
-
     try:
-        ok_priority = bool(SetPriorityClass(handle, IDLE_PRIORITY_CLASS))
-        if not ok_priority:
-            return False, f"SetPriorityClass failed errno={ctypes.get_last_error()}"
-
-        state = PROCESS_POWER_THROTTLING_STATE(
-            Version=PROCESS_POWER_THROTTLING_CURRENT_VERSION,
-            ControlMask=POWER_THROTTLING_EXECUTION_SPEED,
-            StateMask=POWER_THROTTLING_EXECUTION_SPEED,
-        )
-        ok_throttle = bool(
-            SetProcessInformation(
-                handle,
-                ProcessPowerThrottling,
-                ctypes.byref(state),
-                ctypes.sizeof(state),
-            )
-        )
-        if not ok_throttle:
-            return False, f"SetProcessInformation(ProcessPowerThrottling) failed errno={ctypes.get_last_error()}"
-
-        return True, "ok (priority=low/idle + power_throttling=execution_speed)"
+        unlimited = ctypes.c_size_t(-1).value
+        if not k32.SetProcessWorkingSetSize(handle, unlimited, unlimited):
+            return False, f"SetProcessWorkingSetSize failed errno={ctypes.get_last_error()}"
+        return True, "working_set=trimmed"
     finally:
-        CloseHandle(handle)
+        k32.CloseHandle(handle)
 
 
-def _set_processor_affinity_last_cpu(pid: int) -> tuple[bool, str]:
-    """将指定 PID 的 CPU 亲和性限制为“最后一个逻辑 CPU”。
+def tune_thread(tid: int, priority: str | None, cpu: int | None) -> tuple[bool, str]:
+    """设置单个线程的优先级（Idle 对应 THREAD_PRIORITY_IDLE）和理想处理器。
 
-    例：逻辑 CPU 数为 32，则仅允许使用 CPU 31。
+    理想处理器只是调度器的首选 CPU，不限制线程可运行的 CPU，因此不会与进程亲和性冲突。
     """
-    import os
-
-    cpu_count = psutil.cpu_count(logical=True) or os.cpu_count() or 0
-    if cpu_count <= 0:
-        return False, "Cannot determine logical CPU count"
+    k32 = _kernel32()
+    if k32 is None:
+        return False, "Not running on Windows"
+    handle = k32.OpenThread(THREAD_SET_INFORMATION | THREAD_QUERY_LIMITED_INFORMATION, False, int(tid))
+    if not handle:
+        return False, f"OpenThread failed (tid={tid}) errno={ctypes.get_last_error()}"
+    try:
+        done: list[str] = []
+        if priority is not None:
+            value = _THREAD_PRIORITIES.get(priority)
+            if value is None:
+                return False, f"Unknown priority {priority!r}"
+            if not k32.SetThreadPriority(handle, value):
+                return False, f"SetThreadPriority failed errno={ctypes.get_last_error()}"
+            done.append(f"priority={priority}")
+        if cpu is not None:
+            if k32.SetThreadIdealProcessor(handle, int(cpu)) == 0xFFFFFFFF:
+                return False, f"SetThreadIdealProcessor failed errno={ctypes.get_last_error()}"
+            done.append(f"ideal_cpu={cpu}")
+        return True, " ".join(done) or "unchanged"
+    finally:
+        k32.CloseHandle(handle)
 
-    last_cpu = cpu_count - 1
 
+def _set_affinity_psutil(pid: int, cpus: tuple[int, ...]) -> tuple[bool, str]:
     try:
-        proc = psutil.Process(int(pid))
-        proc.cpu_affinity([last_cpu])
-        return True, f"ok (cpu_count={cpu_count} affinity=[{last_cpu}])"
-    except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+        psutil.Process(int(pid)).cpu_affinity(list(cpus))
+        return True, f"cpu_count={logical_cpu_count()} affinity={sorted(cpus)}"
+    except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError) as e:
         return False, f"{type(e).__name__}: {e}"
+
+
+def _query_process_policy_state(pid: int) -> tuple[bool, dict[str, object] | str]:
+    """读取进程当前的优先级类、Power Throttling 状态、CPU 亲和性与 I/O 优先级（只读查询）。
+
+    返回 (ok, state)，state 可能包含：
+    - "priority_class": int
+    - "power_throttling": bool | None（None 表示系统不支持查询）
+    - "affinity": list[int]
+    - "io_priority": int | None（IO_PRIORITY_HINT；None 表示无法查询）
+    - "memory_priority": int | None（MEMORY_PRIORITY_*；None 表示无法查询）
+    """
+    k32 = _kernel32()
+    if k32 is None:
+        try:
+            return True, {"affinity": sorted(os.sched_getaffinity(int(pid)))}
+        except (AttributeError, OSError) as e:
+            return False, f"{type(e).__name__}: {e}"
+
+    handle = k32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, int(pid))
+    if not handle:
+        return False, f"OpenProcess failed (pid={pid}) errno={ctypes.get_last_error()}"
+
+    try:
+        result: dict[str, object] = {}
+        state, process_mask, system_mask = _thread_buffers()
+
+        priority_class = k32.GetPriorityClass(handle)
+        if not priority_class:
+            return False, f"GetPriorityClass failed errno={ctypes.get_last_error()}"
+        result["priority_class"] = int(priority_class)
+
+        result["power_throttling"] = None
+        if k32.GetProcessInformation is not None:
+            state.Version = PROCESS_POWER_THROTTLING_CURRENT_VERSION
+            state.ControlMask = 0
+            state.StateMask = 0
+            if k32.GetProcessInformation(handle, ProcessPowerThrottling, ctypes.byref(state), ctypes.sizeof(state)):
+                exec_speed = POWER_THROTTLING_EXECUTION_SPEED
+                result["power_throttling"] = bool(state.ControlMask & exec_speed and state.StateMask & exec_speed)
+
+        if not k32.GetProcessAffinityMask(handle, ctypes.byref(process_mask), ctypes.byref(system_mask)):
+            return False, f"GetProcessAffinityMask failed errno={ctypes.get_last_error()}"
+        mask = int(process_mask.value)
+        result["affinity"] = [i for i in range(mask.bit_length()) if mask >> i & 1]
+
+        result["io_priority"] = None
+        io_hint = wintypes.ULONG(0)
+        status = k32.NtQueryInformationProcess(
+            handle, ProcessIoPriority, ctypes.byref(io_hint), ctypes.sizeof(io_hint), None
+        )
+        if status == 0:
+            result["io_priority"] = int(io_hint.value)
+
+        result["memory_priority"] = None
+        if k32.GetProcessInformation is not None:
+            memory_info = wintypes.ULONG(0)
+            if k32.GetProcessInformation(
+                handle, ProcessMemoryPriority, ctypes.byref(memory_info), ctypes.sizeof(memory_info)
+            ):
+                result["memory_priority"] = int(memory_info.value)
+
+        return True, result
+    finally:
+        k32.CloseHandle(handle)
+
+
+def _detect_policy_drift(pid: int, policy: Policy) -> tuple[bool, list[str] | str]:
+    """检查进程是否偏离了 policy（优先级 / Power Throttling / 亲和性 / I/O 优先级 / 内存优先级）。
+
+    返回 (ok, drifted)：ok=False 表示无法查询（此时 drifted 为错误信息），
+    否则 drifted 为偏离的步骤列表（"priority" / "power_throttling" / "affinity" / "io_priority" /
+    "memory_priority"），空列表表示无需写入。
+    """
+    ok, state = _query_process_policy_state(int(pid))
+    if not ok or not isinstance(state, dict):
+        return False, str(state)
+
+    drifted: list[str] = []
+
+    priority_class = state.get("priority_class")
+    if policy.priority is not None and priority_class is not None:
+        if priority_class != _PRIORITY_CLASSES.get(policy.priority):
+            drifted.append(STEP_PRIORITY)
+
+    throttling = state.get("power_throttling")
+    if policy.power_throttling is not None and throttling is not None:
+        if bool(throttling) != bool(policy.power_throttling):
+            drifted.append(STEP_POWER_THROTTLING)
+
+    affinity = state.get("affinity")
+    if policy.affinity is not None and affinity is not None:
+        # Compared with what apply_policy can write, not with the raw policy.
+        if sorted(affinity) != _mask_cpus(policy.affinity):
+            drifted.append(STEP_AFFINITY)
+
+    io_priority = state.get("io_priority")
+    if policy.io_priority is not None and io_priority is not None:
+        if io_priority != _IO_PRIORITIES.get(policy.io_priority):
+            drifted.append(STEP_IO_PRIORITY)
+
+    memory_priority = state.get("memory_priority")
+    if policy.memory_priority is not None and memory_priority is not None:
+        if memory_priority != _MEMORY_PRIORITIES.get(policy.memory_priority):
+            drifted.append(STEP_MEMORY_PRIORITY)
+
+    return True, drifted
@@ -0,0 +1,252 @@
+"""Tk-side cost of draining monitor events: tuple queue vs antiace.events.
+
+Floods the GUI channel the way a busy background monitor would (every
+round: a status line, progress, CPU info and one row update per target,
+most of them unchanged, plus I/O details), then measures how long the Tk
+thread spends draining it:
+
+- legacy: one tuple per event on a `queue.Queue`, handled one at a time
+  through an if/elif chain (what `poll_events` did before `GuiEvents`),
+- batched: `GuiEvents.drain()` once per tick, coalesced events dispatched
+  through a table, only changed rows touching the Treeview.
+
+A real Tk Treeview/StringVar is used when a display is available, otherwise
+counting stand-ins (the widget-call counts are the same either way):
+
+    python scripts/bench_gui_events.py
+    python scripts/bench_gui_events.py --targets 20 --rounds 2000 --rounds-per-tick 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import queue
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from antiace.events import CpuInfo, GuiEvents, Progress, Status  # noqa: E402
+
+
+class _Var:
+    def __init__(self, ui: "_Ui") -> None:
+        self._ui = ui
+        self.value: object = None
+
+    def set(self, value: object) -> None:
+        self._ui.calls += 1
+        self.value = value
+
+
+class _Tree:
+    def __init__(self, ui: "_Ui") -> None:
+        self._ui = ui
+        self._items: dict[str, tuple] = {}
+
+    def exists(self, iid: str) -> bool:
+        return iid in self._items
+
+    def item(self, iid: str, *, values: tuple) -> None:
+        self._ui.calls += 1
+        self._items[iid] = values
+
+    def insert(self, _parent: str, _index: str, *, iid: str, values: tuple) -> None:
+        self._ui.calls += 1
+        self._items[iid] = values
+
+    def configure(self, **_kwargs: object) -> None:
+        self._ui.calls += 1
+
+
+class _Ui:
+    """Widgets touched by the event handlers; real Tk ones when possible."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.backend = "stand-in"
+        self.root = None
+        try:
+            import tkinter as tk
+            from tkinter import ttk
+
+            self.root = tk.Tk()
+            self.root.withdraw()
+        except Exception:
+            self.status = _Var(self)
+            self.progress = _Var(self)
+            self.summary = _Var(self)
+            self.tree = _Tree(self)
+            return
+        self.backend = "tk"
+        self.status = self._counted(tk.StringVar(self.root))
+        self.progress = self._counted(tk.IntVar(self.root))
+        self.summary = self._counted(tk.StringVar(self.root))
+        tree = ttk.Treeview(self.root, columns=("name", "pid", "eff", "aff", "detail"), show="headings")
+        self.tree = self._counted(tree, ("item", "insert", "configure"))
+
+    def _counted(self, widget, methods: tuple[str, ...] = ("set",)):
+        ui = self
+
+        class Counted:
+            def __getattr__(self, name):
+                attr = getattr(widget, name)
+                if name not in methods:
+                    return attr
+
+                def call(*args, **kwargs):
+                    ui.calls += 1
+                    return attr(*args, **kwargs)
+
+                return call
+
+        return Counted()
+
+    def close(self) -> None:
+        if self.root is not None:
+            self.root.destroy()
+
+
+def _row_values(name: str, pid: int, ok_eff: bool, ok_aff: bool) -> tuple:
+    return (name, pid, "Enabled" if ok_eff else "Failed", "Set" if ok_aff else "Failed", "Details")
+
+
+def _produce(targets: int, round_: int):
+    """What one monitor round publishes: (kind, payload) pairs."""
+    yield "status", ("processing", f"SGuard{round_ % targets}.exe", 1000 + round_ % targets)
+    yield "cpu", (16, (14, 15))
+    for i in range(targets):
+        # Every 50th round one target's efficiency result flips; the rest re-publish identical rows.
+        ok = not (round_ % 50 == 0 and i == round_ % targets)
+        yield "row", (f"SGuard{i}.exe", 1000 + i, ok, "ok", True, "ok", i + 1, targets)
+        yield "io", (1000 + i, (1024.0 * i, 0.0, 512.0 * i, 0.0))
+
+
+def legacy(targets: int, rounds: int, per_tick: int) -> tuple[float, int, int, str]:
+    ui = _Ui()
+    q: queue.Queue[tuple] = queue.Queue()
+    rows: dict[int, dict] = {}
+    spent = 0.0
+    ticks = 0
+    for r in range(rounds):
+        for kind, payload in _produce(targets, r):
+            if kind == "status":
+                q.put(("status", *payload))
+            elif kind == "cpu":
+                q.put(("cpu", *payload))
+            elif kind == "row":
+                if payload[6] == 1:
+                    # One bg_found per publish, ahead of its row updates.
+                    q.put(("bg_found", [(f"SGuard{i}.exe", 1000 + i) for i in range(targets)]))
+                q.put(("row_update", *payload))
+            else:
+                q.put(("row_io", *payload))
+        if (r + 1) % per_tick:
+            continue
+        started = time.perf_counter()
+        try:
+            while True:
+                ev = q.get_nowait()
+                kind = ev[0]
+                if kind == "bg_found":
+                    ui.tree.configure(height=max(2, min(8, len(ev[1]))))
+                    continue
+                if kind == "status":
+                    ui.status.set(f"{ev[1]} {ev[2]} {ev[3]}")
+                elif kind == "cpu":
+                    ui.summary.set(f"CPU: {ev[1]} cores, guard -> {ev[2]}")
+                elif kind == "row_update":
+                    _, name, pid, ok_eff, _me, ok_aff, _ma, idx, total = ev
+                    ui.progress.set(idx)
+                    values = _row_values(name, pid, ok_eff, ok_aff)
+                    if ui.tree.exists(str(pid)):
+                        ui.tree.item(str(pid), values=values)
+                    else:
+                        ui.tree.insert("", "end", iid=str(pid), values=values)
+                    rows[pid] = {"ok_eff": ok_eff, "ok_aff": ok_aff}
+                    ui.status.set(f"progress {idx}/{total}")
+                elif kind == "row_io":
+                    row = rows.get(ev[1])
+                    if row is not None:
+                        row["io"] = ev[2]
+        except queue.Empty:
+            pass
+        spent += time.perf_counter() - started
+        ticks += 1
+    calls = ui.calls
+    ui.close()
+    return spent, ticks, calls, ui.backend
+
+
+def batched(targets: int, rounds: int, per_tick: int) -> tuple[float, int, int, dict[str, int]]:
+    ui = _Ui()
+    bus = GuiEvents()
+    rows: dict[int, object] = {}
+    handlers = {
+        Status: lambda ev: ui.status.set(f"{ev.code} {ev.args}"),
+        Progress: lambda ev: (ui.progress.set(ev.done), ui.status.set(f"progress {ev.done}/{ev.total}")),
+        CpuInfo: lambda ev: ui.summary.set(f"CPU: {ev.count} cores, guard -> {ev.affinity}"),
+    }
+    spent = 0.0
+    ticks = 0
+    for r in range(rounds):
+        for kind, payload in _produce(targets, r):
+            if kind == "status":
+                bus.put(Status(payload[0], payload[1:]))
+            elif kind == "cpu":
+                bus.put(CpuInfo(*payload))
+            elif kind == "row":
+                name, pid, ok_eff, msg_eff, ok_aff, msg_aff, idx, total = payload
+                bus.update_row(pid, name, ok_eff, msg_eff, ok_aff, msg_aff)
+                bus.put(Progress(idx, total))
+            else:
+                bus.update_row_details(payload[0], io=payload[1])
+        if (r + 1) % per_tick:
+            continue
+        started = time.perf_counter()
+        batch = bus.drain()
+        if batch is not None:
+            count = len(rows)
+            for pid, row in batch.rows.items():
+                old = rows.get(pid)
+                rows[pid] = row
+                if old is None or (old.ok_eff, old.ok_aff) != (row.ok_eff, row.ok_aff):
+                    values = _row_values(row.name, row.pid, row.ok_eff, row.ok_aff)
+                    if ui.tree.exists(str(pid)):
+                        ui.tree.item(str(pid), values=values)
+                    else:
+                        ui.tree.insert("", "end", iid=str(pid), values=values)
+            if len(rows) != count:
+                ui.tree.configure(height=max(2, min(8, len(rows))))
+            for ev in batch.events:
+                handlers[type(ev)](ev)
+        spent += time.perf_counter() - started
+        ticks += 1
+    calls = ui.calls
+    ui.close()
+    return spent, ticks, calls, bus.stats()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", type=int, default=8, help="Rows in the table")
+    parser.add_argument("--rounds", type=int, default=2000, help="Monitor rounds to publish")
+    parser.add_argument("--rounds-per-tick", type=int, default=5, help="Rounds published between two Tk ticks")
+    args = parser.parse_args()
+
+    targets, rounds, per_tick = max(1, args.targets), max(1, args.rounds), max(1, args.rounds_per_tick)
+    events = rounds * (2 + 2 * targets)
+    old_s, old_ticks, old_calls, widgets = legacy(targets, rounds, per_tick)
+    new_s, new_ticks, new_calls, stats = batched(targets, rounds, per_tick)
+    print(f"{events} updates published, {targets} targets, {per_tick} rounds per tick, widgets: {widgets}")
+    results = (("legacy", old_s, old_ticks, old_calls), ("batched", new_s, new_ticks, new_calls))
+    for label, spent, ticks, calls in results:
+        print(f"{label:<8} drain {spent * 1000.0:8.1f} ms  ({spent / ticks * 1e6:7.1f} us/tick)  widget calls {calls}")
+    print(f"bus: {stats['puts']} puts, {stats['coalesced']} coalesced, {stats['batches']} batches")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+"""Resident footprint of the background (tray) process with and without a Tk UI.
+
+Each mode runs in a fresh interpreter that sets up what `run_background`
+has at steady state (the event bus with a few target rows, the main thread
+serving the GUI), waits for it to settle and reports its own RSS, USS,
+handle count (open fds on Linux) and thread count:
+
+- eager: the old behaviour, the full UI built hidden at startup and kept,
+- lazy: the UI is only built on "显示主页面"; measured before anyone asks,
+- torn-down: the UI was shown, hidden again and destroyed after
+  `gui_teardown_after` (here 0.5 s).
+
+The median of --runs is printed per mode. Modes that need Tk report an error
+when no display is available:
+
+    python scripts/bench_resident.py
+    python scripts/bench_resident.py --runs 5 --settle 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, os, sys, threading, time
+
+import psutil
+
+from antiace.app import serve_gui
+from antiace.events import Control, CpuInfo, GuiEvents, Stats, WegameState
+
+mode, settle = sys.argv[1], float(sys.argv[2])
+events = GuiEvents()
+stop = threading.Event()
+events.put(WegameState("running"))
+events.put(CpuInfo(os.cpu_count() or 1, (0,)))
+events.put(Stats({"wakeups_per_minute": 1.0}))
+for i in range(4):
+    events.update_row(1000 + i, "SGuard64.exe", True, "efficiency=on", True, "affinity=0")
+
+result = {}
+
+
+def measure():
+    proc = psutil.Process()
+    try:
+        uss = proc.memory_full_info().uss
+    except psutil.Error:
+        uss = 0
+    handles = proc.num_handles() if os.name == "nt" else proc.num_fds()
+    result.update(
+        rss=proc.memory_info().rss,
+        uss=uss,
+        handles=handles,
+        threads=proc.num_threads(),
+        tk_loaded="tkinter" in sys.modules,
+    )
+
+
+def drive():
+    try:
+        if mode == "torn-down":
+            events.put(Control("show"))
+            time.sleep(settle)
+            events.put(Control("hide"))
+            # 0.5 s teardown plus time to release the memory.
+            time.sleep(0.5 + settle)
+        else:
+            time.sleep(settle)
+        measure()
+    finally:
+        stop.set()
+        events.put(Control("quit"))
+
+
+threading.Thread(target=drive, daemon=True).start()
+try:
+    if mode == "eager":
+        from antiace.gui import run_gui
+
+        run_gui(with_tray=False, events=events, start_hidden=True, close_to_tray=True, auto_scan=False)
+    else:
+        serve_gui(events, stop, teardown_after=0.5)
+except Exception as exc:
+    result = {"error": f"{type(exc).__name__}: {exc}"}
+    stop.set()
+print(json.dumps(result))
+"""
+
+MODES = ("eager", "lazy", "torn-down")
+
+
+def run_mode(mode: str, settle: float) -> dict[str, object]:
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD, mode, str(settle)],
+        cwd=REPO_ROOT,
+        env=dict(os.environ, PYTHONPATH=str(REPO_ROOT)),
+        capture_output=True,
+        text=True,
+        timeout=60 + 3 * settle,
+        check=False,
+    )
+    lines = proc.stdout.strip().splitlines()
+    if not lines:
+        return {"error": (proc.stderr.strip().splitlines() or ["no output"])[-1]}
+    return json.loads(lines[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=MODES, action="append", help="Mode(s) to measure; default all")
+    parser.add_argument("--runs", type=int, default=3, help="Interpreter launches per mode (median is reported)")
+    parser.add_argument("--settle", type=float, default=1.0, help="Seconds to wait before measuring")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'rss MiB':>8} {'uss MiB':>8} {'handles':>8} {'threads':>8}  tk")
+    for mode in args.mode or MODES:
+        results = [run_mode(mode, args.settle) for _ in range(max(1, args.runs))]
+        ok = [r for r in results if "error" not in r]
+        if not ok:
+            print(f"{mode:<10} skipped: {results[0]['error']}")
+            continue
+
+        def median(key: str) -> float:
+            return statistics.median(float(r[key]) for r in ok)
+
+        print(
+            f"{mode:<10} {median('rss') / 2**20:8.1f} {median('uss') / 2**20:8.1f} "
+            f"{median('handles'):8.0f} {median('threads'):8.0f}  {'yes' if ok[0]['tk_loaded'] else 'no'}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
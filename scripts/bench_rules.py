@@ -0,0 +1,111 @@
+"""Cost of matching targets in one scan: name list vs compiled rules.
+
+Takes one process snapshot and times, per scan (median of --repeat):
+
+- names: `ProcessSnapshot.find` with the two guard names (the old matcher),
+- rules-2: `RuleSet.find` with the default rules (the same two names),
+- rules-N: `RuleSet.find` with --rules rules: the two guard names plus
+  exact names, wildcard names and rules with exe / cmdline / parent
+  conditions, none of which match anything here.
+
+With --spawn a few dummy processes named like the wildcard rules are
+started so that exe / cmdline / parent actually get read; the first scan
+pays for those reads, later scans use the cached verdicts:
+
+    python scripts/bench_rules.py
+    python scripts/bench_rules.py --rules 50 --repeat 200 --spawn 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from antiace.processes import get_snapshot  # noqa: E402
+from antiace.rules import RuleSet, load_rules  # noqa: E402
+from antiace.wegame import GUARD_PROCESSES  # noqa: E402
+
+
+def _rules(count: int) -> list[dict]:
+    entries: list[dict] = [{"name": name} for name in GUARD_PROCESSES]
+    i = 0
+    while len(entries) < count:
+        kind = i % 4
+        if kind == 0:
+            entries.append({"name": f"AntiAceBench{i}.exe"})
+        elif kind == 1:
+            entries.append({"name": f"antiacebench-glob{i}*", "policy": {"cpu_cap": 5}})
+        elif kind == 2:
+            entries.append({"name": f"antiacebench-cmd{i}*", "cmdline": r"--never-passed-\d+"})
+        else:
+            entries.append({"name": f"antiacebench-exe{i}*", "exe": "*/nowhere/*", "parent": "nothing"})
+        i += 1
+    return entries
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=50, help="Rules in the large rule set")
+    parser.add_argument("--repeat", type=int, default=100, help="Scans timed per matcher")
+    parser.add_argument("--spawn", type=int, default=0, help="Dummy processes matching wildcard rules (POSIX)")
+    args = parser.parse_args()
+
+    entries = _rules(max(len(GUARD_PROCESSES), args.rules))
+    procs: list[subprocess.Popen] = []
+    tmp = Path(tempfile.mkdtemp())
+    sleep = shutil.which("sleep")
+    try:
+        if args.spawn and sleep:
+            # Named after the cmdline rules, so their command line is read on the first scan.
+            names = [e["name"].rstrip("*") + "x" for e in entries if "cmdline" in e][: args.spawn]
+            for name in names:
+                exe = tmp / name
+                shutil.copy(sleep, exe)
+                procs.append(subprocess.Popen([str(exe), "60"]))
+            time.sleep(0.2)
+
+        snap = get_snapshot(max_age=0)
+        small = RuleSet.default()
+        large = load_rules(entries)
+        repeat = max(1, args.repeat)
+        cold_started = time.perf_counter()
+        candidates = len(large.find(snap))
+        cold = time.perf_counter() - cold_started
+
+        print(f"{len(snap)} processes, {len(large.rules)} rules, {len(procs)} candidates spawned")
+        results = (
+            ("names", lambda: snap.find(list(GUARD_PROCESSES))),
+            ("rules-2", lambda: small.find(snap)),
+            (f"rules-{len(large.rules)}", lambda: large.find(snap)),
+        )
+        for label, fn in results:
+            print(f"{label:<10} {_time(fn, repeat) * 1e6:9.1f} us/scan")
+        print(f"first scan with {len(large.rules)} rules (detail reads): {cold * 1e6:.1f} us, {candidates} matched")
+    finally:
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
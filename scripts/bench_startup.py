@@ -0,0 +1,146 @@
+"""Startup cost of each Anti-ACE entry mode.
+
+For every mode, runs a fresh interpreter that imports exactly what
+`python -m antiace <mode>` imports before doing any work, and reports:
+
+- wall-clock time of that interpreter minus a bare `python -c pass`
+  (median of --runs),
+- the number of modules imported and the slowest ones (`python -X importtime`),
+- modules the mode must never load (e.g. Tk or the tray for `--cli`).
+
+With --check the script is a regression test: it exits 1 when the `--cli`
+import overhead or module count is over budget, or a forbidden module shows
+up. Run it from the repository root:
+
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --check --max-ms 80 --max-modules 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# What `python -m antiace <flag>` imports before the mode starts working.
+MODES = {
+    "cli": "import antiace.__main__, antiace.cli",
+    "gui": "import antiace.__main__, antiace.gui",
+    "background": "import antiace.__main__, antiace.app",
+}
+
+# Heavy modules `--cli` never needs; loading any of them means an eager import crept back
+# in. Standard-library modules are left to the module and time budgets: which of them get
+# imported depends on the interpreter, site and psutil version, not on this project.
+CLI_FORBIDDEN = (
+    "tkinter",
+    "PIL",
+    "pystray",
+    "antiace.gui",
+    "antiace.app",
+    "antiace.tray",
+    "antiace.trayicons",
+    "antiace.picker",
+    "antiace.optimizer",
+)
+
+
+def _run(code: str, *, importtime: bool = False) -> tuple[float, str]:
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", code]
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=False)
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{proc.stderr}")
+    return elapsed, proc.stderr
+
+
+def _parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every line of -X importtime output."""
+    modules: list[tuple[str, int, int]] = []
+    for line in stderr.splitlines():
+        # "import time:       209 |      87900 |   antiace.__main__"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative, name = line[len("import time:") :].split("|", 2)
+            modules.append((name.strip(), int(self_us), int(cumulative)))
+        except ValueError:
+            continue
+    return modules
+
+
+def measure(mode: str, runs: int) -> dict[str, object]:
+    code = MODES[mode]
+    bare = statistics.median(_run("pass")[0] for _ in range(runs))
+    wall = statistics.median(_run(code)[0] for _ in range(runs))
+    _elapsed, stderr = _run(code, importtime=True)
+    modules = _parse_importtime(stderr)
+    baseline = {name for name, _s, _c in _parse_importtime(_run("pass", importtime=True)[1])}
+    loaded = [m for m in modules if m[0] not in baseline]
+    names = {name for name, _s, _c in loaded}
+    forbidden = CLI_FORBIDDEN if mode == "cli" else ()
+    return {
+        "mode": mode,
+        "overhead_ms": round(max(0.0, wall - bare) * 1000.0, 1),
+        "wall_ms": round(wall * 1000.0, 1),
+        "modules": len(loaded),
+        "slowest": sorted(loaded, key=lambda m: m[1], reverse=True)[:8],
+        "forbidden": sorted(n for n in names if n.split(".")[0] in forbidden or n in forbidden),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=sorted(MODES), action="append", help="Mode(s) to measure; default all")
+    parser.add_argument("--runs", type=int, default=5, help="Interpreter launches per mode (median is reported)")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the --cli budget below is exceeded")
+    parser.add_argument("--max-ms", type=float, default=80.0, help="--cli import overhead budget in ms")
+    parser.add_argument("--max-modules", type=int, default=100, help="--cli imported module budget")
+    args = parser.parse_args()
+
+    modes = args.mode or (["cli"] if args.check else list(MODES))
+    if args.check and "cli" not in modes:
+        modes.append("cli")
+
+    failures: list[str] = []
+    for mode in modes:
+        result = measure(mode, max(1, args.runs))
+        print(
+            f"{mode:<10} overhead={result['overhead_ms']:.1f} ms  wall={result['wall_ms']:.1f} ms  "
+            f"modules={result['modules']}"
+        )
+        for name, self_us, _cumulative in result["slowest"]:
+            print(f"    {self_us / 1000.0:7.2f} ms  {name}")
+        if result["forbidden"]:
+            print(f"    forbidden: {', '.join(result['forbidden'])}")
+
+        if mode == "cli":
+            if result["forbidden"]:
+                failures.append(f"--cli imports {', '.join(result['forbidden'])}")
+            if result["overhead_ms"] > args.max_ms:
+                failures.append(f"--cli import overhead {result['overhead_ms']} ms > {args.max_ms} ms")
+            if result["modules"] > args.max_modules:
+                failures.append(f"--cli imports {result['modules']} modules > {args.max_modules}")
+
+    if args.check:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            return 1
+        print("OK: --cli startup within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
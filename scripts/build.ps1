@@ -26,6 +26,9 @@ Write-Host "  Spec: $spec"
 
 # Use uv-managed environment if available.
 # If you don't use uv, replace `uv run` with `py -m`.
+Write-Host "Pre-rendering tray icons..."
+uv run python scripts/build_tray_icons.py
+
 uv run pyinstaller @cleanArgs --noconfirm $spec
 
 $exe = Join-Path $repoRoot "dist\Anti-ACE.exe"
@@ -0,0 +1,38 @@
+"""Pre-render the tray icons into tray-icons.bin next to icon.ico.
+
+Run before PyInstaller (Anti-ACE.spec bundles the file when it exists):
+
+    python scripts/build_tray_icons.py
+
+Without it the app renders the same assets on first start and caches them in
+the config directory; see antiace/trayicons.py.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from antiace import trayicons  # noqa: E402
+
+
+def main() -> int:
+    icon = REPO_ROOT / "icon.ico"
+    key = trayicons.icon_key(str(icon))
+    if key is None:
+        print(f"cannot read {icon}")
+        return 1
+    started = time.perf_counter()
+    data = trayicons.dump(trayicons.render(str(icon)), key)
+    out = icon.with_name(trayicons.ASSET_NAME)
+    out.write_bytes(data)
+    print(f"{out.name}: {len(data)} bytes, key {key}, rendered in {(time.perf_counter() - started) * 1000.0:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
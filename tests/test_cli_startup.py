@@ -0,0 +1,45 @@
+"""`--cli` import budget, the deterministic half of `scripts/bench_startup.py --check`.
+
+The wall-clock budget is left to the script: it is too noisy for a test run.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _bench_startup():
+    spec = importlib.util.spec_from_file_location("bench_startup", REPO_ROOT / "scripts" / "bench_startup.py")
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_cli_imports_no_forbidden_modules() -> None:
+    bench = _bench_startup()
+    code = f"import json, sys; {bench.MODES['cli']}; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    loaded = set(json.loads(proc.stdout))
+
+    forbidden = sorted(
+        name for name in loaded if name in bench.CLI_FORBIDDEN or name.split(".")[0] in bench.CLI_FORBIDDEN
+    )
+    assert forbidden == []
+
+
+def test_cli_module_budget() -> None:
+    bench = _bench_startup()
+    result = bench.measure("cli", 1)
+
+    assert result["forbidden"] == []
+    # Same default as `bench_startup.py --max-modules`.
+    assert result["modules"] <= 100
@@ -0,0 +1,140 @@
+"""BudgetController escalation ladder with a fake CPU clock."""
+
+from __future__ import annotations
+
+import pytest
+
+from antiace import controller as controller_module
+from antiace.controller import (
+    LEVEL_CAPPED,
+    LEVEL_IDLE,
+    LEVEL_NORMAL,
+    LEVEL_PINNED,
+    LEVEL_THROTTLED,
+    BudgetController,
+)
+from antiace.policy import PRIORITY_IDLE, STEP_AFFINITY, STEP_CPU_CAP, STEP_PRIORITY, Policy
+
+PID = 4321
+BASE = Policy(priority=PRIORITY_IDLE, power_throttling=True, affinity=(6, 7))
+
+
+class FakeClock:
+    """Monotonic time and the target's CPU seconds, advanced by the test."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.cpu = 0.0
+
+    def run(self, seconds: float, usage: float) -> None:
+        """`usage` in percent of one CPU over the next `seconds`."""
+        self.now += seconds
+        self.cpu += seconds * usage / 100.0
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(controller_module.time, "monotonic", lambda: fake.now)
+    monkeypatch.setattr(BudgetController, "_cpu_seconds", staticmethod(lambda pid: fake.cpu))
+    monkeypatch.setattr(controller_module, "logical_cpu_count", lambda: 8)
+    return fake
+
+
+def _step(ctl: BudgetController, clock: FakeClock, usage: float):
+    clock.run(5.0, usage)
+    return ctl.update(PID, BASE)
+
+
+def test_new_target_starts_at_the_fixed_policy(clock: FakeClock) -> None:
+    ctl = BudgetController(budget=2.0)
+
+    policy = ctl.policy_for(PID, BASE)
+
+    assert ctl.level(PID) == LEVEL_PINNED
+    assert policy.priority == PRIORITY_IDLE
+    assert policy.power_throttling is True
+    assert policy.affinity == (6, 7)
+    # Not capped yet; a first apply leaves an existing cap alone.
+    assert policy.cpu_cap is None
+
+
+def test_escalates_to_the_cap_when_over_budget(clock: FakeClock) -> None:
+    ctl = BudgetController(budget=2.0)
+    ctl.policy_for(PID, BASE)
+
+    change = _step(ctl, clock, 10.0)
+
+    assert change is not None
+    assert (change.old_level, change.new_level) == (LEVEL_PINNED, LEVEL_CAPPED)
+    assert change.policy.steps() == [STEP_CPU_CAP]
+    assert change.policy.cpu_cap == 2.0
+    assert change.describe(ctl.budget).startswith("budget escalated 3->4")
+    # Already at the top of the ladder.
+    assert _step(ctl, clock, 10.0) is None
+
+
+def test_relaxes_one_level_per_quiet_streak_down_to_min_level(clock: FakeClock) -> None:
+    ctl = BudgetController(budget=2.0, relax_after=2)
+    ctl.policy_for(PID, BASE)
+
+    levels = []
+    for _ in range(8):
+        change = _step(ctl, clock, 0.1)
+        if change is not None:
+            levels.append(change.new_level)
+
+    assert levels == [LEVEL_THROTTLED, LEVEL_IDLE]
+    assert ctl.level(PID) == LEVEL_IDLE
+
+
+def test_usage_between_thresholds_resets_the_streak(clock: FakeClock) -> None:
+    ctl = BudgetController(budget=2.0, relax_after=2)
+    ctl.policy_for(PID, BASE)
+
+    assert _step(ctl, clock, 0.1) is None
+    # Under budget but not "well below" it (relax_ratio 0.5).
+    assert _step(ctl, clock, 1.5) is None
+    assert _step(ctl, clock, 0.1) is None
+    assert ctl.level(PID) == LEVEL_PINNED
+
+
+def test_relaxing_the_pin_avoids_reserved_cpus(clock: FakeClock) -> None:
+    ctl = BudgetController(budget=2.0, relax_after=1)
+    ctl.reserve(frozenset({0, 1, 2, 3}))
+    ctl.policy_for(PID, BASE)
+
+    change = _step(ctl, clock, 0.1)
+
+    assert change is not None and change.new_level == LEVEL_THROTTLED
+    assert change.policy.steps() == [STEP_AFFINITY]
+    assert change.policy.affinity == (4, 5, 6, 7)
+    # Drift checks keep the relaxed target off the game's cores as well.
+    assert ctl.current_policy(PID, BASE).affinity == (4, 5, 6, 7)
+
+    ctl.reserve(frozenset())
+    assert ctl.current_policy(PID, BASE).affinity == tuple(range(8))
+
+
+def test_unsupported_steps_are_skipped(clock: FakeClock) -> None:
+    # Linux: no power throttling, and no cap without cgroup v2.
+    ctl = BudgetController(budget=2.0, supported_steps=(STEP_PRIORITY, STEP_AFFINITY), relax_after=1)
+    ctl.policy_for(PID, BASE)
+
+    assert ctl.max_level == LEVEL_PINNED
+    assert _step(ctl, clock, 10.0) is None
+    change = _step(ctl, clock, 0.1)
+
+    assert change is not None and change.new_level == LEVEL_IDLE
+    assert change.policy.power_throttling is None
+    assert change.policy.cpu_cap is None
+
+
+def test_min_level_normal_restores_priority(clock: FakeClock) -> None:
+    ctl = BudgetController(budget=2.0, min_level=LEVEL_NORMAL, start_level=LEVEL_IDLE, relax_after=1)
+    ctl.policy_for(PID, BASE)
+
+    change = _step(ctl, clock, 0.1)
+
+    assert change is not None and change.new_level == LEVEL_NORMAL
+    assert change.policy.steps() == [STEP_PRIORITY]
@@ -0,0 +1,131 @@
+"""GuiEvents coalescing, row diffs, sticky replay and the waker."""
+
+from __future__ import annotations
+
+from antiace.events import Control, CpuInfo, GuiEvents, Progress, Status, WegameState
+
+
+class Waker:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self) -> None:
+        self.calls += 1
+
+
+def test_idle_drain_returns_none() -> None:
+    assert GuiEvents().drain() is None
+
+
+def test_keyed_events_coalesce_and_controls_do_not() -> None:
+    events = GuiEvents()
+    for i in range(10):
+        events.put(Status("processing", ("SGuard64.exe", i)))
+    events.put(Control("show"))
+    events.put(Progress(1, 2))
+    events.put(Control("hide"))
+    events.put(Progress(2, 2))
+
+    batch = events.drain()
+
+    assert batch is not None
+    # A replaced event moves to the end: the order is that of the latest puts.
+    assert batch.events == [Status("processing", ("SGuard64.exe", 9)), Control("show"), Control("hide"), Progress(2, 2)]
+    assert events.stats()["coalesced"] == 10
+    assert events.drain() is None
+
+
+def test_rows_are_diffed_between_batches() -> None:
+    events = GuiEvents()
+    events.update_row(11, "SGuard64.exe", True, "ok", True, "ok")
+    events.update_row(12, "SGuardSvc64.exe", True, "ok", False, "denied")
+
+    first = events.drain()
+    assert first is not None and sorted(first.rows) == [11, 12]
+
+    # Same values again: nothing to redraw.
+    events.update_row(11, "SGuard64.exe", True, "ok", True, "ok")
+    assert events.drain() is None
+
+    events.update_row_details(12, io=[1, 2, 3, 4])
+    events.remove_row(11)
+    second = events.drain()
+
+    assert second is not None
+    assert list(second.rows) == [12] and second.rows[12].io == (1, 2, 3, 4)
+    assert second.removed == [11]
+    assert set(events.rows()) == {12}
+
+
+def test_details_for_unknown_rows_are_ignored() -> None:
+    events = GuiEvents()
+    events.update_row_details(99, mem=(1, 2, 3, 4))
+
+    assert events.drain() is None
+
+
+def test_an_updated_removed_row_comes_back_as_a_row() -> None:
+    events = GuiEvents()
+    events.update_row(11, "SGuard64.exe", True, "ok", True, "ok")
+    events.drain()
+
+    events.remove_row(11)
+    events.update_row(11, "SGuard64.exe", True, "ok", True, "ok")
+    batch = events.drain()
+
+    assert batch is not None and list(batch.rows) == [11] and batch.removed == []
+
+
+def test_resync_replays_sticky_events_and_every_row() -> None:
+    events = GuiEvents()
+    events.put(CpuInfo(8, (7,)))
+    events.put(WegameState("starting"))
+    events.put(WegameState("running"))
+    events.put(Status("done"))
+    events.update_row(11, "SGuard64.exe", True, "ok", True, "ok")
+    events.drain()
+
+    events.resync()
+    batch = events.drain()
+
+    assert batch is not None
+    # Only the latest sticky event of each kind; Status is news, not state.
+    assert batch.events == [CpuInfo(8, (7,)), WegameState("running")]
+    assert list(batch.rows) == [11]
+    assert events.snapshot()["wegame"] == "running"
+    assert events.snapshot()["guard_cpus"] == [7]
+
+
+def test_waker_fires_once_until_the_next_drain() -> None:
+    events = GuiEvents()
+    wake = Waker()
+    events.set_waker(wake)
+
+    events.put(Status("scanning"))
+    events.update_row(11, "SGuard64.exe", True, "ok", True, "ok")
+    events.put(Progress(1, 1))
+    assert wake.calls == 1
+
+    events.drain()
+    events.put(Status("done"))
+    assert wake.calls == 2
+
+
+def test_hidden_window_is_woken_by_controls_only() -> None:
+    events = GuiEvents()
+    wake = Waker()
+    events.set_waker(wake, controls_only=True)
+
+    events.put(Status("scanning"))
+    events.update_row(11, "SGuard64.exe", True, "ok", True, "ok")
+    assert wake.calls == 0
+
+    events.put(Control("show"))
+    assert wake.calls == 1
+    assert events.take_controls() == [Control("show")]
+
+    # Shown again: what piled up while hidden is pending, so it wakes straight away.
+    events.set_waker(wake)
+    assert wake.calls == 2
+    batch = events.drain()
+    assert batch is not None and batch.events == [Status("scanning")] and list(batch.rows) == [11]
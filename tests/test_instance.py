@@ -0,0 +1,115 @@
+"""Control channel line protocol and the Unix socket server."""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import time
+from pathlib import Path
+
+import pytest
+
+from antiace import instance
+from antiace.instance import MAX_MESSAGE, SocketControlServer, _read_line, _respond
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="Unix socket server")
+
+
+def _chunks(*parts: bytes):
+    pending = list(parts)
+
+    def recv(_n: int) -> bytes:
+        return pending.pop(0) if pending else b""
+
+    return recv
+
+
+def test_read_line_stops_at_the_first_newline() -> None:
+    assert _read_line(_chunks(b'{"cmd":', b' "ping"}\n{"cmd": "show"}\n')) == b'{"cmd": "ping"}'
+
+
+def test_read_line_returns_what_arrived_before_eof() -> None:
+    assert _read_line(_chunks(b'{"cmd": "ping"}')) == b'{"cmd": "ping"}'
+
+
+def test_read_line_refuses_oversize_messages() -> None:
+    recv = _chunks(*([b"x" * 4096] * (MAX_MESSAGE // 4096 + 2)))
+    with pytest.raises(ValueError):
+        _read_line(recv)
+
+
+def test_respond_wraps_the_handler_answer() -> None:
+    out = _respond(lambda req: {"ok": True, "echo": req["cmd"]}, b'{"cmd": "status"}')
+
+    assert out.endswith(b"\n")
+    assert json.loads(out) == {"ok": True, "echo": "status"}
+
+
+@pytest.mark.parametrize(
+    ("data", "error"),
+    [
+        (b"not json", "JSONDecodeError"),
+        (b"[1, 2]", "ValueError"),
+    ],
+)
+def test_respond_reports_bad_requests(data: bytes, error: str) -> None:
+    response = json.loads(_respond(lambda req: {"ok": True}, data))
+
+    assert response["ok"] is False
+    assert response["error"].startswith(error)
+
+
+def test_respond_reports_handler_errors() -> None:
+    def handler(_req: dict) -> dict:
+        raise RuntimeError("boom")
+
+    assert json.loads(_respond(handler, b"{}")) == {"ok": False, "error": "RuntimeError: boom"}
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch):
+    # AF_UNIX paths are limited to ~100 bytes, which pytest's tmp_path can exceed.
+    path = Path(f"/tmp/antiace-test-{os.getpid()}.sock")
+    monkeypatch.setattr(instance, "socket_path", lambda: path)
+    srv = SocketControlServer(lambda req: {"ok": True, "cmd": req.get("cmd")})
+    srv.io_timeout = 0.3
+    srv.start()
+    yield srv, path
+    srv.stop()
+
+
+def test_socket_server_answers_requests(server) -> None:
+    _srv, path = server
+
+    assert instance.request({"cmd": "status"}) == {"ok": True, "cmd": "status"}
+    assert path.exists() and (path.stat().st_mode & 0o777) == 0o600
+
+
+def _closed_by_peer(sock: socket.socket) -> bool:
+    try:
+        return sock.recv(1, socket.MSG_DONTWAIT | socket.MSG_PEEK) == b""
+    except BlockingIOError:
+        return False
+    except OSError:
+        return True
+
+
+def test_socket_server_drops_a_trickling_client(server) -> None:
+    _srv, path = server
+    started = time.monotonic()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as slow:
+        slow.connect(str(path))
+        # One byte per 0.1 s never hits a per-recv timeout; only the per-client deadline ends it.
+        for _ in range(30):
+            if _closed_by_peer(slow):
+                break
+            try:
+                slow.sendall(b"x")
+            except OSError:
+                break
+            time.sleep(0.1)
+        dropped_after = time.monotonic() - started
+
+    assert dropped_after < 1.5
+    assert instance.request({"cmd": "ping"}, timeout=1.0) == {"ok": True, "cmd": "ping"}
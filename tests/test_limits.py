@@ -0,0 +1,146 @@
+"""CgroupLimiter against a fake cgroup v2 tree in a temporary directory."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from antiace.limits import CPU_MAX_PERIOD, CgroupLimiter
+
+PID = 4321
+ORIGINAL = "/user.slice/user-1000.slice/session-2.scope"
+
+
+@pytest.fixture
+def fake_tree(tmp_path: Path) -> tuple[Path, Path]:
+    root = tmp_path / "cgroup"
+    root.mkdir()
+    (root / "cgroup.controllers").write_text("cpuset cpu io memory pids\n", encoding="ascii")
+    (root / "cgroup.subtree_control").write_text("", encoding="ascii")
+    original = root / ORIGINAL.lstrip("/")
+    original.mkdir(parents=True)
+    (original / "cgroup.procs").write_text("", encoding="ascii")
+
+    proc = tmp_path / "proc"
+    (proc / str(PID)).mkdir(parents=True)
+    (proc / str(PID) / "cgroup").write_text(f"0::{ORIGINAL}\n", encoding="utf-8")
+    return root, proc
+
+
+def _limiter(tree: tuple[Path, Path]) -> CgroupLimiter:
+    root, proc = tree
+    return CgroupLimiter(root, proc_root=proc, sys_root=root.parent / "sys")
+
+
+@pytest.mark.parametrize(
+    ("cap", "expected"),
+    [
+        (5, f"5000 {CPU_MAX_PERIOD}"),
+        (50.5, f"50500 {CPU_MAX_PERIOD}"),
+        (200, f"200000 {CPU_MAX_PERIOD}"),
+        # Below the kernel's 1 ms minimum quota.
+        (0.1, f"1000 {CPU_MAX_PERIOD}"),
+        (0, f"max {CPU_MAX_PERIOD}"),
+        (-1, f"max {CPU_MAX_PERIOD}"),
+    ],
+)
+def test_cpu_max_format(cap: float, expected: str) -> None:
+    assert CgroupLimiter._cpu_max(cap) == expected
+
+
+def test_available(fake_tree: tuple[Path, Path]) -> None:
+    limiter = _limiter(fake_tree)
+    assert limiter.available()
+    assert limiter.memory_available()
+    # No /sys/class/block in the fake tree: nothing to put io.max on.
+    assert not limiter.io_available()
+
+
+def test_apply_moves_target_into_managed_group(fake_tree: tuple[Path, Path]) -> None:
+    root, _proc = fake_tree
+    limiter = _limiter(fake_tree)
+
+    ok, msg = limiter.apply(PID, "SGuard64.exe", 5)
+
+    assert ok, msg
+    group = root / "antiace" / f"SGuard64.exe-{PID}"
+    assert (group / "cgroup.procs").read_text(encoding="ascii") == str(PID)
+    assert (group / "cpu.max").read_text(encoding="ascii") == f"5000 {CPU_MAX_PERIOD}"
+    assert (root / "antiace" / "cgroup.subtree_control").exists()
+    assert limiter.check(PID, 5) is True
+    assert limiter.check(PID, 10) is False
+
+
+def test_apply_sanitizes_group_name(fake_tree: tuple[Path, Path]) -> None:
+    root, _proc = fake_tree
+    limiter = _limiter(fake_tree)
+
+    ok, _msg = limiter.apply(PID, "bad name/with:chars", 5)
+
+    assert ok
+    assert (root / "antiace" / f"bad_name_with_chars-{PID}" / "cpu.max").exists()
+
+
+def test_cap_zero_lifts_limit(fake_tree: tuple[Path, Path]) -> None:
+    root, _proc = fake_tree
+    limiter = _limiter(fake_tree)
+    limiter.apply(PID, "SGuard64.exe", 5)
+
+    ok, msg = limiter.apply(PID, "SGuard64.exe", 0)
+
+    assert ok and msg == "cpu_cap=off"
+    group = root / "antiace" / f"SGuard64.exe-{PID}"
+    assert (group / "cpu.max").read_text(encoding="ascii") == f"max {CPU_MAX_PERIOD}"
+
+
+def test_release_moves_target_back(fake_tree: tuple[Path, Path]) -> None:
+    root, _proc = fake_tree
+    limiter = _limiter(fake_tree)
+    limiter.apply(PID, "SGuard64.exe", 5)
+
+    limiter.release(PID)
+
+    assert (root / ORIGINAL.lstrip("/") / "cgroup.procs").read_text(encoding="ascii") == str(PID)
+    assert limiter.check(PID, 5) is False
+
+
+def test_release_leaves_reused_pid_alone(fake_tree: tuple[Path, Path]) -> None:
+    root, _proc = fake_tree
+    limiter = _limiter(fake_tree)
+    limiter.apply(PID, "SGuard64.exe", 5)
+    # The target exited: the kernel empties the managed group, and the pid may be reused elsewhere.
+    (root / "antiace" / f"SGuard64.exe-{PID}" / "cgroup.procs").write_text("", encoding="ascii")
+
+    limiter.release(PID)
+
+    assert (root / ORIGINAL.lstrip("/") / "cgroup.procs").read_text(encoding="ascii") == ""
+
+
+def test_release_all(fake_tree: tuple[Path, Path]) -> None:
+    root, proc = fake_tree
+    other = PID + 1
+    (proc / str(other)).mkdir()
+    (proc / str(other) / "cgroup").write_text(f"0::{ORIGINAL}\n", encoding="utf-8")
+    limiter = _limiter(fake_tree)
+    limiter.apply(PID, "SGuard64.exe", 5)
+    limiter.apply(other, "SGuardSvc64.exe", 5)
+
+    limiter.release_all()
+
+    assert limiter.check(PID, 5) is False
+    assert limiter.check(other, 5) is False
+    # A fake cgroup.procs keeps the last write; both were moved back.
+    assert (root / ORIGINAL.lstrip("/") / "cgroup.procs").read_text(encoding="ascii") in (str(PID), str(other))
+
+
+def test_memory_high(fake_tree: tuple[Path, Path]) -> None:
+    root, _proc = fake_tree
+    limiter = _limiter(fake_tree)
+
+    ok, msg = limiter.apply_memory(PID, "SGuard64.exe", 256 * 1024 * 1024)
+
+    assert ok and msg == "memory_high=256MiB"
+    group = root / "antiace" / f"SGuard64.exe-{PID}"
+    assert (group / "memory.high").read_text(encoding="ascii") == str(256 * 1024 * 1024)
+    assert limiter.check_memory(PID, 256 * 1024 * 1024) is True
@@ -0,0 +1,140 @@
+"""Optimizer drift handling against a fake backend and clock."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from antiace import optimizer as optimizer_module
+from antiace.backend import PlatformBackend
+from antiace.limits import CpuLimiter
+from antiace.optimizer import Optimizer
+from antiace.policy import (
+    PRIORITY_IDLE,
+    STEP_AFFINITY,
+    STEP_POWER_THROTTLING,
+    STEP_PRIORITY,
+    ApplyResult,
+    Policy,
+)
+
+PID = 4321
+POLICY = Policy(priority=PRIORITY_IDLE, power_throttling=True, affinity=(7,))
+
+
+class FakeBackend(PlatformBackend):
+    name = "fake"
+    _native_steps = (STEP_PRIORITY, STEP_POWER_THROTTLING, STEP_AFFINITY)
+
+    def __init__(self) -> None:
+        super().__init__(CpuLimiter())
+        self.applied: list[list[str]] = []
+        self.drifted: list[str] = []
+        self.denied: set[str] = set()
+        self.readable = True
+
+    def _apply(self, pid: int, policy: Policy) -> ApplyResult:
+        self.applied.append(policy.steps())
+        result = ApplyResult(pid)
+        for step in policy.steps():
+            result.add(step, step not in self.denied, "access denied" if step in self.denied else step)
+        return result
+
+    def _detect(self, pid: int, policy: Policy, skip_threads: frozenset[int]) -> tuple[bool, list[str] | str]:
+        if not self.readable:
+            return False, "access denied"
+        return True, [step for step in self.drifted if step in policy.steps()]
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    fake = SimpleNamespace(now=1000.0)
+    fake.time = lambda: fake.now
+    fake.perf_counter = lambda: fake.now
+    monkeypatch.setattr(optimizer_module, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def backend() -> FakeBackend:
+    return FakeBackend()
+
+
+@pytest.fixture
+def optimizer(backend: FakeBackend) -> Optimizer:
+    return Optimizer(reapply_after_seconds=300, verify_after_seconds=5, policy=POLICY, backend=backend)
+
+
+def test_first_apply_writes_the_whole_policy(clock, backend: FakeBackend, optimizer: Optimizer) -> None:
+    did_apply, ok_eff, _msg_eff, ok_aff, _msg_aff = optimizer.optimize_pid(PID)
+
+    assert did_apply and ok_eff and ok_aff
+    assert backend.applied == [[STEP_PRIORITY, STEP_POWER_THROTTLING, STEP_AFFINITY]]
+
+
+def test_nothing_is_written_while_in_policy(clock, backend: FakeBackend, optimizer: Optimizer) -> None:
+    optimizer.optimize_pid(PID)
+
+    clock.now += 1
+    assert optimizer.optimize_pid(PID)[0] is False
+    clock.now += 5
+    assert optimizer.optimize_pid(PID)[0] is False
+    clock.now += 600
+    assert optimizer.optimize_pid(PID)[0] is False
+
+    assert len(backend.applied) == 1
+
+
+def test_only_drifted_steps_are_rewritten(clock, backend: FakeBackend, optimizer: Optimizer) -> None:
+    optimizer.optimize_pid(PID)
+    backend.drifted = [STEP_AFFINITY]
+
+    clock.now += 5
+    did_apply, _ok_eff, msg_eff, ok_aff, msg_aff = optimizer.optimize_pid(PID)
+
+    assert did_apply and ok_aff
+    assert backend.applied[-1] == [STEP_AFFINITY]
+    assert msg_eff == "unchanged"
+    assert msg_aff.startswith("drift corrected: ")
+
+    backend.drifted = []
+    clock.now += 5
+    assert optimizer.check_drift() == []
+    assert len(backend.applied) == 2
+
+
+def test_failed_steps_are_retried_on_the_reapply_cadence(clock, backend: FakeBackend, optimizer: Optimizer) -> None:
+    backend.denied = {STEP_PRIORITY}
+    ok_eff = optimizer.optimize_pid(PID)[1]
+    assert not ok_eff
+    # The write was refused, so the state keeps reading as drifted.
+    backend.drifted = [STEP_PRIORITY]
+
+    for _ in range(10):
+        clock.now += 5
+        assert optimizer.optimize_pid(PID)[0] is False
+    assert len(backend.applied) == 1
+
+    clock.now += 300
+    assert optimizer.optimize_pid(PID)[0] is True
+    assert backend.applied[-1] == [STEP_PRIORITY]
+
+
+def test_unreadable_state_falls_back_to_blind_reapply(clock, backend: FakeBackend, optimizer: Optimizer) -> None:
+    optimizer.optimize_pid(PID)
+    backend.readable = False
+
+    clock.now += 5
+    assert optimizer.optimize_pid(PID)[0] is False
+    clock.now += 300
+    assert optimizer.optimize_pid(PID)[0] is True
+    assert backend.applied[-1] == [STEP_PRIORITY, STEP_POWER_THROTTLING, STEP_AFFINITY]
+
+
+def test_forget_starts_over(clock, backend: FakeBackend, optimizer: Optimizer) -> None:
+    optimizer.optimize_pid(PID)
+    optimizer.forget(PID)
+
+    assert optimizer.optimize_pid(PID)[0] is True
+    assert len(backend.applied) == 2
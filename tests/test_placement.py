@@ -0,0 +1,133 @@
+"""DynamicPlacer hysteresis and dwell, and the LoadSampler window, against fake CPU loads."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from antiace import placement
+from antiace.placement import DynamicPlacer, LoadSampler
+
+
+@pytest.fixture
+def cpus(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """Fake per-CPU loads and clock; `loads` is what the next cpu_percent() returns."""
+    fake = SimpleNamespace(now=1000.0, loads=[0.0, 0.0, 0.0, 0.0])
+    monkeypatch.setattr(placement.psutil, "cpu_percent", lambda percpu=False: list(fake.loads))
+    monkeypatch.setattr(placement, "time", SimpleNamespace(time=lambda: fake.now))
+    return fake
+
+
+def _feed(placer: DynamicPlacer, cpus: SimpleNamespace, loads: list[float], *, samples: int, every: float = 5.0) -> None:
+    cpus.loads = loads
+    for _ in range(samples):
+        cpus.now += every
+        placer.sample()
+
+
+def test_sampler_weights_samples_by_the_time_they_cover(cpus: SimpleNamespace) -> None:
+    sampler = LoadSampler(window=30.0)
+
+    cpus.now += 1
+    cpus.loads = [100.0, 0.0]
+    sampler.sample(cpus.now)
+    cpus.now += 3
+    cpus.loads = [0.0, 100.0]
+    sampler.sample(cpus.now)
+
+    assert sampler.average() == [25.0, 75.0]
+
+
+def test_sampler_keeps_min_samples_past_the_window(cpus: SimpleNamespace) -> None:
+    sampler = LoadSampler(window=10.0, min_samples=3)
+
+    for _ in range(5):
+        cpus.now += 60
+        sampler.sample(cpus.now)
+
+    # Samples a minute apart are all older than the window, but three are kept.
+    assert len(sampler) == 3
+
+
+def test_no_move_before_min_samples(cpus: SimpleNamespace) -> None:
+    placer = DynamicPlacer((3,), min_samples=3, hysteresis=20.0, min_dwell=0.0)
+
+    _feed(placer, cpus, [0.0, 0.0, 0.0, 90.0], samples=2)
+    assert placer.choose(cpus.now) is None
+
+    _feed(placer, cpus, [0.0, 0.0, 0.0, 90.0], samples=1)
+    decision = placer.choose(cpus.now)
+    assert decision is not None
+    # Ties go to the higher index, away from CPU 0.
+    assert (decision.from_cpus, decision.to_cpus) == ((3,), (2,))
+    assert (decision.from_load, decision.to_load) == (90.0, 0.0)
+
+
+def test_hysteresis_ignores_small_differences(cpus: SimpleNamespace) -> None:
+    placer = DynamicPlacer((3,), min_samples=1, hysteresis=20.0, min_dwell=0.0)
+
+    _feed(placer, cpus, [10.0, 10.0, 10.0, 29.0], samples=3)
+    assert placer.choose(cpus.now) is None
+
+    _feed(placer, cpus, [10.0, 10.0, 10.0, 31.0], samples=30)
+    decision = placer.choose(cpus.now)
+    assert decision is not None and decision.to_cpus == (2,)
+
+
+def test_min_dwell_holds_after_a_move(cpus: SimpleNamespace) -> None:
+    placer = DynamicPlacer((3,), window=10.0, min_samples=1, hysteresis=20.0, min_dwell=60.0)
+
+    _feed(placer, cpus, [0.0, 0.0, 0.0, 90.0], samples=2)
+    decision = placer.choose(cpus.now)
+    assert decision is not None
+    placer.commit(decision, targets=1, apply_seconds=0.001)
+    assert placer.current == (2,)
+
+    # The new CPU gets busy straight away: stay for min_dwell anyway.
+    _feed(placer, cpus, [0.0, 0.0, 90.0, 0.0], samples=11)
+    assert placer.choose(cpus.now) is None
+
+    _feed(placer, cpus, [0.0, 0.0, 90.0, 0.0], samples=1)
+    decision = placer.choose(cpus.now)
+    assert decision is not None and decision.to_cpus == (3,)
+
+
+def test_reset_restarts_the_dwell_and_excludes_reserved_cpus(cpus: SimpleNamespace) -> None:
+    placer = DynamicPlacer((3,), min_samples=1, hysteresis=20.0, min_dwell=60.0)
+    _feed(placer, cpus, [50.0, 0.0, 0.0, 90.0], samples=2)
+
+    placer.reset((3,), reserved=frozenset({1, 2}))
+    assert placer.choose(cpus.now) is None
+
+    cpus.now += 60
+    decision = placer.choose(cpus.now)
+    assert decision is not None and decision.to_cpus == (0,)
+
+
+def test_multi_cpu_pins_keep_their_width(cpus: SimpleNamespace) -> None:
+    placer = DynamicPlacer((2, 3), eligible=(0, 1, 2, 3), min_samples=1, hysteresis=20.0, min_dwell=0.0)
+
+    _feed(placer, cpus, [0.0, 10.0, 80.0, 60.0], samples=2)
+    decision = placer.choose(cpus.now)
+
+    assert decision is not None
+    assert decision.to_cpus == (0, 1)
+    assert (decision.from_load, decision.to_load) == (70.0, 5.0)
+
+
+def test_commit_logs_decisions_and_stats_track_the_pin(cpus: SimpleNamespace, tmp_path: Path) -> None:
+    log = tmp_path / "placement.jsonl"
+    placer = DynamicPlacer((3,), min_samples=1, hysteresis=20.0, min_dwell=0.0, log_path=log)
+
+    _feed(placer, cpus, [0.0, 20.0, 40.0, 90.0], samples=2)
+    decision = placer.choose(cpus.now)
+    assert decision is not None
+    placer.commit(decision, targets=2, apply_seconds=0.0042)
+
+    assert [d.to_cpus for d in placer.decisions] == [(0,)]
+    logged = json.loads(log.read_text(encoding="utf-8"))
+    assert logged["to_cpus"] == [0] and logged["targets"] == 2
+    assert placer.stats() == {"migrations": 1, "samples": 2, "placed_load_avg": 90.0, "idlest_load_avg": 0.0}
@@ -0,0 +1,196 @@
+"""Shared process snapshots, and ProcessTracker against a fake process table."""
+
+from __future__ import annotations
+
+import contextlib
+
+import psutil
+import pytest
+
+from antiace import processes
+from antiace.processes import ProcessSnapshot, ProcessTracker
+
+
+class FakeTable:
+    """pid -> (create_time, name, ppid), with a count of create_time reads."""
+
+    def __init__(self) -> None:
+        self.procs: dict[int, tuple[float, str, int]] = {}
+        self.reads: dict[int, int] = {}
+
+    def process(self, pid: int) -> FakeProcess:
+        if pid not in self.procs:
+            raise psutil.NoSuchProcess(pid)
+        return FakeProcess(self, pid)
+
+
+class FakeProcess:
+    def __init__(self, table: FakeTable, pid: int):
+        self._table = table
+        self._pid = pid
+
+    def _entry(self) -> tuple[float, str, int]:
+        try:
+            return self._table.procs[self._pid]
+        except KeyError:
+            raise psutil.NoSuchProcess(self._pid) from None
+
+    def create_time(self) -> float:
+        self._table.reads[self._pid] = self._table.reads.get(self._pid, 0) + 1
+        return self._entry()[0]
+
+    def name(self) -> str:
+        return self._entry()[1]
+
+    def ppid(self) -> int:
+        return self._entry()[2]
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+
+@pytest.fixture
+def table(monkeypatch: pytest.MonkeyPatch) -> FakeTable:
+    fake = FakeTable()
+    monkeypatch.setattr(processes.psutil, "pids", lambda: list(fake.procs))
+    monkeypatch.setattr(processes.psutil, "Process", fake.process)
+    monkeypatch.setattr(ProcessTracker, "_bulk_parents", staticmethod(lambda: None))
+    return fake
+
+
+def test_refresh_reads_new_pids_once(table: FakeTable) -> None:
+    table.procs = {10: (100.0, "wegame.exe", 1), 11: (101.0, "SGuard64.exe", 10)}
+    tracker = ProcessTracker(verify_batch=0)
+
+    snap = tracker.refresh()
+    table.reads.clear()
+    snap = tracker.refresh()
+
+    assert snap.find(["sguard64.exe"]) == [("SGuard64.exe", 11)]
+    assert snap.parent(11) == 10
+    assert snap.create_time(11) == 101.0
+    # Steady state: nothing new, nothing tracked, no rotation.
+    assert table.reads == {}
+
+
+def test_exited_pid_is_dropped(table: FakeTable) -> None:
+    table.procs = {10: (100.0, "wegame.exe", 1)}
+    tracker = ProcessTracker(verify_batch=0)
+    tracker.refresh()
+
+    del table.procs[10]
+    snap = tracker.refresh()
+
+    assert not snap.is_running("wegame.exe")
+    assert len(tracker) == 0
+
+
+def test_tracked_pid_reuse_is_detected_every_refresh(table: FakeTable) -> None:
+    table.procs = {10: (100.0, "SGuard64.exe", 1)}
+    tracker = ProcessTracker(verify_batch=0)
+    tracker.refresh()
+    tracker.track(10)
+
+    # The target exited and its PID was reused between two listings.
+    table.procs[10] = (200.0, "notepad.exe", 1)
+    snap = tracker.refresh()
+
+    assert snap.find(["sguard64.exe"]) == []
+    assert snap.find(["notepad.exe"]) == [("notepad.exe", 10)]
+    assert snap.create_time(10) == 200.0
+
+
+def test_untracked_reuse_is_caught_by_the_rotation(table: FakeTable) -> None:
+    table.procs = {pid: (100.0, f"p{pid}", 1) for pid in range(10, 20)}
+    tracker = ProcessTracker(verify_batch=3)
+    tracker.refresh()
+    table.procs[15] = (200.0, "SGuard64.exe", 1)
+
+    # 10 entries, 3 per refresh: every PID is re-validated within 4 refreshes.
+    seen = False
+    for _ in range(4):
+        table.reads.clear()
+        snap = tracker.refresh()
+        # A rotation slice plus the re-read of a reused PID, never the whole table.
+        assert sum(table.reads.values()) <= 4
+        seen = seen or snap.is_running("sguard64.exe")
+    assert seen
+
+
+def test_forget_evicts_untracked_reuse(table: FakeTable) -> None:
+    table.procs = {10: (100.0, "helper.exe", 1)}
+    tracker = ProcessTracker(verify_batch=0)
+    tracker.refresh()
+
+    table.procs[10] = (200.0, "SGuard64.exe", 1)
+    assert not tracker.refresh().is_running("sguard64.exe")
+    # The exit waiter reported helper.exe's exit.
+    tracker.forget(10)
+
+    assert tracker.refresh().find(["sguard64.exe"]) == [("SGuard64.exe", 10)]
+
+
+def test_lookup_refresh_rereads_a_known_pid(table: FakeTable) -> None:
+    table.procs = {10: (100.0, "bash", 1)}
+    tracker = ProcessTracker(verify_batch=0)
+    assert tracker.lookup(10) == ("bash", 100.0)
+
+    # exec: same PID, new name.
+    table.procs[10] = (100.0, "SGuard64.exe", 1)
+
+    assert tracker.lookup(10) == ("bash", 100.0)
+    assert tracker.lookup(10, refresh=True) == ("SGuard64.exe", 100.0)
+
+
+def test_descendants_skip_reused_parent_links() -> None:
+    snap = ProcessSnapshot(
+        [("game.exe", 10), ("child.exe", 11), ("grandchild.exe", 12), ("stale.exe", 13)],
+        create_times={10: 100.0, 11: 101.0, 12: 102.0, 13: 50.0},
+        parents={11: 10, 12: 11, 13: 10},
+    )
+
+    # 13 names 10 as parent but predates it: the link is to an earlier process.
+    assert snap.descendants({10}) == [11, 12]
+
+
+def test_snapshot_lookups_ignore_case() -> None:
+    snap = ProcessSnapshot([("SGuard64.exe", 30), ("sguard64.EXE", 20), ("wegame.exe", 10)])
+
+    assert len(snap) == 3
+    assert snap.pids("SGUARD64.exe") == [30, 20]
+    assert snap.find(["sguard64.exe", "WeGame.exe"]) == [
+        ("wegame.exe", 10),
+        ("sguard64.EXE", 20),
+        ("SGuard64.exe", 30),
+    ]
+    assert snap.is_running("WEGAME.EXE")
+    assert not snap.is_running("SGuardSvc64.exe")
+    assert sorted(snap.names()) == ["sguard64.exe", "wegame.exe"]
+    assert snap.name(20) == "sguard64.EXE"
+    assert processes.search_process(["sguard64.exe"], snapshot=snap) == [("sguard64.EXE", 20), ("SGuard64.exe", 30)]
+
+
+def test_get_snapshot_is_shared_within_max_age(monkeypatch: pytest.MonkeyPatch) -> None:
+    refreshes: list[ProcessSnapshot] = []
+
+    def refresh() -> ProcessSnapshot:
+        snap = ProcessSnapshot([("wegame.exe", 10)])
+        refreshes.append(snap)
+        return snap
+
+    monkeypatch.setattr(processes, "_last_snapshot", None)
+    monkeypatch.setattr(processes._tracker, "refresh", refresh)
+
+    # The monitor forces one refresh per tick; other callers in that tick reuse it.
+    first = processes.get_snapshot(max_age=0)
+    assert processes.get_snapshot() is first
+    assert processes.search_process(["wegame.exe"]) == [("wegame.exe", 10)]
+    assert len(refreshes) == 1
+
+    assert processes.get_snapshot(max_age=0) is not first
+    assert len(refreshes) == 2
+
+    # An old snapshot is replaced on the next ordinary call.
+    monkeypatch.setattr(processes._last_snapshot, "taken_at", processes._last_snapshot.taken_at - 10)
+    processes.get_snapshot(max_age=2.0)
+    assert len(refreshes) == 3
@@ -0,0 +1,184 @@
+"""Rule parsing and RuleSet matching against fake process details."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import psutil
+import pytest
+
+from antiace import rules as rules_module
+from antiace.processes import ProcessSnapshot
+from antiace.rules import Rule, RulePolicy, RuleSet, load_rules, parse_rule
+from antiace.wegame import GUARD_PROCESSES
+
+TENCENT = "C:\\Program Files\\Tencent\\ACE\\SGuard64.exe"
+
+
+class FakeProcesses:
+    """pid -> (exe, cmdline, ppid); `reads` counts detail reads per pid."""
+
+    def __init__(self) -> None:
+        self.procs: dict[int, tuple[str, list[str], int]] = {}
+        self.names: dict[int, str] = {}
+        self.reads: dict[int, int] = {}
+
+    def process(self, pid: int) -> SimpleNamespace:
+        if pid not in self.procs:
+            raise psutil.NoSuchProcess(pid)
+        exe, cmdline, ppid = self.procs[pid]
+
+        def read(value):
+            def get():
+                self.reads[pid] = self.reads.get(pid, 0) + 1
+                return value
+
+            return get
+
+        return SimpleNamespace(exe=read(exe), cmdline=read(cmdline), ppid=read(ppid))
+
+    def lookup(self, pid: int, refresh: bool = False) -> tuple[str, float] | None:
+        return (self.names[pid], 0.0) if pid in self.names else None
+
+
+@pytest.fixture
+def procs(monkeypatch: pytest.MonkeyPatch) -> FakeProcesses:
+    fake = FakeProcesses()
+    monkeypatch.setattr(rules_module.psutil, "Process", fake.process)
+    monkeypatch.setattr(rules_module, "get_tracker", lambda: fake)
+    return fake
+
+
+def _rules(*entries: dict) -> RuleSet:
+    parsed = [parse_rule(entry) for entry in entries]
+    assert None not in parsed
+    return RuleSet(parsed)
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        "SGuard64.exe",
+        {"name": "  "},
+        {"name": "a.exe", "exe": ""},
+        {"name": "a.exe", "cmdline": "("},
+        {"name": "a.exe", "policy": {"priority": "realtime"}},
+        {"name": "a.exe", "policy": {"pin": "no"}},
+        {"name": "a.exe", "policy": {"cpu_cap": 0}},
+        {"name": "a.exe", "policy": {"io_max": [1, -1]}},
+        {"name": "a.exe", "policy": {"memory_high": True}},
+    ],
+)
+def test_invalid_rules_are_rejected(entry: object) -> None:
+    assert parse_rule(entry) is None
+
+
+def test_valid_rule_is_parsed() -> None:
+    rule = parse_rule(
+        {"name": " SGuard64.exe ", "parent": "wegame.exe", "policy": {"cpu_cap": 5, "io_max": [100, 200], "pin": False}}
+    )
+
+    assert rule == Rule(
+        name="SGuard64.exe",
+        parent="wegame.exe",
+        policy=RulePolicy(pin=False, cpu_cap=5.0, io_max=(100, 200)),
+    )
+    assert rule.needs_details and rule.policy.has_limits
+
+
+def test_load_rules_falls_back_to_the_guard_names() -> None:
+    ruleset = load_rules([{"name": ""}])
+
+    assert ruleset.names() == list(GUARD_PROCESSES)
+    assert load_rules([{"name": "a.exe"}]).names() == ["a.exe"]
+
+
+def test_names_match_case_insensitively_with_wildcards(procs: FakeProcesses) -> None:
+    ruleset = _rules({"name": "SGuard64.exe"}, {"name": "ace-*.exe"})
+
+    assert ruleset.match("sguard64.EXE", 10).name == "SGuard64.exe"
+    assert ruleset.match("ACE-Tray.exe", 11).name == "ace-*.exe"
+    assert ruleset.match("notepad.exe", 12) is None
+    assert ruleset.is_candidate("ace-helper.exe")
+    assert not ruleset.is_candidate("cc1plus")
+    # Name-only rules never read process details.
+    assert procs.reads == {}
+
+
+def test_first_matching_rule_wins_across_exact_and_glob(procs: FakeProcesses) -> None:
+    procs.procs[10] = (TENCENT, ["SGuard64.exe", "--guard"], 1)
+    procs.procs[11] = ("C:\\Games\\SGuard64.exe", ["SGuard64.exe"], 1)
+    ruleset = _rules(
+        {"name": "*.exe", "exe": "*\\tencent\\*", "cmdline": "--guard", "policy": {"pin": False}},
+        {"name": "SGuard64.exe", "policy": {"cpu_cap": 5}},
+    )
+
+    # The earlier glob rule wins over the later exact one when its details match.
+    assert ruleset.match("SGuard64.exe", 10).policy.pin is False
+    # Otherwise the exact rule still applies.
+    assert ruleset.match("SGuard64.exe", 11).policy.cpu_cap == 5.0
+
+
+@pytest.mark.parametrize(
+    ("field", "value", "matches"),
+    [
+        ("exe", "*\\Tencent\\*", True),
+        ("exe", "*\\Games\\*", False),
+        ("cmdline", r"--mode=\w+", True),
+        ("cmdline", "^--mode", False),
+        ("parent", "WeGame.exe", True),
+        ("parent", "explorer.exe", False),
+    ],
+)
+def test_detail_conditions(procs: FakeProcesses, field: str, value: str, matches: bool) -> None:
+    procs.procs[10] = (TENCENT, ["SGuard64.exe", "--mode=fast"], 5)
+    procs.names[5] = "wegame.exe"
+    ruleset = _rules({"name": "SGuard64.exe", field: value})
+
+    assert (ruleset.match("SGuard64.exe", 10, 100.0) is not None) is matches
+
+
+def test_unreadable_details_do_not_match(procs: FakeProcesses) -> None:
+    ruleset = _rules({"name": "SGuard64.exe", "exe": "*"})
+
+    # Exited (or access denied) before its exe could be read.
+    assert ruleset.match("SGuard64.exe", 10) is None
+
+
+def test_verdicts_are_cached_per_pid_and_create_time(procs: FakeProcesses) -> None:
+    procs.procs[10] = (TENCENT, ["SGuard64.exe"], 5)
+    procs.names[5] = "wegame.exe"
+    ruleset = _rules({"name": "SGuard64.exe", "parent": "wegame.exe"})
+
+    assert ruleset.match("SGuard64.exe", 10, 100.0) is not None
+    assert ruleset.match("SGuard64.exe", 10, 100.0) is not None
+    assert procs.reads == {10: 1}
+
+    # Same PID, new process: re-read.
+    procs.names[5] = "explorer.exe"
+    assert ruleset.match("SGuard64.exe", 10, 200.0) is None
+    assert procs.reads == {10: 2}
+
+    # forget() (the process exited) drops the verdict too.
+    procs.names[5] = "wegame.exe"
+    ruleset.forget(10)
+    assert ruleset.match("SGuard64.exe", 10, 200.0) is not None
+    assert procs.reads == {10: 3}
+
+
+def test_find_drops_verdicts_of_processes_that_are_gone(procs: FakeProcesses) -> None:
+    procs.procs[10] = (TENCENT, ["SGuard64.exe"], 5)
+    procs.procs[11] = (TENCENT, ["ace-tray.exe"], 5)
+    procs.names[5] = "wegame.exe"
+    ruleset = _rules({"name": "SGuard64.exe", "parent": "wegame.exe"}, {"name": "ace-*.exe"})
+    snap = ProcessSnapshot(
+        [("SGuard64.exe", 10), ("ACE-Tray.exe", 11), ("notepad.exe", 12)],
+        create_times={10: 100.0, 11: 101.0, 12: 102.0},
+    )
+
+    assert [(name, pid) for name, pid, _rule in ruleset.find(snap)] == [("SGuard64.exe", 10), ("ACE-Tray.exe", 11)]
+    assert procs.reads == {10: 1}
+
+    ruleset.find(ProcessSnapshot([("notepad.exe", 12)]))
+    ruleset.find(snap)
+    assert procs.reads == {10: 2}
@@ -0,0 +1,140 @@
+"""MonitorScheduler backoff, churn reset and busy deferral against a fake clock and load."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from antiace import scheduler
+from antiace.scheduler import MonitorScheduler
+
+SET_A = frozenset({10, 11})
+SET_B = frozenset({10, 11, 12})
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """Fake monotonic clock; `load` is what the next cpu_percent() returns."""
+    fake = SimpleNamespace(now=1000.0, load=0.0)
+    monkeypatch.setattr(scheduler, "time", SimpleNamespace(monotonic=lambda: fake.now))
+    monkeypatch.setattr(scheduler.psutil, "cpu_percent", lambda interval=None: fake.load)
+    return fake
+
+
+def _sched(**kwargs: float) -> MonitorScheduler:
+    return MonitorScheduler(scan_base=30, scan_max=480, verify_base=5, verify_max=20, **kwargs)
+
+
+def test_first_scan_is_due_immediately(clock: SimpleNamespace) -> None:
+    sched = _sched()
+
+    assert sched.scan_due(clock.now)
+    assert not sched.verify_due(clock.now)
+    assert sched.next_deadline() == clock.now
+
+
+def test_quiet_scans_back_off_to_the_cap(clock: SimpleNamespace) -> None:
+    sched = _sched()
+    intervals = []
+    for _ in range(7):
+        sched.scanned(SET_A, clock.now)
+        intervals.append(sched.scan_interval)
+
+    assert intervals == [60, 120, 240, 480, 480, 480, 480]
+    assert not sched.scan_due(clock.now + 479)
+    assert sched.scan_due(clock.now + 480)
+
+
+def test_quiet_drift_checks_back_off_to_the_cap(clock: SimpleNamespace) -> None:
+    sched = _sched()
+    intervals = []
+    for _ in range(4):
+        sched.verified(False, clock.now)
+        intervals.append(sched.verify_interval)
+
+    assert intervals == [10, 20, 20, 20]
+
+
+def test_a_changed_process_set_resets_both_intervals(clock: SimpleNamespace) -> None:
+    sched = _sched()
+    for _ in range(4):
+        sched.scanned(SET_A, clock.now)
+        sched.verified(False, clock.now)
+    assert (sched.scan_interval, sched.verify_interval) == (480, 20)
+
+    clock.now += 10
+    sched.scanned(SET_B, clock.now)
+
+    assert (sched.scan_interval, sched.verify_interval) == (30, 5)
+    # The pending drift check was 10 s out; churn pulls it in to the base interval.
+    assert sched.next_deadline() == clock.now + 5
+    assert sched.stats(clock.now)["churn"] == 1
+
+
+def test_churn_only_pulls_deadlines_in(clock: SimpleNamespace) -> None:
+    sched = _sched()
+    sched.scanned(SET_A, clock.now)
+    sched.scanned(SET_A, clock.now)
+    sched.verified(False, clock.now)
+    clock.now += 115
+
+    sched.churn(clock.now)
+
+    # The next scan was due at +120, sooner than now + 30: keep it.
+    assert not sched.scan_due(1000 + 119)
+    assert sched.scan_due(1000 + 120)
+    assert sched.scan_interval == 30
+
+
+def test_corrected_drift_is_churn(clock: SimpleNamespace) -> None:
+    sched = _sched()
+    sched.scanned(SET_A, clock.now)
+    sched.scanned(SET_A, clock.now)
+    sched.verified(False, clock.now)
+
+    sched.verified(True, clock.now)
+
+    assert (sched.scan_interval, sched.verify_interval) == (30, 5)
+
+
+def test_backoff_false_keeps_the_base_scan_interval(clock: SimpleNamespace) -> None:
+    sched = _sched()
+    for _ in range(3):
+        sched.scanned(SET_A, clock.now, backoff=False)
+
+    assert sched.scan_interval == 30
+    assert sched.stats(clock.now)["churn"] == 0
+
+
+def test_busy_system_defers_background_work_for_at_most_max_defer(clock: SimpleNamespace) -> None:
+    sched = _sched(busy_load=85, max_defer=60)
+    clock.load = 95.0
+    sched.verified(False, clock.now)
+
+    assert sched.defer(clock.now + 10)
+    assert sched.defer(clock.now + 59)
+    # Deferred long enough: run now, then the limit starts over.
+    assert not sched.defer(clock.now + 60)
+    assert sched.defer(clock.now + 61)
+
+    clock.load = 20.0
+    sched.verified(False, clock.now + 62)
+    assert not sched.defer(clock.now + 63)
+    assert sched.stats(clock.now + 63)["deferred"] == 3
+
+
+def test_stats_count_loop_and_helper_thread_wakeups(clock: SimpleNamespace) -> None:
+    helper = SimpleNamespace(total=0)
+    sched = _sched(window=600, thread_wakeups=lambda: helper.total)
+
+    for _ in range(10):
+        clock.now += 30
+        helper.total += 1
+        sched.wakeup(clock.now)
+
+    stats = sched.stats(clock.now)
+    assert stats["loop_wakeups_per_minute"] == 2.0
+    assert stats["thread_wakeups_per_minute"] == 2.0
+    assert stats["wakeups_per_minute"] == 4.0
+    assert stats["baseline_per_minute"] == 60.0
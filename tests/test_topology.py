@@ -0,0 +1,156 @@
+"""Linux topology discovery against a fake sysfs tree, and guard CPU selection."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from antiace.topology import _linux_topology, _parse_cpu_list, efficient_cpus, select_guard_cpus
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text + "\n", encoding="ascii")
+
+
+def _cpu(
+    root: Path,
+    idx: int,
+    *,
+    core: int,
+    siblings: str,
+    l3: int | None = None,
+    package: int = 0,
+    capacity: int | None = None,
+) -> None:
+    base = root / f"cpu{idx}"
+    _write(base / "topology" / "physical_package_id", str(package))
+    _write(base / "topology" / "core_id", str(core))
+    _write(base / "topology" / "thread_siblings_list", siblings)
+    # L1i must not win over L1d; L2 is per core; the last level decides the domain.
+    _write(base / "cache" / "index0" / "level", "1")
+    _write(base / "cache" / "index0" / "type", "Data")
+    _write(base / "cache" / "index1" / "level", "1")
+    _write(base / "cache" / "index1" / "type", "Instruction")
+    _write(base / "cache" / "index2" / "level", "2")
+    _write(base / "cache" / "index2" / "type", "Unified")
+    _write(base / "cache" / "index2" / "id", str(100 + core))
+    if l3 is not None:
+        _write(base / "cache" / "index3" / "level", "3")
+        _write(base / "cache" / "index3" / "type", "Unified")
+        _write(base / "cache" / "index3" / "id", str(l3))
+    if capacity is not None:
+        _write(base / "cpu_capacity", str(capacity))
+
+
+@pytest.fixture
+def sysfs(tmp_path: Path) -> Path:
+    root = tmp_path / "sys" / "devices" / "system" / "cpu"
+    root.mkdir(parents=True)
+    return root
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("0-3,8,10-11", [0, 1, 2, 3, 8, 10, 11]),
+        ("5", [5]),
+        ("", []),
+        ("0-1,\n", [0, 1]),
+    ],
+)
+def test_parse_cpu_list(text: str, expected: list[int]) -> None:
+    assert _parse_cpu_list(text) == expected
+
+
+def test_missing_online_file_means_no_topology(sysfs: Path) -> None:
+    assert _linux_topology(sysfs) is None
+
+
+def test_hybrid_intel_with_smt(sysfs: Path) -> None:
+    # Two P-cores with SMT (0,1 and 2,3) and two E-cores (4, 5), one shared L3.
+    _write(sysfs / "online", "0-5")
+    _cpu(sysfs, 0, core=0, siblings="0-1", l3=0)
+    _cpu(sysfs, 1, core=0, siblings="0-1", l3=0)
+    _cpu(sysfs, 2, core=4, siblings="2-3", l3=0)
+    _cpu(sysfs, 3, core=4, siblings="2-3", l3=0)
+    _cpu(sysfs, 4, core=8, siblings="4", l3=0)
+    _cpu(sysfs, 5, core=9, siblings="5", l3=0)
+    _write(sysfs.parent.parent / "cpu_atom" / "cpus", "4-5")
+
+    topo = _linux_topology(sysfs)
+
+    assert topo is not None and topo.source == "sysfs"
+    assert topo.indices == (0, 1, 2, 3, 4, 5)
+    assert topo.has_smt and topo.is_hybrid
+    assert topo.get(1).siblings == (0, 1)
+    assert topo.get(0).core == topo.get(1).core != topo.get(2).core
+    assert {c.cache_domain for c in topo.cpus} == {0}
+    assert efficient_cpus(topo) == (4, 5)
+    assert topo.describe(5) == "5 (E-core)"
+    assert topo.describe(1) == "1 (P-core, SMT of 0)"
+
+    # The last E-core; an E-core the game already holds pushes the guard to the other one.
+    assert select_guard_cpus(topo) == (5,)
+    assert select_guard_cpus(topo, exclude={5}) == (4,)
+
+
+def test_two_l3_domains_prefer_the_last_one(sysfs: Path) -> None:
+    _write(sysfs / "online", "0-3")
+    _cpu(sysfs, 0, core=0, siblings="0", l3=0)
+    _cpu(sysfs, 1, core=1, siblings="1", l3=0)
+    _cpu(sysfs, 2, core=8, siblings="2", l3=1)
+    _cpu(sysfs, 3, core=9, siblings="3", l3=1)
+
+    topo = _linux_topology(sysfs)
+
+    assert topo is not None
+    assert [c.cache_domain for c in topo.cpus] == [0, 0, 1, 1]
+    assert not topo.has_smt and not topo.is_hybrid
+    assert select_guard_cpus(topo) == (3,)
+    assert select_guard_cpus(topo, count=2) == (2, 3)
+
+
+def test_big_little_ranks_cpu_capacity(sysfs: Path) -> None:
+    _write(sysfs / "online", "0-3")
+    for idx, capacity in enumerate((446, 446, 1024, 1024)):
+        _cpu(sysfs, idx, core=idx, siblings=str(idx), capacity=capacity)
+
+    topo = _linux_topology(sysfs)
+
+    assert topo is not None
+    assert [c.efficiency_class for c in topo.cpus] == [0, 0, 1, 1]
+    # No L3 at all: the domain stays at the L2 id, still one per CPU here.
+    assert [c.cache_domain for c in topo.cpus] == [100, 101, 102, 103]
+    assert efficient_cpus(topo) == (0, 1)
+
+
+def test_sparse_online_and_missing_topology_files(sysfs: Path) -> None:
+    _write(sysfs / "online", "0,2")
+    (sysfs / "cpu0").mkdir()
+    (sysfs / "cpu2").mkdir()
+
+    topo = _linux_topology(sysfs)
+
+    assert topo is not None
+    assert topo.indices == (0, 2)
+    assert topo.get(2).siblings == (2,)
+    assert topo.get(2).cache_domain == -1
+    assert topo.get(0).core != topo.get(2).core
+
+
+def test_preferred_cpus_win_unless_they_share_a_core_with_the_game(sysfs: Path) -> None:
+    _write(sysfs / "online", "0-3")
+    _cpu(sysfs, 0, core=0, siblings="0,2", l3=0)
+    _cpu(sysfs, 1, core=1, siblings="1,3", l3=0)
+    _cpu(sysfs, 2, core=0, siblings="0,2", l3=0)
+    _cpu(sysfs, 3, core=1, siblings="1,3", l3=0)
+    topo = _linux_topology(sysfs)
+    assert topo is not None
+
+    assert select_guard_cpus(topo, preferred=(0, 64)) == (0,)
+    # CPU 0 is the SMT sibling of the game's CPU 2: fall back to ranking on the other core.
+    assert select_guard_cpus(topo, preferred=(0,), exclude={2}) == (3,)
+    # Two slots fill the same physical core first.
+    assert select_guard_cpus(topo, count=2) == (1, 3)
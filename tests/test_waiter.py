@@ -0,0 +1,107 @@
+"""Exit waiters against real child processes."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+import threading
+
+import psutil
+import pytest
+
+from antiace.waiter import ExitWaiter, PidfdExitWaiter
+
+
+class FastPollingWaiter(ExitWaiter):
+    _poll_interval = 0.05
+
+
+WAITERS = [
+    FastPollingWaiter,
+    pytest.param(
+        PidfdExitWaiter,
+        marks=pytest.mark.skipif(not PidfdExitWaiter.available(), reason="pidfd_open not available"),
+    ),
+]
+
+
+@pytest.fixture
+def child():
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    yield proc
+    proc.kill()
+    proc.wait()
+
+
+def _recorder() -> tuple[list[int], threading.Event, object]:
+    exited: list[int] = []
+    fired = threading.Event()
+
+    def on_exit(pid: int) -> None:
+        exited.append(pid)
+        fired.set()
+
+    return exited, fired, on_exit
+
+
+@pytest.mark.parametrize("cls", WAITERS)
+def test_exit_is_reported_once(cls: type[ExitWaiter], child: subprocess.Popen) -> None:
+    waiter = cls()
+    waiter.start()
+    exited, fired, on_exit = _recorder()
+    try:
+        assert waiter.watch(child.pid, on_exit, create_time=psutil.Process(child.pid).create_time())
+        assert waiter.is_watching(child.pid)
+
+        child.kill()
+        # Reaped, so the polling waiter's pid_exists() sees it gone too.
+        child.wait()
+
+        assert fired.wait(2.0)
+        assert exited == [child.pid]
+        assert not waiter.is_watching(child.pid)
+        assert len(waiter) == 0
+    finally:
+        waiter.stop()
+
+
+@pytest.mark.parametrize("cls", WAITERS)
+def test_reused_pid_is_not_watched(cls: type[ExitWaiter], child: subprocess.Popen) -> None:
+    waiter = cls()
+    waiter.start()
+    _exited, _fired, on_exit = _recorder()
+    try:
+        created = psutil.Process(child.pid).create_time()
+
+        # The PID now belongs to a process other than the one seen at `created - 1`.
+        assert not waiter.watch(child.pid, on_exit, create_time=created - 1.0)
+        assert not waiter.is_watching(child.pid)
+    finally:
+        waiter.stop()
+
+
+@pytest.mark.parametrize("cls", WAITERS)
+def test_unwatch_drops_the_callback(cls: type[ExitWaiter], child: subprocess.Popen) -> None:
+    waiter = cls()
+    waiter.start()
+    exited, fired, on_exit = _recorder()
+    try:
+        assert waiter.watch(child.pid, on_exit)
+        waiter.unwatch(child.pid)
+
+        child.kill()
+        child.wait()
+
+        assert not fired.wait(0.3)
+        assert exited == []
+    finally:
+        waiter.stop()
+
+
+def test_gone_pid_is_refused(child: subprocess.Popen) -> None:
+    child.kill()
+    child.wait()
+    waiter = FastPollingWaiter()
+    _exited, _fired, on_exit = _recorder()
+
+    assert not waiter.watch(child.pid, on_exit)
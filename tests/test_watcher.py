@@ -0,0 +1,123 @@
+"""Process-start watchers: netlink datagram parsing, name filtering and the PID-diff fallbacks."""
+
+from __future__ import annotations
+
+import struct
+import threading
+
+import psutil
+import pytest
+
+from antiace import watcher as watcher_module
+from antiace.watcher import (
+    _CN_MSG,
+    _NLMSGHDR,
+    _PROC_EVENT,
+    _PROC_EVENT_COMM,
+    _PROC_EVENT_EXEC,
+    MIN_POLL_INTERVAL,
+    NetlinkProcWatcher,
+    PidDiffWatcher,
+    ProcDirWatcher,
+    WindowsProcessWatcher,
+    _parse_proc_events,
+)
+
+_PROC_EVENT_FORK = 0x00000001
+
+
+def _message(what: int, payload: bytes) -> bytes:
+    event = _PROC_EVENT.pack(what, 0, 123456789) + payload
+    cn = _CN_MSG.pack(1, 1, 0, 0, len(event), 0)
+    body = cn + event
+    msg = _NLMSGHDR.pack(_NLMSGHDR.size + len(body), 3, 0, 0, 0) + body
+    # Netlink messages are 4-byte aligned.
+    return msg + b"\0" * (-len(msg) % 4)
+
+
+def _exec(pid: int, tgid: int) -> bytes:
+    return _message(_PROC_EVENT_EXEC, struct.pack("=II", pid, tgid))
+
+
+def _comm(pid: int, tgid: int, comm: bytes = b"SGuard64.exe") -> bytes:
+    return _message(_PROC_EVENT_COMM, struct.pack("=II16s", pid, tgid, comm))
+
+
+def _fork(parent: int, child: int) -> bytes:
+    return _message(_PROC_EVENT_FORK, struct.pack("=IIII", parent, parent, child, child))
+
+
+def test_exec_and_comm_events_of_process_leaders() -> None:
+    assert _parse_proc_events(_exec(100, 100) + _comm(200, 200)) == [100, 200]
+
+
+def test_fork_events_are_skipped() -> None:
+    assert _parse_proc_events(_fork(1, 300) + _exec(300, 300)) == [300]
+
+
+def test_thread_events_are_skipped() -> None:
+    # A thread (pid != tgid) renaming itself is not a new process.
+    assert _parse_proc_events(_comm(401, 400) + _exec(402, 400)) == []
+
+
+def test_truncated_datagrams_stop_cleanly() -> None:
+    data = _exec(100, 100) + _exec(200, 200)
+    assert _parse_proc_events(data[:-6]) == [100]
+    assert _parse_proc_events(b"") == []
+    # A header claiming less than its own size ends the walk.
+    assert _parse_proc_events(_NLMSGHDR.pack(4, 3, 0, 0, 0) + _exec(100, 100)) == []
+
+
+class _FakeProcess:
+    names = {100: "SGuard64.exe", 200: "cc1plus"}
+
+    def __init__(self, pid: int):
+        if pid not in self.names:
+            raise psutil.NoSuchProcess(pid)
+        self._pid = pid
+
+    def name(self) -> str:
+        return self.names[self._pid]
+
+
+def test_wanted_filters_names_on_the_watcher_thread(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(watcher_module.psutil, "Process", _FakeProcess)
+    watcher = NetlinkProcWatcher(wanted=lambda name: name.lower() == "sguard64.exe")
+
+    assert watcher._accept(100) is True
+    assert watcher._accept(200) is False
+    # Already gone: nothing to optimize.
+    assert watcher._accept(999) is False
+    # Without a filter every event is passed on.
+    assert NetlinkProcWatcher()._accept(200) is True
+
+
+def test_polling_fallbacks_are_not_event_sources() -> None:
+    assert NetlinkProcWatcher.event_driven is True
+    for cls in (PidDiffWatcher, ProcDirWatcher, WindowsProcessWatcher):
+        assert cls.event_driven is False
+    assert ProcDirWatcher(interval=0.05)._interval == MIN_POLL_INTERVAL
+
+
+def test_pid_diff_reports_new_pids() -> None:
+    listings = iter([{1, 2}, {1, 2, 3}, {1, 3, 4, 5}])
+    started: list[int] = []
+    done = threading.Event()
+
+    def list_pids() -> set[int]:
+        try:
+            return next(listings)
+        except StopIteration:
+            done.set()
+            return {1, 3, 4, 5}
+
+    def on_started(pid: int) -> None:
+        started.append(pid)
+
+    watcher = PidDiffWatcher(list_pids, interval=0.01)
+    assert watcher.start(on_started)
+    assert done.wait(2.0)
+    watcher.stop()
+
+    assert started == [3, 4, 5]
+    assert watcher.wakeups >= 2